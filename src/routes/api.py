@@ -2,6 +2,15 @@ from flask import Blueprint, jsonify, request
 from src.services.signal_generator import signal_generator
 from src.services.coin_gecko_service import coin_gecko_service
 from src.services.coin_filter_service import coin_filter_service
+from src.services.advanced_signal_generator import advanced_signal_generator
+from src.services.candle_scheduler import CandleCloseScheduler
+from src.services.candle_prefetcher import candle_prefetcher
+from src.services.shadow_strategies import shadow_strategy_book
+from src.services.scan_tracer import scan_tracer
+from src.services.pnl_engine import pnl_engine
+from src.services.price_updater_service import price_updater_service
+from src.services.portfolio_simulator import portfolio_simulator
+from src.services.exposure_ledger import exposure_ledger
 import threading
 import time
 
@@ -12,10 +21,18 @@ auto_scan_active = False
 auto_scan_thread = None
 scan_count = 0
 last_scan_time = None
+candle_scheduler = None
 
 def auto_scan_worker():
-    """Otomatik tarama worker fonksiyonu"""
-    global scan_count, last_scan_time
+    """Otomatik tarama worker fonksiyonu (mum kapanışlarına hizalı)"""
+    global scan_count, last_scan_time, candle_scheduler
+    
+    candle_scheduler = CandleCloseScheduler(advanced_signal_generator.timeframes)
+    
+    def prefetch_next(close_time, timeframes):
+        # Kapanacak timeframe'leri kapanıştan önce ısıt; kapanışta Binance çerçeveleri için yalnızca son mumlar alınır
+        symbols = advanced_signal_generator.next_scan_symbols()
+        candle_prefetcher.start(symbols, timeframes, deadline=close_time)
     
     while auto_scan_active:
         try:
@@ -33,31 +50,9 @@ def auto_scan_worker():
                 if symbols:
                     price_updates = coin_gecko_service.get_current_prices(symbols)
                     
-                    # Manuel PnL güncelleme
-                    updated_count = 0
-                    for signal in active_signals:
-                        symbol = signal.get('coin_symbol', signal.get('symbol', '')).lower()
-                        if symbol in price_updates:
-                            new_price = price_updates[symbol]
-                            if new_price and new_price > 0:
-                                signal['current_price'] = new_price
-                                entry_price = signal.get('entry_price', 0)
-                                
-                                # PnL hesaplama
-                                if entry_price > 0:
-                                    if signal.get('direction', '').upper() == 'LONG':
-                                        pnl_percentage = ((new_price - entry_price) / entry_price) * 100
-                                    else:
-                                        pnl_percentage = ((entry_price - new_price) / entry_price) * 100
-                                    
-                                    signal['pnl_percentage'] = round(pnl_percentage, 2)
-                                    
-                                    # USD PnL hesaplama
-                                    position_size = 1000
-                                    pnl_usd = (pnl_percentage / 100) * position_size
-                                    signal['pnl_usd'] = round(pnl_usd, 2)
-                                    
-                                    updated_count += 1
+                    # PnL tek vektörel geçişte (TP/SL kapanışları sinyal üreticisinde)
+                    updated_count = pnl_engine.update(active_signals, price_updates, 'legacy',
+                                                      check_triggers=False, book='api')['updated']
                     
                     if updated_count > 0:
                         signal_generator.save_signals()
@@ -68,11 +63,15 @@ def auto_scan_worker():
             
             print(f"✅ Otomatik tarama tamamlandı: {len(new_signals)} yeni sinyal")
             
-            # 5 dakika bekle (300 saniye)
-            for _ in range(300):
-                if not auto_scan_active:
-                    break
-                time.sleep(1)
+            # Sıradaki mum kapanışına kadar bekle; yalnızca kapanan
+            # timeframe'ler yeniden alınıp analiz edilir
+            closed = candle_scheduler.wait(
+                lambda: auto_scan_active,
+                on_approach=prefetch_next,
+                lead_time=candle_prefetcher.lead_time
+            )
+            if closed:
+                print(f"🕯️ Mum kapanışı: {', '.join(closed)}")
                 
         except Exception as e:
             print(f"❌ Otomatik tarama hatası: {e}")
@@ -82,7 +81,7 @@ def auto_scan_worker():
 def get_signals():
     """Aktif sinyalleri döner"""
     try:
-        signals = signal_generator.get_active_signals()
+        signals = signal_generator.get_active_signals(snapshot=True)
         return jsonify({
             'success': True,
             'signals': signals,
@@ -131,8 +130,9 @@ def generate_signals():
     try:
         data = request.get_json() or {}
         max_signals = data.get('max_signals', 15)
+        time_budget = data.get('time_budget')  # Saniye; verilmezse varsayılan tarama süresi
         
-        new_signals = signal_generator.generate_signals(max_signals)
+        new_signals = signal_generator.generate_signals(max_signals, time_budget)
         
         return jsonify({
             'success': True,
@@ -175,33 +175,9 @@ def update_signal_prices():
                 'error': 'Fiyat verisi alınamadı'
             }), 500
         
-        # Sinyalleri güncelle
-        updated_count = 0
-        for signal in active_signals:
-            symbol = signal.get('coin_symbol', signal.get('symbol', '')).lower()
-            if symbol in price_updates:
-                old_price = signal.get('current_price', 0)
-                new_price = price_updates[symbol]
-                
-                if new_price and new_price > 0:
-                    signal['current_price'] = new_price
-                    entry_price = signal.get('entry_price', 0)
-                    
-                    # PnL hesaplama
-                    if entry_price > 0:
-                        if signal.get('direction', '').upper() == 'LONG':
-                            pnl_percentage = ((new_price - entry_price) / entry_price) * 100
-                        else:
-                            pnl_percentage = ((entry_price - new_price) / entry_price) * 100
-                        
-                        signal['pnl_percentage'] = round(pnl_percentage, 2)
-                        
-                        # USD PnL hesaplama (1000$ pozisyon varsayımı)
-                        position_size = 1000
-                        pnl_usd = (pnl_percentage / 100) * position_size
-                        signal['pnl_usd'] = round(pnl_usd, 2)
-                        
-                        updated_count += 1
+        # Sinyalleri güncelle (tek vektörel geçiş)
+        updated_count = pnl_engine.update(active_signals, price_updates, 'legacy', check_triggers=False,
+                                      book='api')['updated']
         
         # Güncellenmiş sinyalleri kaydet
         signal_generator.save_signals()
@@ -252,9 +228,14 @@ def stop_auto_scan():
     try:
         auto_scan_active = False
         
+        # Devam eden tarama ve ön yüklemeyi bekletmeden kes
+        cancelled = signal_generator.cancel_scan()
+        candle_prefetcher.stop()
+        
         return jsonify({
             'success': True,
-            'message': 'Otomatik tarama durduruldu'
+            'message': 'Otomatik tarama durduruldu',
+            'cancelled_scans': cancelled
         })
     except Exception as e:
         return jsonify({
@@ -270,7 +251,176 @@ def get_auto_scan_status():
             'success': True,
             'active': auto_scan_active,
             'scan_count': scan_count,
-            'last_scan_time': last_scan_time
+            'last_scan_time': last_scan_time,
+            'next_scan_in': candle_scheduler.seconds_until_next() if candle_scheduler and auto_scan_active else None
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/shadow-strategies', methods=['GET'])
+def get_shadow_strategies():
+    """Gölge stratejilerin konfigürasyon ve performans raporu"""
+    try:
+        include_signals = request.args.get('signals', 'false').lower() == 'true'
+        return jsonify({
+            'success': True,
+            'strategies': shadow_strategy_book.get_report(include_signals)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/shadow-strategies', methods=['POST'])
+def add_shadow_strategy():
+    """Gölge strateji ekle veya güncelle"""
+    try:
+        data = request.get_json() or {}
+        
+        if not data.get('name'):
+            return jsonify({
+                'success': False,
+                'error': 'name alanı gerekli'
+            }), 400
+        
+        config = shadow_strategy_book.add_strategy(
+            data['name'],
+            min_confidence=data.get('min_confidence'),
+            timeframe_weights=data.get('timeframe_weights'),
+            tolerance=data.get('tolerance'),
+            max_signals=data.get('max_signals')
+        )
+        
+        return jsonify({
+            'success': True,
+            'strategy': config
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/shadow-strategies/<name>', methods=['DELETE'])
+def remove_shadow_strategy(name):
+    """Gölge stratejiyi sil"""
+    try:
+        if not shadow_strategy_book.remove_strategy(name):
+            return jsonify({
+                'success': False,
+                'error': 'Strateji bulunamadı'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'message': f'{name} silindi'
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/scans/traces', methods=['GET'])
+def get_scan_traces():
+    """Son taramaların aşama bazlı süre özetleri"""
+    try:
+        return jsonify({
+            'success': True,
+            'traces': scan_tracer.recent()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/scans/traces/<trace_id>', methods=['GET'])
+def get_scan_trace(trace_id):
+    """Tarama izini Chrome trace-event JSON olarak döndür (chrome://tracing, Perfetto)"""
+    try:
+        trace = scan_tracer.get(trace_id)
+        if trace is None:
+            return jsonify({
+                'success': False,
+                'error': 'İz bulunamadı'
+            }), 404
+        
+        return jsonify(trace.to_chrome())
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/prices/polling', methods=['GET'])
+def get_price_polling():
+    """Katmanlı fiyat sorgulama durumu (katmanlar, istek bütçesi, sembol durumları)"""
+    try:
+        return jsonify({
+            'success': True,
+            'status': price_updater_service.get_status(),
+            'symbols': price_updater_service.scheduler.get_symbol_states()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/portfolio/simulate', methods=['POST'])
+def simulate_portfolio():
+    """
+    Sinyal geçmişini portföy olarak simüle et
+    
+    Gövde: sizing (fixed/percent/confidence/compound), initial_capital,
+    position_size, fraction, fee_rate, slippage_bps, include_curve; veya
+    kuralları karşılaştırmak için policies listesi.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        history = signal_generator.get_signal_history()
+        include_curve = bool(data.get('include_curve', False))
+        
+        if data.get('policies'):
+            return jsonify({
+                'success': True,
+                'results': portfolio_simulator.simulate_history(history, include_curve, policies=data['policies'])
+            })
+        
+        params = {key: data.get(key) for key in
+                  ('sizing', 'initial_capital', 'position_size', 'fraction', 'fee_rate', 'slippage_bps')}
+        return jsonify({
+            'success': True,
+            'result': portfolio_simulator.simulate_history(history, include_curve, **params)
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/exposure', methods=['GET'])
+def get_exposure():
+    """Açık sinyallerin sembol, yön ve küme bazında riski ve limitler"""
+    try:
+        return jsonify({
+            'success': True,
+            'exposure': exposure_ledger.get_exposure()
         })
     except Exception as e:
         return jsonify({
@@ -655,7 +805,7 @@ def learning_stats():
 def get_detailed_stats():
     """Detaylı istatistikler API endpoint'i"""
     try:
-        signals = signal_generator.get_active_signals()
+        signals = signal_generator.get_active_signals(snapshot=True)
         
         if not signals:
             return jsonify({
@@ -797,7 +947,7 @@ def get_detailed_stats():
 def export_stats():
     """İstatistikleri CSV formatında export et"""
     try:
-        signals = signal_generator.get_active_signals()
+        signals = signal_generator.get_active_signals(snapshot=True)
         
         if not signals:
             return jsonify({'success': False, 'error': 'Aktif sinyal bulunamadı'}), 404
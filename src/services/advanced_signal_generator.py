@@ -1,18 +1,37 @@
+import os
 import json
 import time
-import random
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
 import numpy as np
 
 from .chart_data_service import chart_data_service
+from .candle_store import candle_store, next_candle_close
+from .coin_gecko_service import coin_gecko_service
+from .incremental_pattern_engine import incremental_pattern_engine
 from .pattern_recognition_service import pattern_recognition_service
-from .technical_analysis_service import technical_analysis_service
+from .shadow_strategies import shadow_strategy_book
+from . import analysis_workers
 from .coin_filter_service import CoinFilterService
+from .scan_pipeline import ScanPipeline, CancellationToken, ScanCancelled, current_token
+from .scan_priority import ScanPriorityQueue
+from .scan_tracer import scan_tracer
+from .pnl_engine import pnl_engine
+from .signal_store import signal_store
+from .expiry_index import ExpiryIndex
+from .tick_buffer import tick_buffer
+from .portfolio_simulator import portfolio_simulator
+from .exposure_ledger import exposure_ledger
+from .signal_ranking import TopKSelector, risk_reward_ratio
+from .timeframe_scoring import MultiTimeframeScorer, DEFAULT_TIMEFRAME_WEIGHTS
 
 class AdvancedSignalGenerator:
     def __init__(self):
-        self.signals = []
+        self.store = signal_store  # Aktif sinyaller (kanonik şema, SignalGenerator ile ortak)
         self.signal_history = []
         self.coin_filter = CoinFilterService()
         
@@ -20,80 +39,351 @@ class AdvancedSignalGenerator:
         self.timeframes = ['15m', '1h', '4h']  # Multi-timeframe analiz
         self.min_confidence = 60  # Minimum güven seviyesi
         self.max_signals_per_run = 5  # Her çalıştırmada max sinyal
+        self.timeframe_weights = dict(DEFAULT_TIMEFRAME_WEIGHTS)  # Uzun vadeli daha önemli
+        self.scorer = MultiTimeframeScorer()
+        self.scoring_batch_size = 16  # Emit aşamasında birlikte skorlanan coin sayısı
+        
+        # Aynı veri üzerinde değerlendirilen, sinyal yayınlamayan stratejiler
+        self.shadow_book = shadow_strategy_book
+        
+        # Bu üreticinin sinyalleri açılıştan signal_ttl saniye sonra tam zamanında sona erer.
+        # Zamanlayıcı thread'i ilk kullanımda, her süreçte ayrı başlatılır (fork sonrası
+        # ana süreçte başlatılmış thread çalışan süreçlere geçmez)
+        self.signal_ttl = 24 * 3600
+        self.expiry = ExpiryIndex(self._expire_signals)
+        for signal in self.store.values():
+            if self._owns(signal):
+                self.expiry.schedule(signal['id'], signal['opened_at'] + self.signal_ttl)
+        self.store.add_listener(self._on_store_event)
+        
+        # Kapanan sinyallerin kalıcı geçmişe yazılacağı yol (SignalGenerator.add_to_history)
+        self.history_sink: Optional[Callable[[Dict, str, float], None]] = None
+        
+        # Açık sinyal riski (sembol/yön/küme limitleri, depo dinleyicisiyle artımlı)
+        self.exposure = exposure_ledger
+        self.exposure.attach(self.store)
+        
+        # Mum içi TP/SL: son fiyat kontrolünden bu yana mumların high/low'u da değerlendirilir
+        self.intrabar_checks = True
+        self._last_price_check = time.time()
+        
+        # Tarama pipeline'ı
+        self.fetch_workers = 4  # I/O aşaması thread sayısı
+        self.analysis_workers = 2  # CPU aşaması thread sayısı
+        self.pipeline_queue_size = 8  # Aşamalar arası kuyruk kapasitesi
+        
+        # Tam evren taraması
+        self.universe_size = 100  # Filtre servisinden istenecek coin sayısı
+        self.universe_ttl = 300  # Filtrelenmiş coin listesi önbellek süresi (saniye)
+        self.scan_time_budget = 240  # Varsayılan tarama süresi sınırı (saniye, None = sınırsız)
+        self.scan_queue = ScanPriorityQueue()
+        self._universe_cache = None
+        self._universe_cached_at = 0
+        self._active_tokens = set()
+        self._tokens_lock = threading.Lock()
+        
+        # (symbol, timeframe) -> son analiz; timeframe'in mumu kapanana kadar geçerli
+        self._analysis_cache = {}
+        self._analysis_cache_stats = {'reused': 0, 'computed': 0}
+        self._analysis_cache_lock = threading.Lock()
+        
+        # Opsiyonel analiz process pool'u (0 = kapalı, analiz thread'lerde çalışır)
+        self.analysis_processes = int(os.environ.get('ANALYSIS_PROCESSES', '0'))
+        self._analysis_executor = None
+        self._worker_stats = {}
+        self._worker_stats_lock = threading.Lock()
         
         print("🚀 Advanced Signal Generator başlatıldı")
     
-    def generate_signals(self, coin_count: int = 15) -> Dict[str, any]:
+    def generate_signals(self, coin_count: Optional[int] = None,
+                         time_budget: Optional[float] = None,
+                         persist: Optional[Callable[[], None]] = None) -> Dict[str, any]:
         """
         Gerçek teknik analiz ile sinyal üret
         
+        Uygun coin evreninin tamamı öncelik sırasına (volatilite, bayatlık,
+        seviyeye yakınlık) göre taranır. Süre dolarsa veya cancel_scan()
+        çağrılırsa devam eden işler iptal edilir, o ana kadar analiz edilen
+        coinlerden sinyal üretilir; kalan coinler bir sonraki taramaya kalır.
+        
         Args:
-            coin_count: Analiz edilecek coin sayısı
+            coin_count: Analiz edilecek en fazla coin sayısı (None = tüm evren)
+            time_budget: Tarama süresi sınırı (saniye, None = scan_time_budget)
+            persist: Tarama sonunda sinyalleri kaydeden fonksiyon; iz kapanmadan
+                çağrılır, böylece süresi taramanın içinde ölçülür
             
         Returns:
             Üretilen sinyaller ve istatistikler
         """
         try:
-            print(f"🔍 {coin_count} coin için gelişmiş sinyal analizi başlatılıyor...")
-            
             # Filtrelenmiş coinleri al
-            filtered_coins = self.coin_filter.get_filtered_coins()
+            filtered_coins = self._get_universe()
             if not filtered_coins:
                 print("❌ Analiz için uygun coin bulunamadı")
-                return {'new_signals': 0, 'total_signals': len(self.signals)}
+                return {'new_signals': 0, 'total_signals': len(self.store)}
+            
+            # Öncelik sırasına göre coin seç (deterministik)
+            selected_symbols = self.scan_queue.prioritize(filtered_coins, coin_count)
+            print(f"🔍 {len(selected_symbols)}/{len(filtered_coins)} coin için gelişmiş sinyal analizi başlatılıyor...")
+            print(f"📊 Tarama sırası: {', '.join(selected_symbols)}")
+            
+            time_budget = time_budget if time_budget is not None else self.scan_time_budget
+            trace = scan_tracer.start_scan('signals', coins=len(selected_symbols), time_budget=time_budget)
+            scan_tracer.bind(trace)
             
-            # Rastgele coin seç
-            selected_coins = random.sample(filtered_coins, min(coin_count, len(filtered_coins)))
-            print(f"📊 Seçilen coinler: {', '.join(selected_coins)}")
+            # Son fiyatlar coin başına istek yerine tek toplu istekle; eşzamanlı
+            # taramalar birbirinin fiyatlarını görmesin diye taramaya özel
+            with scan_tracer.span('batch_prices', 'fetch', coins=len(selected_symbols)):
+                batch_prices = self._fetch_scan_prices(filtered_coins, selected_symbols)
+            
+            token = CancellationToken.with_budget(time_budget)
+            with self._tokens_lock:
+                self._active_tokens.add(token)
             
             new_signals = []
             analysis_results = []
             
-            for symbol in selected_coins:
-                try:
-                    print(f"🔍 {symbol} analiz ediliyor...")
-                    
-                    # Multi-timeframe analiz
-                    signal_data = self._analyze_coin_comprehensive(symbol)
-                    
-                    if signal_data and signal_data['confidence'] >= self.min_confidence:
-                        # Yeni sinyal oluştur
-                        new_signal = self._create_signal_from_analysis(symbol, signal_data)
-                        if new_signal:
-                            new_signals.append(new_signal)
-                            analysis_results.append({
-                                'symbol': symbol,
-                                'analysis': signal_data
-                            })
-                            print(f"✅ {symbol} {new_signal['direction']} sinyali oluşturuldu (Güven: %{signal_data['confidence']})")
-                    else:
-                        print(f"⚠️ {symbol} için yeterli güven seviyesi yok")
-                    
-                    # Rate limiting
-                    time.sleep(0.5)
-                    
-                except Exception as e:
-                    print(f"❌ {symbol} analiz hatası: {e}")
+            # Tüm taramadan en iyi max_signals_per_run aday (güven, risk/ödül)
+            selector = TopKSelector(self.max_signals_per_run)
+            
+            def select(symbol: str, signal_data: Dict):
+                self.scan_queue.record_analysis(symbol, signal_data)
+                if signal_data['confidence'] >= self.min_confidence:
+                    rank_key = self._rank_key(signal_data)
+                    if not selector.push(rank_key, symbol, signal_data):
+                        print(f"⚠️ {symbol} ilk {self.max_signals_per_run} aday arasına giremedi")
+                else:
+                    print(f"⚠️ {symbol} için yeterli güven seviyesi yok")
+            
+            # Gölge stratejiler: kendi top-K seçicileri, aynı analizler
+            shadow_strategies = self.shadow_book.get_strategies()
+            shadow_selectors = {
+                config['name']: TopKSelector(config['max_signals'] or self.max_signals_per_run)
+                for config in shadow_strategies
+            }
+            scan_prices = {}
+            
+            # Analizler mikro-batch'ler halinde vektörel skorlanır
+            pending = []
+            
+            def flush():
+                batch = pending[:]
+                pending.clear()
+                if shadow_strategies:
+                    with scan_tracer.span('shadow_scoring', 'scoring', coins=len(batch)):
+                        self._score_shadows(batch, shadow_strategies, shadow_selectors)
+                with scan_tracer.span('scoring', 'scoring', coins=len(batch)):
+                    scored = self._score_results(batch)
+                for signal_data in scored:
+                    signal_data.pop('variant_analyses', None)
+                    if signal_data.get('current_price'):
+                        scan_prices[signal_data['symbol']] = signal_data['current_price']
+                    select(signal_data['symbol'], signal_data)
+            
+            def emit(symbol: str, signal_data: Dict):
+                analyzed_at = signal_data.pop('_analyzed_at', None)
+                if trace and analyzed_at:
+                    trace.add('queue_wait', 'queue', analyzed_at, time.perf_counter(),
+                              {'coin': symbol, 'stage': 'emit'})
+                pending.append(signal_data)
+                if len(pending) >= self.scoring_batch_size:
+                    flush()
+            
+            # fetch (I/O) -> analiz (CPU) -> sinyal oluşturma (tek thread)
+            # Process pool açıksa her process'i besleyecek kadar analiz thread'i
+            analysis_workers_count = max(self.analysis_workers, self.analysis_processes)
+            pipeline = ScanPipeline(self.fetch_workers, analysis_workers_count, self.pipeline_queue_size)
+            try:
+                pipeline_stats = pipeline.run(
+                    selected_symbols,
+                    lambda symbol: self._traced_fetch(trace, symbol, batch_prices),
+                    lambda symbol, payload: self._traced_analyze(trace, symbol, payload),
+                    emit,
+                    token,
+                    # Başarısız coinler de denenmiş sayılır (kuyruğun başında takılı kalmasın)
+                    lambda symbol, stage: self.scan_queue.record_analysis(symbol)
+                )
+            finally:
+                with self._tokens_lock:
+                    self._active_tokens.discard(token)
+            flush()
+            pipeline_stats['universe'] = len(filtered_coins)
+            pipeline_stats['skipped'] = len(selected_symbols) - pipeline_stats['fed']
+            if pipeline_stats['cancel_reason']:
+                print(f"⏳ Tarama kesildi ({pipeline_stats['cancel_reason']}): "
+                      f"{pipeline_stats['cancelled']} coin iptal, {pipeline_stats['skipped']} coin sonraki taramaya kaldı")
+            pipeline_stats['candle_cache'] = candle_store.get_stats()
+            pipeline_stats['analysis_cache'] = self._collect_analysis_cache_stats()
+            print(f"⏱️ Tarama süresi: {pipeline_stats['wall_time']}s "
+                  f"(fetch: {pipeline_stats['fetch_time']}s, analiz: {pipeline_stats['analysis_time']}s)")
+            worker_stats = self._collect_worker_stats(pipeline_stats['wall_time'])
+            for stats in worker_stats:
+                print(f"  ⚙️ {stats['worker']}: {stats['tasks']} coin, {stats['coins_per_sec']} coin/s")
+            
+            # Yalnızca seçilen adaylardan sinyal oluştur (en iyiden başlayarak);
+            # risk limitlerini aşan adaylar atlanır
+            pipeline_stats['exposure_blocked'] = 0
+            for rank_key, symbol, signal_data in selector.results():
+                blocked = self.exposure.check(symbol, signal_data['signal'])
+                if blocked:
+                    pipeline_stats['exposure_blocked'] += 1
+                    print(f"⚖️ {symbol} {signal_data['signal']} atlandı: {blocked}")
                     continue
+                with scan_tracer.span('signal_creation', 'signals', coin=symbol):
+                    new_signal = self._create_signal_from_analysis(symbol, signal_data)
+                if new_signal:
+                    new_signal['risk_reward'] = round(rank_key[1], 2)
+                    # Depoya hemen eklenir; sonraki adayların limit kontrolü bu sinyali görür
+                    new_signal = self.store.add(new_signal)
+                    new_signals.append(new_signal)
+                    analysis_results.append({
+                        'symbol': symbol,
+                        'analysis': signal_data
+                    })
+                    print(f"✅ {symbol} {new_signal['direction']} sinyali oluşturuldu (Güven: %{signal_data['confidence']}, R/R: {new_signal['risk_reward']})")
+            pipeline_stats['candidates'] = selector.seen
             
-            # Yeni sinyalleri ekle
-            self.signals.extend(new_signals)
+            # Gölge sinyaller yalnızca deftere yazılır; PnL bu taramanın fiyatlarıyla
+            with scan_tracer.span('shadow_book', 'signals'):
+                if shadow_selectors:
+                    pipeline_stats['shadow_signals'] = self._record_shadow_signals(shadow_selectors)
+                self.shadow_book.update_prices(scan_prices)
             
             # Eski sinyalleri temizle (24 saatten eski)
-            self._cleanup_old_signals()
+            with scan_tracer.span('cleanup', 'signals'):
+                self._cleanup_old_signals()
+            
+            if persist:
+                with scan_tracer.span('persistence', 'storage', signals=len(self.store)):
+                    persist()
             
             print(f"🎯 {len(new_signals)} yeni sinyal üretildi")
             
+            if trace:
+                trace.finish(new_signals=len(new_signals), **{
+                    k: pipeline_stats[k] for k in ('fetched', 'analyzed', 'cancelled', 'skipped', 'cancel_reason')
+                })
+            
             return {
+                'trace_id': trace.trace_id if trace else None,
                 'new_signals': len(new_signals),
-                'total_signals': len(self.signals),
+                'signals': new_signals,
+                'total_signals': len(self.store),
                 'analysis_results': analysis_results,
+                'pipeline_stats': pipeline_stats,
+                'worker_stats': worker_stats,
+                'partial': pipeline_stats['cancel_reason'] is not None,
                 'success': True
             }
             
         except Exception as e:
             print(f"❌ Sinyal üretme hatası: {e}")
-            return {'new_signals': 0, 'total_signals': len(self.signals), 'success': False}
+            return {'new_signals': 0, 'total_signals': len(self.store), 'success': False}
+        finally:
+            scan_tracer.bind(None)
+    
+    def _traced_fetch(self, trace, symbol: str, prices: Dict[str, float]) -> Optional[Dict[str, any]]:
+        """Pipeline fetch aşaması: izi thread'e bağla ve coin verisini al"""
+        scan_tracer.bind(trace)
+        with scan_tracer.span('fetch', 'fetch', coin=symbol):
+            payload = self._fetch_coin_data(symbol, prices)
+        if payload is not None:
+            payload['_fetched_at'] = time.perf_counter()
+        return payload
+    
+    def _traced_analyze(self, trace, symbol: str, payload: Dict[str, any]) -> Optional[Dict[str, any]]:
+        """Pipeline analiz aşaması: kuyruk beklemesini kaydet ve analiz et"""
+        scan_tracer.bind(trace)
+        fetched_at = payload.pop('_fetched_at', None)
+        if trace and fetched_at:
+            trace.add('queue_wait', 'queue', fetched_at, time.perf_counter(),
+                      {'coin': symbol, 'stage': 'analysis'})
+        
+        with scan_tracer.span('analysis', 'analysis', coin=symbol):
+            result = self._analyze_coin_data(symbol, payload, score=False)
+        if result is not None:
+            result['_analyzed_at'] = time.perf_counter()
+        return result
+    
+    @property
+    def signals(self) -> List[Dict[str, any]]:
+        """Depodaki aktif sinyaller (canlı nesneler)"""
+        return self.store.values()
+    
+    def cancel_scan(self, reason: str = 'stopped') -> int:
+        """
+        Devam eden taramaları iptal et (kısmi sonuçlar yine işlenir)
+        
+        Returns:
+            İptal edilen tarama sayısı
+        """
+        with self._tokens_lock:
+            tokens = list(self._active_tokens)
+        for token in tokens:
+            token.cancel(reason)
+        if tokens:
+            print(f"🛑 {len(tokens)} tarama iptal edildi ({reason})")
+        return len(tokens)
+    
+    def _rank_key(self, analysis_data: Dict) -> Tuple[float, float]:
+        """
+        Aday sıralama anahtarı: (güven, risk/ödül)
+        
+        Risk/ödül TP2'ye göre hesaplanır; ödül yoldaki ilk karşı destek/direnç
+        seviyesiyle sınırlanır.
+        """
+        entry_price = analysis_data.get('current_price')
+        direction = analysis_data['signal']
+        if not entry_price or direction not in ('LONG', 'SHORT'):
+            return float(analysis_data['confidence']), 0.0
+        
+        _, tp2, sl = self._calculate_targets_and_stops(entry_price, direction, analysis_data)
+        rr = risk_reward_ratio(entry_price, direction, tp2, sl, analysis_data.get('timeframe_analyses', {}))
+        return float(analysis_data['confidence']), round(rr, 4)
+    
+    def next_scan_symbols(self, coin_count: Optional[int] = None) -> List[str]:
+        """Bir sonraki taramanın coinleri, analiz sırasıyla (ön yükleme için)"""
+        filtered_coins = self._get_universe()
+        if not filtered_coins:
+            return []
+        return self.scan_queue.prioritize(filtered_coins, coin_count)
+    
+    def _get_universe(self) -> List[Dict[str, any]]:
+        """Filtrelenmiş coin evrenini al (universe_ttl süresince önbellekte)"""
+        now = time.time()
+        if self._universe_cache and now - self._universe_cached_at < self.universe_ttl:
+            return self._universe_cache
+        
+        coins = self.coin_filter.get_filtered_coins(limit=self.universe_size)
+        if coins:
+            self._universe_cache = coins
+            self._universe_cached_at = now
+        return coins
+    
+    def _fetch_scan_prices(self, coins: List[Dict[str, any]], symbols: List[str]) -> Dict[str, float]:
+        """
+        Taranacak tüm coinlerin son fiyatlarını tek toplu istekle al
+        
+        Returns:
+            Küçük harf sembol -> fiyat
+        """
+        try:
+            wanted = set(symbols)
+            symbol_to_id = {
+                self._coin_symbol(coin): coin['id']
+                for coin in coins
+                if isinstance(coin, dict) and coin.get('id') and self._coin_symbol(coin) in wanted
+            }
+            prices_by_id = coin_gecko_service.get_coin_prices(list(symbol_to_id.values()))
+            
+            return {
+                symbol.lower(): prices_by_id[coin_id]
+                for symbol, coin_id in symbol_to_id.items()
+                if prices_by_id.get(coin_id)
+            }
+        except Exception as e:
+            print(f"❌ Toplu fiyat alma hatası: {e}")
+            return {}
     
     def _analyze_coin_comprehensive(self, symbol: str) -> Optional[Dict[str, any]]:
         """
@@ -105,6 +395,22 @@ class AdvancedSignalGenerator:
         Returns:
             Analiz sonuçları
         """
+        payload = self._fetch_coin_data(symbol)
+        if payload is None:
+            return None
+        return self._analyze_coin_data(symbol, payload)
+    
+    def _fetch_coin_data(self, symbol: str, prices: Optional[Dict[str, float]] = None) -> Optional[Dict[str, any]]:
+        """
+        Analiz için gereken verileri al (pipeline'ın I/O aşaması)
+        
+        Args:
+            symbol: Coin sembolü
+            prices: Taramanın toplu fiyatları (küçük harf sembol -> fiyat)
+            
+        Returns:
+            Timeframe verileri ve son fiyat
+        """
         try:
             # Multi-timeframe veri al
             timeframe_data = chart_data_service.get_multiple_timeframes(
@@ -115,66 +421,385 @@ class AdvancedSignalGenerator:
                 print(f"❌ {symbol} için grafik verisi alınamadı")
                 return None
             
-            # Her timeframe için analiz
-            timeframe_analyses = {}
-            all_signals = []
-            confidence_scores = []
+            # Son fiyat: taramanın toplu fiyatları, yoksa tekil istek
+            current_price = (prices or {}).get(symbol.lower())
+            if not current_price:
+                current_price = chart_data_service.get_latest_price(symbol)
             
-            for tf, df in timeframe_data.items():
-                try:
-                    # Pattern recognition
-                    pattern_analysis = pattern_recognition_service.analyze_patterns(df)
-                    
-                    # Technical indicators
-                    technical_analysis = technical_analysis_service.analyze_indicators(df)
-                    
-                    # Timeframe analizi birleştir
-                    tf_analysis = {
-                        'timeframe': tf,
-                        'pattern': pattern_analysis,
-                        'technical': technical_analysis,
-                        'data_points': len(df)
-                    }
-                    
-                    timeframe_analyses[tf] = tf_analysis
-                    
-                    # Sinyalleri topla
-                    if pattern_analysis['signal'] != 'HOLD':
-                        all_signals.append(pattern_analysis['signal'])
-                        confidence_scores.append(pattern_analysis['confidence'])
-                    
-                    if technical_analysis['signal'] != 'HOLD':
-                        all_signals.append(technical_analysis['signal'])
-                        confidence_scores.append(technical_analysis['confidence'])
-                    
-                    print(f"  📈 {tf}: Pattern={pattern_analysis['signal']} (%{pattern_analysis['confidence']}), Technical={technical_analysis['signal']} (%{technical_analysis['confidence']})")
-                    
-                except Exception as e:
-                    print(f"❌ {symbol} {tf} analiz hatası: {e}")
-                    continue
+            return {
+                'timeframe_data': timeframe_data,
+                'current_price': current_price
+            }
             
-            # Final sinyal hesapla
-            final_signal, final_confidence = self._calculate_multi_timeframe_signal(
-                all_signals, confidence_scores, timeframe_analyses
-            )
+        except ScanCancelled:
+            raise
+        except Exception as e:
+            print(f"❌ {symbol} veri alma hatası: {e}")
+            return None
+    
+    def _analyze_coin_data(self, symbol: str, payload: Dict[str, any], score: bool = True) -> Optional[Dict[str, any]]:
+        """
+        Alınmış veriler üzerinde analiz (pipeline'ın CPU aşaması)
+        
+        Args:
+            symbol: Coin sembolü
+            payload: _fetch_coin_data çıktısı
+            score: False ise final sinyal hesaplanmaz (toplu skorlama için
+                signal/confidence None döner)
+            
+        Returns:
+            Analiz sonuçları
+        """
+        try:
+            timeframe_data = payload['timeframe_data']
             
-            # Son fiyatı al
-            current_price = chart_data_service.get_latest_price(symbol)
+            # Formasyonlar artımlı motordan (durum bu process'te tutulur)
+            with scan_tracer.span('formations', 'patterns', coin=symbol):
+                formations = {
+                    tf: incremental_pattern_engine.sync(symbol, tf, df, pattern_recognition_service.tolerance)
+                    for tf, df in timeframe_data.items()
+                }
             
-            return {
+            # Kapanmamış timeframe'ler önbellekten, kapananlar yeniden analiz
+            timeframe_analyses, stale = self._get_cached_analyses(symbol, timeframe_data)
+            if stale:
+                # Pattern + teknik analiz (inline veya process pool)
+                fresh = self._run_timeframe_analyses(
+                    {tf: timeframe_data[tf] for tf in stale},
+                    {tf: formations[tf] for tf in stale}
+                )
+                self._store_analyses(symbol, timeframe_data, fresh)
+                timeframe_analyses.update(fresh)
+            timeframe_analyses = {
+                tf: timeframe_analyses[tf] for tf in timeframe_data if tf in timeframe_analyses
+            }
+            
+            all_signals = []
+            
+            for tf, tf_analysis in timeframe_analyses.items():
+                pattern_analysis = tf_analysis['pattern']
+                technical_analysis = tf_analysis['technical']
+                
+                # Sinyalleri topla
+                if pattern_analysis['signal'] != 'HOLD':
+                    all_signals.append(pattern_analysis['signal'])
+                
+                if technical_analysis['signal'] != 'HOLD':
+                    all_signals.append(technical_analysis['signal'])
+                
+                print(f"  📈 {symbol} {tf}: Pattern={pattern_analysis['signal']} (%{pattern_analysis['confidence']}), Technical={technical_analysis['signal']} (%{technical_analysis['confidence']})")
+            
+            # Gölge stratejilerin farklı formasyon toleransları (yalnızca CPU); gölge
+            # yolundaki bir hata birincil sinyali engellememeli
+            try:
+                variant_analyses = {}
+                for tolerance in self.shadow_book.tolerance_variants(pattern_recognition_service.tolerance):
+                    variant_analyses[tolerance] = self._get_variant_analyses(
+                        symbol, timeframe_data, timeframe_analyses, tolerance
+                    )
+            except ScanCancelled:
+                raise
+            except Exception as e:
+                print(f"❌ {symbol} gölge strateji analiz hatası: {e}")
+                variant_analyses = {}
+            
+            result = {
                 'symbol': symbol,
-                'signal': final_signal,
-                'confidence': final_confidence,
-                'current_price': current_price,
+                'signal': None,
+                'confidence': None,
+                'current_price': payload.get('current_price'),
                 'timeframe_analyses': timeframe_analyses,
                 'total_signals': len(all_signals),
-                'analysis_summary': self._generate_analysis_summary(timeframe_analyses, final_signal)
+                'analysis_summary': '',
+                'variant_analyses': variant_analyses
             }
             
+            # Final sinyal hesapla
+            if score:
+                self._score_results([result])
+            
+            return result
+            
+        except ScanCancelled:
+            raise
         except Exception as e:
             print(f"❌ {symbol} kapsamlı analiz hatası: {e}")
             return None
     
+    def _get_cached_analyses(self, symbol: str, timeframe_data: Dict,
+                             variant: Optional[float] = None) -> Tuple[Dict[str, Dict], List[str]]:
+        """
+        Mumu kapanmamış timeframe'ler için önbellekteki analizleri döner
+        
+        Bir kayıt, analiz edildiği mumun kapanışına kadar ve aynı son mum
+        zaman damgası için geçerlidir.
+        
+        Args:
+            symbol: Coin sembolü
+            timeframe_data: Timeframe -> DataFrame
+            variant: Gölge strateji formasyon toleransı (None = birincil analiz)
+        
+        Returns:
+            (önbellekten gelen analizler, yeniden analiz edilecek timeframe'ler)
+        """
+        now = time.time()
+        cached = {}
+        stale = []
+        
+        with self._analysis_cache_lock:
+            for tf, df in timeframe_data.items():
+                entry = self._analysis_cache.get(self._analysis_cache_key(symbol, tf, variant))
+                if (entry is not None and now < entry['expires_at'] and
+                        entry['last_timestamp'] == self._last_timestamp(df)):
+                    cached[tf] = entry['analysis']
+                else:
+                    stale.append(tf)
+            self._analysis_cache_stats['reused'] += len(cached)
+            self._analysis_cache_stats['computed'] += len(stale)
+        
+        return cached, stale
+    
+    def _store_analyses(self, symbol: str, timeframe_data: Dict, analyses: Dict[str, Dict],
+                        variant: Optional[float] = None):
+        """Yeni analizleri timeframe'in bir sonraki mum kapanışına kadar önbelleğe al"""
+        now = time.time()
+        with self._analysis_cache_lock:
+            for tf, analysis in analyses.items():
+                self._analysis_cache[self._analysis_cache_key(symbol, tf, variant)] = {
+                    'analysis': analysis,
+                    'last_timestamp': self._last_timestamp(timeframe_data[tf]),
+                    'expires_at': next_candle_close(tf, now)
+                }
+    
+    def _analysis_cache_key(self, symbol: str, tf: str, variant: Optional[float] = None) -> Tuple:
+        """Analiz önbelleği anahtarı"""
+        return (symbol, tf) if variant is None else (symbol, tf, variant)
+    
+    def _get_variant_analyses(self, symbol: str, timeframe_data: Dict, timeframe_analyses: Dict,
+                              tolerance: float) -> Dict[str, Dict]:
+        """Gölge strateji toleransıyla pattern analizi (kapanmamış timeframe'ler önbellekten)"""
+        cached, stale = self._get_cached_analyses(symbol, timeframe_data, tolerance)
+        if stale:
+            # Formasyonlar birincil analizle aynı artımlı durumdan, bu toleransla okunur
+            formations = {
+                tf: incremental_pattern_engine.sync(symbol, tf, timeframe_data[tf], tolerance)
+                for tf in stale
+            }
+            fresh = analysis_workers.analyze_pattern_variant(
+                {tf: timeframe_data[tf] for tf in stale},
+                {tf: timeframe_analyses[tf] for tf in stale if tf in timeframe_analyses},
+                tolerance,
+                formations
+            )
+            self._store_analyses(symbol, timeframe_data, fresh, tolerance)
+            cached.update(fresh)
+        return {tf: cached[tf] for tf in timeframe_analyses if tf in cached}
+    
+    def _score_shadows(self, results: List[Dict[str, any]], strategies: List[Dict[str, any]],
+                       selectors: Dict[str, TopKSelector]):
+        """
+        Gölge stratejileri aynı analizler üzerinde skorla ve adaylarını seç
+        
+        Args:
+            results: _analyze_coin_data(score=False) çıktıları
+            strategies: Gölge strateji konfigürasyonları
+            selectors: Strateji adı -> top-K seçici
+        """
+        if not results:
+            return
+        
+        for config in strategies:
+            try:
+                tolerance = config['tolerance']
+                analyses = [
+                    r.get('variant_analyses', {}).get(tolerance, r['timeframe_analyses'])
+                    for r in results
+                ]
+                scored = self.scorer.score_analyses(
+                    analyses, self.timeframes, config['timeframe_weights'] or self.timeframe_weights
+                )
+                min_confidence = config['min_confidence']
+                if min_confidence is None:
+                    min_confidence = self.min_confidence
+                
+                for result, tf_analyses, (signal, confidence) in zip(results, analyses, scored):
+                    if confidence < min_confidence:
+                        continue
+                    shadow_data = {
+                        **{k: v for k, v in result.items() if k != 'variant_analyses'},
+                        'signal': signal,
+                        'confidence': confidence,
+                        'timeframe_analyses': tf_analyses
+                    }
+                    selectors[config['name']].push(self._rank_key(shadow_data), result['symbol'], shadow_data)
+            except Exception as e:
+                print(f"❌ {config['name']} gölge strateji skorlama hatası: {e}")
+    
+    def _record_shadow_signals(self, selectors: Dict[str, TopKSelector]) -> Dict[str, int]:
+        """Gölge stratejilerin seçtiği adaylardan varsayımsal sinyaller oluştur"""
+        opened = {}
+        for name, selector in selectors.items():
+            candidates = []
+            for rank_key, symbol, shadow_data in selector.results():
+                shadow_data['analysis_summary'] = self._generate_analysis_summary(
+                    shadow_data['timeframe_analyses'], shadow_data['signal']
+                )
+                signal = self._create_signal_from_analysis(symbol, shadow_data)
+                if signal:
+                    signal['risk_reward'] = round(rank_key[1], 2)
+                    candidates.append((rank_key, symbol, signal))
+            opened[name] = self.shadow_book.record_scan(name, candidates)
+            print(f"👥 {name}: {selector.seen} aday, {opened[name]} gölge sinyal")
+        return opened
+    
+    def _last_timestamp(self, df) -> Optional[str]:
+        """DataFrame'deki son mumun zaman damgası"""
+        if 'timestamp' not in df.columns or len(df) == 0:
+            return None
+        return str(df['timestamp'].iloc[-1])
+    
+    def _collect_analysis_cache_stats(self) -> Dict[str, int]:
+        """Tarama boyunca önbellekten dönen/yeniden hesaplanan analiz sayıları (sayaçlar sıfırlanır)"""
+        with self._analysis_cache_lock:
+            stats = self._analysis_cache_stats
+            self._analysis_cache_stats = {'reused': 0, 'computed': 0}
+            
+            # Süresi dolmuş kayıtları temizle
+            now = time.time()
+            for key in [k for k, v in self._analysis_cache.items() if v['expires_at'] <= now]:
+                del self._analysis_cache[key]
+        return stats
+    
+    def _run_timeframe_analyses(self, timeframe_data: Dict, formations: Dict) -> Dict[str, Dict]:
+        """
+        Timeframe analizlerini çalıştır
+        
+        analysis_processes > 0 ise iş process pool'a kompakt dizi payload'ları
+        olarak gönderilir; değilse bu thread'de çalışır.
+        
+        Args:
+            timeframe_data: Timeframe -> DataFrame
+            formations: Timeframe -> artımlı formasyonlar
+            
+        Returns:
+            Timeframe -> analiz
+        """
+        start = time.perf_counter()
+        
+        executor = self._get_analysis_executor()
+        if executor is None:
+            analyses = analysis_workers.analyze_frames(timeframe_data, formations)
+            worker = f"thread-{threading.current_thread().name}"
+            busy = time.perf_counter() - start
+        else:
+            payloads = {tf: analysis_workers.frame_to_payload(df) for tf, df in timeframe_data.items()}
+            token = current_token()
+            trace = scan_tracer.current()
+            try:
+                with scan_tracer.span('process_pool', 'analysis', timeframes=len(payloads)):
+                    future = executor.submit(
+                        analysis_workers.analyze_payloads, payloads, formations, trace is not None
+                    )
+                    analyses, pid, busy, events = future.result(timeout=token.remaining() if token else None)
+                if trace and events:
+                    trace.merge(events)
+                worker = f"process-{pid}"
+            except FutureTimeoutError:
+                # Deadline doldu: henüz başlamadıysa işi kuyruktan çek
+                future.cancel()
+                raise ScanCancelled('deadline')
+            except BrokenProcessPool as e:
+                # Pool kullanılamaz hale geldi: inline çalışmaya dön
+                print(f"❌ Analiz process pool hatası, inline analize geçiliyor: {e}")
+                self.analysis_processes = 0
+                self.shutdown_analysis_pool()
+                return self._run_timeframe_analyses(timeframe_data, formations)
+        
+        with self._worker_stats_lock:
+            stats = self._worker_stats.setdefault(worker, {'tasks': 0, 'busy_time': 0.0})
+            stats['tasks'] += 1
+            stats['busy_time'] += busy
+        
+        return analyses
+    
+    def _get_analysis_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Process pool'u ilk kullanımda oluştur"""
+        if self.analysis_processes <= 0:
+            return None
+        
+        with self._worker_stats_lock:
+            if self._analysis_executor is None:
+                self._analysis_executor = ProcessPoolExecutor(
+                    max_workers=self.analysis_processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=analysis_workers.init_worker
+                )
+                print(f"⚙️ Analiz process pool başlatıldı ({self.analysis_processes} worker)")
+            return self._analysis_executor
+    
+    def shutdown_analysis_pool(self):
+        """Process pool'u kapat"""
+        if self._analysis_executor is not None:
+            self._analysis_executor.shutdown(wait=False, cancel_futures=True)
+            self._analysis_executor = None
+    
+    def _collect_worker_stats(self, wall_time: float) -> List[Dict[str, any]]:
+        """Tarama boyunca worker başına throughput'u döner ve sayaçları sıfırlar"""
+        with self._worker_stats_lock:
+            stats = self._worker_stats
+            self._worker_stats = {}
+        
+        return [
+            {
+                'worker': worker,
+                'tasks': data['tasks'],
+                'busy_time': round(data['busy_time'], 3),
+                'coins_per_sec': round(data['tasks'] / data['busy_time'], 2) if data['busy_time'] > 0 else 0,
+                'utilization': round(data['busy_time'] / wall_time, 2) if wall_time > 0 else 0
+            }
+            for worker, data in sorted(stats.items())
+        ]
+    
+    def _score_results(self, results: List[Dict[str, any]]) -> List[Dict[str, any]]:
+        """
+        Analiz sonuçlarının final sinyal ve güvenini toplu hesapla
+        
+        Vektörel skorlayıcı başarısız olursa coin başına yola döner.
+        
+        Args:
+            results: _analyze_coin_data(score=False) çıktıları
+            
+        Returns:
+            signal, confidence ve analysis_summary doldurulmuş aynı liste
+        """
+        if not results:
+            return results
+        
+        try:
+            scored = self.scorer.score_analyses(
+                [r['timeframe_analyses'] for r in results], self.timeframes, self.timeframe_weights
+            )
+        except Exception as e:
+            print(f"❌ Toplu skorlama hatası, coin başına hesaplanıyor: {e}")
+            scored = []
+            for r in results:
+                signals = [
+                    a[source]['signal']
+                    for a in r['timeframe_analyses'].values()
+                    for source in ('pattern', 'technical')
+                    if a[source]['signal'] != 'HOLD'
+                ]
+                scored.append(self._calculate_multi_timeframe_signal(
+                    signals, [], r['timeframe_analyses']
+                ))
+        
+        for result, (final_signal, final_confidence) in zip(results, scored):
+            result['signal'] = final_signal
+            result['confidence'] = final_confidence
+            result['analysis_summary'] = self._generate_analysis_summary(result['timeframe_analyses'], final_signal)
+        
+        return results
+    
     def _calculate_multi_timeframe_signal(self, signals: List[str], confidences: List[int], 
                                         timeframe_analyses: Dict) -> Tuple[str, int]:
         """
@@ -192,13 +817,7 @@ class AdvancedSignalGenerator:
             if not signals:
                 return 'HOLD', 50
             
-            # Timeframe ağırlıkları (uzun vadeli daha önemli)
-            timeframe_weights = {
-                '15m': 1.0,
-                '1h': 1.2,
-                '4h': 1.5,
-                '1d': 2.0
-            }
+            timeframe_weights = self.timeframe_weights
             
             weighted_long = 0
             weighted_short = 0
@@ -411,65 +1030,68 @@ class AdvancedSignalGenerator:
         except Exception as e:
             return f"Kapsamlı teknik analiz tamamlandı. {final_signal} sinyali tespit edildi."
     
+    def ensure_expiry_timer(self):
+        """Sona erme zamanlayıcısını bu süreçte başlat (çalışıyorsa bir şey yapmaz)"""
+        self.expiry.start()
+    
     def _cleanup_old_signals(self):
-        """24 saatten eski sinyalleri temizle"""
+        """Süresi dolmuş sinyalleri temizle (zamanlayıcının kaçırdıkları için)"""
         try:
-            current_time = datetime.now()
-            cutoff_time = current_time - timedelta(hours=24)
-            
-            active_signals = []
-            closed_signals = []
-            
-            for signal in self.signals:
-                created_at = datetime.fromisoformat(signal['created_at'])
-                
-                if created_at > cutoff_time:
-                    active_signals.append(signal)
-                else:
-                    # Eski sinyali kapalı sinyallere taşı
-                    signal['status'] = 'EXPIRED'
-                    signal['closed_at'] = current_time.isoformat()
-                    closed_signals.append(signal)
-            
-            # Kapalı sinyalleri geçmişe ekle
-            self.signal_history.extend(closed_signals)
-            
-            # Aktif sinyalleri güncelle
-            self.signals = active_signals
-            
-            if closed_signals:
-                print(f"🧹 {len(closed_signals)} eski sinyal temizlendi")
-                
+            self.ensure_expiry_timer()
+            self.expiry.run_due()
         except Exception as e:
             print(f"❌ Sinyal temizleme hatası: {e}")
     
+    @staticmethod
+    def _owns(signal: Dict[str, any]) -> bool:
+        """Sinyal bu üreticinin mi (ortak depodaki eski sinyaller hariç)"""
+        return signal.get('analysis_type') == 'ADVANCED_TECHNICAL'
+    
+    def _on_store_event(self, event: str, signal: Dict[str, any]):
+        """Depo değişikliklerini sona erme indeksine yansıt"""
+        if event == 'remove':
+            self.expiry.cancel(signal['id'])
+        elif self._owns(signal):
+            self.expiry.schedule(signal['id'], signal['opened_at'] + self.signal_ttl)
+    
+    def _expire_signals(self, signal_ids: List[str]):
+        """Süresi dolan sinyalleri depodan çıkarıp geçmişe taşı (son fiyattan kapanış)"""
+        expired = 0
+        for signal_id in signal_ids:
+            signal = self.store.remove(signal_id)
+            if signal is not None:
+                self._record_close(signal, 'EXPIRED', 'expired',
+                                   signal.get('current_price') or signal['entry_price'])
+                expired += 1
+        
+        if expired:
+            print(f"🧹 {expired} eski sinyal temizlendi")
+    
     def update_signal_prices(self):
         """Aktif sinyallerin fiyatlarını güncelle"""
         try:
-            for signal in self.signals:
+            # Sembol başına tek fiyat isteği; son kontrolden bu yana mumlar fitillerdeki TP/SL için
+            self.ensure_expiry_timer()
+            checked_at = time.time()
+            prices = {}
+            ranges = {}
+            signals = self.signals
+            for symbol in {s['coin_symbol'] for s in signals}:
                 try:
-                    symbol = signal['symbol']
                     current_price = chart_data_service.get_latest_price(symbol)
-                    
                     if current_price:
-                        signal['current_price'] = current_price
-                        
-                        # PnL hesapla
-                        entry_price = signal['entry_price']
-                        direction = signal['direction']
-                        
-                        if direction == 'LONG':
-                            pnl_percent = ((current_price - entry_price) / entry_price) * 100
-                        else:  # SHORT
-                            pnl_percent = ((entry_price - current_price) / entry_price) * 100
-                        
-                        signal['pnl_percent'] = round(pnl_percent, 2)
-                        
-                        # TP/SL kontrolü
-                        self._check_tp_sl_hit(signal)
-                        
+                        prices[symbol.lower()] = current_price
+                        tick_buffer.record(symbol, current_price)
+                    if self.intrabar_checks:
+                        ranges[symbol.lower()] = chart_data_service.get_intrabar_ranges(symbol, self._last_price_check)
                 except Exception as e:
-                    print(f"❌ {signal.get('symbol', 'Unknown')} fiyat güncelleme hatası: {e}")
+                    print(f"❌ {symbol} fiyat güncelleme hatası: {e}")
+            self._last_price_check = checked_at
+            
+            # PnL ve TP/SL tüm sinyaller için tek vektörel geçişte
+            result = pnl_engine.update(signals, prices, 'legacy', ranges=ranges, book='advanced')
+            for signal, reason, close_price in result['hits']:
+                self._close_signal(signal, reason, close_price)
                     
         except Exception as e:
             print(f"❌ Sinyal fiyat güncelleme hatası: {e}")
@@ -477,38 +1099,35 @@ class AdvancedSignalGenerator:
     def _check_tp_sl_hit(self, signal: Dict):
         """TP veya SL'ye değip değmediğini kontrol et"""
         try:
-            current_price = signal['current_price']
-            direction = signal['direction']
-            tp1 = signal.get('tp1')
-            tp2 = signal.get('tp2')
-            sl = signal.get('sl')
-            
-            if direction == 'LONG':
-                # LONG pozisyon için TP/SL kontrolü
-                if sl and current_price <= sl:
-                    signal['status'] = 'CLOSED_SL'
-                    signal['closed_at'] = datetime.now().isoformat()
-                elif tp2 and current_price >= tp2:
-                    signal['status'] = 'CLOSED_TP2'
-                    signal['closed_at'] = datetime.now().isoformat()
-                elif tp1 and current_price >= tp1:
-                    signal['status'] = 'CLOSED_TP1'
-                    signal['closed_at'] = datetime.now().isoformat()
-            else:  # SHORT
-                # SHORT pozisyon için TP/SL kontrolü
-                if sl and current_price >= sl:
-                    signal['status'] = 'CLOSED_SL'
-                    signal['closed_at'] = datetime.now().isoformat()
-                elif tp2 and current_price <= tp2:
-                    signal['status'] = 'CLOSED_TP2'
-                    signal['closed_at'] = datetime.now().isoformat()
-                elif tp1 and current_price <= tp1:
-                    signal['status'] = 'CLOSED_TP1'
-                    signal['closed_at'] = datetime.now().isoformat()
-                    
+            reason = pnl_engine.check(signal, signal['current_price'], 'legacy')
+            if reason:
+                self._close_signal(signal, reason, signal['current_price'])
         except Exception as e:
             print(f"❌ TP/SL kontrol hatası: {e}")
     
+    def _close_signal(self, signal: Dict, reason: str, close_price: float):
+        """Sinyali depodan çıkarıp geçmişe taşı (PnL kapanış fiyatından)"""
+        # Başka bir güncelleme yolu zaten kapattıysa atla
+        if self.store.remove(signal['id']) is None:
+            return
+        self._record_close(signal, 'CLOSED', reason, close_price)
+    
+    def _record_close(self, signal: Dict, status: str, reason: str, close_price: float):
+        """Kapanışı üreticinin geçmişine ve kalıcı geçmişe yaz"""
+        pnl_percentage, pnl_usd = portfolio_simulator.trade_pnl(signal['direction'], signal['entry_price'], close_price)
+        
+        self.signal_history.append({
+            **signal,
+            'status': status,
+            'close_reason': reason,
+            'close_price': close_price,
+            'pnl_percentage': round(pnl_percentage, 2) + 0.0,
+            'pnl_usd': round(pnl_usd, 2) + 0.0,
+            'closed_at': datetime.now().isoformat()
+        })
+        if self.history_sink is not None:
+            self.history_sink(signal, reason, close_price)
+    
     def get_signals(self) -> List[Dict[str, any]]:
         """Aktif sinyalleri getir"""
         return self.signals
@@ -520,16 +1139,18 @@ class AdvancedSignalGenerator:
     def get_performance_stats(self) -> Dict[str, any]:
         """Performans istatistiklerini getir"""
         try:
-            total_signals = len(self.signals) + len(self.signal_history)
-            active_signals = len(self.signals)
+            # Ortak depodaki gelişmiş sinyaller
+            signals = [s for s in self.signals if s.get('analysis_type') == 'ADVANCED_TECHNICAL']
+            total_signals = len(signals) + len(self.signal_history)
+            active_signals = len(signals)
             closed_signals = len(self.signal_history)
             
             # PnL hesapla
-            total_pnl = sum(signal.get('pnl_percent', 0) for signal in self.signals)
-            avg_pnl = total_pnl / len(self.signals) if self.signals else 0
+            total_pnl = sum(signal.get('pnl_percentage', 0) for signal in signals)
+            avg_pnl = total_pnl / len(signals) if signals else 0
             
             # Başarı oranı (kapalı sinyaller için)
-            profitable_signals = len([s for s in self.signal_history if s.get('pnl_percent', 0) > 0])
+            profitable_signals = len([s for s in self.signal_history if s.get('pnl_percentage', 0) > 0])
             success_rate = (profitable_signals / closed_signals * 100) if closed_signals > 0 else 0
             
             return {
@@ -556,6 +1177,12 @@ class AdvancedSignalGenerator:
                 'auto_scanning': False
             }
 
+    def _coin_symbol(self, coin) -> str:
+        """Filtre servisinden gelen coin dictionary'sinden sembolü al"""
+        if isinstance(coin, dict):
+            return coin.get('symbol', '').upper()
+        return str(coin).upper()
+
     def _get_coin_id_from_symbol(self, symbol: str) -> str:
         """
         Symbol'den CoinGecko coin_id'sini al
@@ -0,0 +1,162 @@
+"""
+Analiz Worker'ları
+Pattern ve teknik analizi inline veya process pool içinde çalıştırır
+"""
+
+import os
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from .scan_tracer import scan_tracer, ScanTrace
+
+# Worker-local singleton'lar (her process'te bir kez oluşturulur)
+_pattern_service = None
+_technical_service = None
+
+def init_worker():
+    """Process pool initializer: servisleri worker içinde bir kez yükle"""
+    global _pattern_service, _technical_service
+    from .pattern_recognition_service import pattern_recognition_service
+    from .technical_analysis_service import technical_analysis_service
+    _pattern_service = pattern_recognition_service
+    _technical_service = technical_analysis_service
+
+def frame_to_payload(df: pd.DataFrame) -> Dict[str, any]:
+    """
+    DataFrame'i process'ler arası gönderim için kompakt dizilere çevir
+
+    Pickle edilmiş DataFrame yerine tek bir float64 matris, sütun adları ve
+    int64 zaman damgaları gönderilir.
+    """
+    columns = [c for c in df.columns if c != 'timestamp']
+    payload = {
+        'columns': columns,
+        'values': np.ascontiguousarray(df[columns].to_numpy(dtype=np.float64))
+    }
+    if 'timestamp' in df.columns:
+        payload['timestamp'] = df['timestamp'].values.astype('datetime64[ns]').astype(np.int64)
+    return payload
+
+def payload_to_frame(payload: Dict[str, any]) -> pd.DataFrame:
+    """frame_to_payload çıktısından DataFrame'i geri oluştur"""
+    df = pd.DataFrame(payload['values'], columns=payload['columns'])
+    if 'timestamp' in payload:
+        df.insert(0, 'timestamp', pd.to_datetime(payload['timestamp'], unit='ns'))
+    return df
+
+def analyze_frames(frames: Dict[str, pd.DataFrame],
+                   formations: Optional[Dict[str, List[Dict]]] = None) -> Dict[str, Dict[str, any]]:
+    """
+    Bir coinin tüm timeframe'leri için pattern ve teknik analiz
+
+    Args:
+        frames: Timeframe -> OHLCV + gösterge DataFrame
+        formations: Timeframe -> artımlı motorun formasyonları
+
+    Returns:
+        Timeframe -> {'pattern', 'technical', 'data_points'}
+    """
+    if _pattern_service is None:
+        init_worker()
+
+    formations = formations or {}
+    analyses = {}
+
+    # Mum formasyonları coinin tüm timeframe'leri için tek batch çağrıda. Coinler
+    # pipeline'da (ve process pool'da) ayrı analiz edildiğinden batch coin başınadır.
+    # Son satır henüz kapanmamış mumdur (artımlı motordaki gibi) ve skorlanmaz.
+    closed_frames = {tf: df.iloc[:-1] for tf, df in frames.items() if df is not None and len(df) > 1}
+    with scan_tracer.span('candlesticks', 'patterns', frames=len(closed_frames)):
+        candlestick_hits = _pattern_service.detect_candlestick_patterns(closed_frames)
+
+    for tf, df in frames.items():
+        try:
+            with scan_tracer.span('patterns', 'patterns', timeframe=tf):
+                pattern_analysis = _pattern_service.analyze_patterns(
+                    df, formations.get(tf), candlestick_hits.get(tf)
+                )
+            with scan_tracer.span('technical', 'technical', timeframe=tf):
+                technical_analysis = _technical_service.analyze_indicators(df)
+
+            analyses[tf] = {
+                'timeframe': tf,
+                'pattern': pattern_analysis,
+                'technical': technical_analysis,
+                'data_points': len(df)
+            }
+        except Exception as e:
+            print(f"❌ {tf} analiz hatası: {e}")
+
+    return analyses
+
+def analyze_pattern_variant(frames: Dict[str, pd.DataFrame], analyses: Dict[str, Dict[str, any]],
+                            tolerance: float,
+                            formations: Optional[Dict[str, Optional[List[Dict]]]] = None) -> Dict[str, Dict[str, any]]:
+    """
+    Birincil analizi farklı formasyon toleransıyla yeniden değerlendir
+
+    Yalnızca pattern analizi tekrar çalışır; teknik analiz ve mum formasyonu
+    isabetleri birincil analizden alınır.
+
+    Args:
+        frames: Timeframe -> DataFrame
+        analyses: analyze_frames çıktısı
+        tolerance: Double top/bottom ve baş-omuz toleransı
+        formations: Timeframe -> bu toleransla artımlı motordan okunan
+            formasyonlar (None olan timeframe'ler pencereden taranır)
+
+    Returns:
+        Timeframe -> {'pattern', 'technical', 'data_points'}
+    """
+    if _pattern_service is None:
+        init_worker()
+
+    variant = {}
+    for tf, analysis in analyses.items():
+        df = frames.get(tf)
+        if df is None:
+            continue
+        try:
+            candlesticks = [
+                p for p in analysis['pattern'].get('patterns', []) if p.get('type') == 'candlestick'
+            ]
+            with scan_tracer.span('variant_patterns', 'patterns', timeframe=tf, tolerance=tolerance):
+                variant[tf] = {
+                    **analysis,
+                    'pattern': _pattern_service.analyze_patterns(
+                        df, (formations or {}).get(tf), candlesticks, tolerance
+                    )
+                }
+        except Exception as e:
+            print(f"❌ {tf} varyant analiz hatası: {e}")
+    return variant
+
+def analyze_payloads(payloads: Dict[str, Dict[str, any]],
+                     formations: Optional[Dict[str, List[Dict]]] = None,
+                     traced: bool = False) -> Tuple[Dict[str, Dict], int, float, Optional[Dict]]:
+    """
+    Process pool giriş noktası
+
+    Ana process'in tarama izi worker'a taşınamaz; traced ise span'ler
+    worker'da geçici bir ize yazılır ve sonuçla birlikte geri gönderilir
+    (ana process ScanTrace.merge ile ekler).
+
+    Args:
+        payloads: Timeframe -> frame_to_payload çıktısı
+        formations: Timeframe -> artımlı formasyonlar
+        traced: Span'ler kaydedilsin mi
+
+    Returns:
+        (analizler, worker pid, harcanan CPU süresi, span olayları veya None)
+    """
+    start = time.perf_counter()
+    trace = ScanTrace('worker', 'analysis') if traced else None
+    scan_tracer.bind(trace)
+    try:
+        frames = {tf: payload_to_frame(p) for tf, p in payloads.items()}
+        analyses = analyze_frames(frames, formations)
+    finally:
+        scan_tracer.bind(None)
+    return analyses, os.getpid(), time.perf_counter() - start, trace.export() if trace else None
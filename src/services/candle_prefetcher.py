@@ -0,0 +1,105 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .candle_store import candle_store
+from .chart_data_service import chart_data_service
+from .scan_pipeline import ScanPipeline, CancellationToken
+
+class CandlePrefetcher:
+    """
+    Mum kapanışı öncesi önbellek ısıtıcı
+
+    Kapanıştan kısa süre önce, bir sonraki taramada analiz edilecek coinlerin
+    kapanacak timeframe çerçevelerini (göstergeler dahil) candle store'a
+    yükler. Kapanışta bu çerçevelerin süresi dolar; Binance çerçeveleri için
+    chart data servisi yalnızca son birkaç mumu alıp birleştirir (tam pencere
+    yerine küçük bir istek, kapanan mum kesin değerleriyle). CoinGecko
+    çerçeveleri son mumlarla birleştirilemez ve kapanıştan sonra tamamen
+    yeniden alınmak zorundadır; ısıtmak yalnızca istek harcayacağından,
+    kaynağı CoinGecko olduğu bilinen çerçeveler ısıtılmaz. Isıtma kapanış
+    anında iptal edilir, böylece taramayla yarışmaz.
+    """
+
+    def __init__(self):
+        self.lead_time = 60  # Kapanıştan kaç saniye önce başlanır
+        self.fetch_workers = 2
+        self.limit = 100  # Tarama ile aynı mum sayısı
+
+        self._thread = None
+        self._token = None
+        self._lock = threading.Lock()
+        self.last_stats = None
+
+        print("🔥 Candle Prefetcher başlatıldı")
+
+    def start(self, symbols: List[str], timeframes: List[str], deadline: Optional[float] = None) -> bool:
+        """
+        Arka planda ısıtmayı başlat
+
+        Args:
+            symbols: Öncelik sırasına göre coinler
+            timeframes: Kapanacak timeframe'ler
+            deadline: Isıtmanın kesileceği an (genelde kapanış zamanı)
+
+        Returns:
+            Başlatıldıysa True (önceki ısıtma sürüyorsa False)
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+
+            self._token = CancellationToken(deadline)
+            self._thread = threading.Thread(
+                target=self.prefetch, args=(symbols, timeframes, self._token), daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Süren ısıtmayı iptal et"""
+        with self._lock:
+            if self._token is not None:
+                self._token.cancel('stopped')
+
+    def prefetch(self, symbols: List[str], timeframes: List[str],
+                 token: Optional[CancellationToken] = None) -> Dict[str, any]:
+        """
+        Coinlerin çerçevelerini candle store'a yükle
+
+        Bu mum içinde zaten alınmış çerçeveler ve kaynağı CoinGecko olan
+        çerçeveler (kapanışta tam yeniden alınır) atlanır.
+
+        Returns:
+            Pipeline istatistikleri ve ısıtılan çerçeve sayısı
+        """
+        print(f"🔥 {len(symbols)} coin için {', '.join(timeframes)} verisi önceden alınıyor...")
+        warmed = {'frames': 0}
+
+        def fetch(symbol: str) -> int:
+            now = time.time()
+            cold = []
+            for tf in timeframes:
+                entry = candle_store.peek(symbol, tf)
+                if entry is None:
+                    cold.append(tf)
+                elif entry['expires_at'] <= now and entry['df'].attrs.get('source') == 'binance':
+                    cold.append(tf)
+            if not cold:
+                return 0
+            return len(chart_data_service.get_multiple_timeframes(symbol, cold, limit=self.limit))
+
+        def record(symbol: str, frames: int):
+            warmed['frames'] += frames
+
+        pipeline = ScanPipeline(self.fetch_workers, 1, self.fetch_workers * 2)
+        stats = pipeline.run(symbols, fetch, lambda symbol, frames: frames, record, token)
+        stats['warmed_frames'] = warmed['frames']
+        self.last_stats = stats
+
+        print(f"🔥 Ön yükleme tamamlandı: {warmed['frames']} çerçeve, {stats['wall_time']}s"
+              + (f" ({stats['cancel_reason']})" if stats['cancel_reason'] else ""))
+        return stats
+
+# Singleton instance
+candle_prefetcher = CandlePrefetcher()
@@ -0,0 +1,97 @@
+import heapq
+import time
+from typing import Callable, List, Optional, Tuple
+
+from .candle_store import next_candle_close
+
+class CandleCloseScheduler:
+    """
+    Mum kapanışına hizalı tarama zamanlayıcısı
+
+    Her timeframe'in bir sonraki kapanışı (kapanış zamanı, timeframe)
+    olarak bir min-heap'te tutulur. Mumlar borsalarda UTC epoch'a hizalı
+    olduğundan bir timeframe'in kapanışı tüm coinler için aynı andır; hangi
+    (coin, timeframe) çiftlerinin yeniden analiz edileceğine analiz önbelleği
+    karar verir, kapanmamış timeframe'ler önbellekten döner.
+    """
+
+    def __init__(self, timeframes: List[str], settle_delay: float = 5.0):
+        """
+        Args:
+            timeframes: İzlenecek zaman dilimleri
+            settle_delay: Kapanıştan sonra borsanın yeni mumu yayınlaması için beklenecek süre
+        """
+        self.settle_delay = settle_delay
+        self._heap: List[Tuple[float, str]] = []
+        self._approached = None  # on_approach'un çağrıldığı son kapanış
+        self.reset(timeframes)
+
+    def reset(self, timeframes: List[str]):
+        """Heap'i verilen timeframe'lerin bir sonraki kapanışlarıyla yeniden kur"""
+        now = time.time()
+        self._heap = [(next_candle_close(tf, now), tf) for tf in dict.fromkeys(timeframes)]
+        heapq.heapify(self._heap)
+
+    def next_close(self) -> Optional[Tuple[float, List[str]]]:
+        """
+        Sıradaki kapanış zamanı ve o anda kapanacak timeframe'ler
+
+        Returns:
+            (kapanış epoch, timeframe listesi) veya heap boşsa None
+        """
+        if not self._heap:
+            return None
+        close_time = self._heap[0][0]
+        return close_time, sorted(tf for t, tf in self._heap if t == close_time)
+
+    def seconds_until_next(self) -> Optional[float]:
+        """Sıradaki tetiklemeye kalan süre (settle_delay dahil)"""
+        upcoming = self.next_close()
+        if upcoming is None:
+            return None
+        return max(0.0, upcoming[0] + self.settle_delay - time.time())
+
+    def wait(self, should_continue: Callable[[], bool] = lambda: True,
+             poll_interval: float = 1.0,
+             on_approach: Optional[Callable[[float, List[str]], None]] = None,
+             lead_time: float = 60.0) -> List[str]:
+        """
+        Sıradaki mum kapanışına kadar bekle
+
+        Args:
+            should_continue: False dönerse bekleme kesilir
+            poll_interval: should_continue kontrol aralığı
+            on_approach: Kapanışa lead_time kala bir kez çağrılır
+                (kapanış epoch, kapanacak timeframe'ler)
+            lead_time: on_approach'un kapanıştan kaç saniye önce çağrılacağı
+
+        Returns:
+            Kapanan timeframe'ler (bekleme kesildiyse boş liste)
+        """
+        while self._heap:
+            remaining = self.seconds_until_next()
+            if remaining <= 0:
+                return self._pop_due()
+            if not should_continue():
+                return []
+
+            close_time, closing = self.next_close()
+            if on_approach and self._approached != close_time and close_time - time.time() <= lead_time:
+                self._approached = close_time
+                try:
+                    on_approach(close_time, closing)
+                except Exception as e:
+                    print(f"❌ Kapanış öncesi hazırlık hatası: {e}")
+
+            time.sleep(min(poll_interval, remaining))
+        return []
+
+    def _pop_due(self) -> List[str]:
+        """Zamanı gelen kapanışları çıkar ve bir sonraki kapanışlarını ekle"""
+        now = time.time() - self.settle_delay
+        closed = []
+        while self._heap and self._heap[0][0] <= now:
+            _, tf = heapq.heappop(self._heap)
+            closed.append(tf)
+            heapq.heappush(self._heap, (next_candle_close(tf, now), tf))
+        return sorted(closed)
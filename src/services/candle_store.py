@@ -0,0 +1,162 @@
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+import pandas as pd
+
+# Timeframe -> saniye
+TIMEFRAME_SECONDS = {
+    '1m': 60,
+    '5m': 300,
+    '15m': 900,
+    '1h': 3600,
+    '4h': 14400,
+    '1d': 86400
+}
+
+def timeframe_to_seconds(timeframe: str) -> int:
+    """Timeframe'i saniyeye çevir (bilinmeyen timeframe için 1 saat)"""
+    return TIMEFRAME_SECONDS.get(timeframe, 3600)
+
+def next_candle_close(timeframe: str, now: Optional[float] = None) -> float:
+    """
+    Verilen andan sonraki ilk mum kapanışının epoch zamanı
+
+    Mumlar UTC epoch'a hizalıdır (borsalardaki gibi).
+    """
+    now = time.time() if now is None else now
+    period = timeframe_to_seconds(timeframe)
+    return (int(now // period) + 1) * period
+
+def merge_candles(base: pd.DataFrame, tail: pd.DataFrame, limit: int) -> Optional[pd.DataFrame]:
+    """
+    Önbellekteki çerçeveye yeni alınan son mumları ekle
+
+    Aynı zaman damgalı mumlar yenisiyle değiştirilir (kapanan mumun kesin
+    değerleri). Yalnızca OHLCV sütunları tutulur; göstergeler yeniden
+    hesaplanmalıdır.
+
+    Args:
+        base: Önbellekteki çerçeve
+        tail: Yeni alınan son mumlar
+        limit: Tutulacak mum sayısı
+
+    Returns:
+        Birleşik çerçeve; tail base'e bitişik değilse (arada eksik mum) None
+    """
+    if tail is None or len(tail) == 0 or len(base) == 0:
+        return None
+    if tail['timestamp'].iloc[0] > base['timestamp'].iloc[-1]:
+        return None
+
+    columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+    merged = pd.concat([base[columns], tail[columns]], ignore_index=True)
+    merged = merged.drop_duplicates(subset='timestamp', keep='last')
+    merged = merged.sort_values('timestamp').tail(limit).reset_index(drop=True)
+    merged.attrs = dict(base.attrs)
+    return merged
+
+class CandleStore:
+    """
+    Mum verisi önbelleği
+
+    (symbol, timeframe) başına son alınan DataFrame (göstergeler dahil) o
+    timeframe'in bir sonraki mum kapanışına kadar geçerlidir. Aynı mum
+    içinde tekrarlanan taramalar upstream'e istek atmaz. Aynı anahtar için
+    eşzamanlı istekler tek bir yüklemeye indirgenir.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Dict[str, any]] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        print("🗃️ Candle Store başlatıldı")
+
+    def get(self, symbol: str, timeframe: str, limit: int,
+            loader: Callable[[], Optional[pd.DataFrame]]) -> Optional[pd.DataFrame]:
+        """
+        Önbellekten mum verisi al, yoksa veya süresi dolduysa yükle
+
+        Args:
+            symbol: Coin sembolü
+            timeframe: Zaman dilimi
+            limit: Gereken mum sayısı
+            loader: Önbellek ıskalandığında çağrılan yükleyici
+
+        Returns:
+            DataFrame veya None
+        """
+        key = (symbol, timeframe)
+        cached = self._lookup(key, limit)
+        if cached is not None:
+            return cached
+
+        with self._key_lock(key):
+            # Kilidi beklerken başka bir thread yüklemiş olabilir
+            cached = self._lookup(key, limit)
+            if cached is not None:
+                return cached
+
+            with self._lock:
+                self.misses += 1
+            df = loader()
+            if df is not None:
+                self.put(symbol, timeframe, df, limit)
+            return df
+
+    def put(self, symbol: str, timeframe: str, df: pd.DataFrame, limit: Optional[int] = None):
+        """DataFrame'i bir sonraki mum kapanışına kadar önbelleğe al"""
+        with self._lock:
+            self._entries[(symbol, timeframe)] = {
+                'df': df,
+                'limit': limit if limit is not None else len(df),
+                'fetched_at': time.time(),
+                'expires_at': next_candle_close(timeframe)
+            }
+
+    def peek(self, symbol: str, timeframe: str) -> Optional[Dict[str, any]]:
+        """Süresine bakmadan önbellek kaydını döner"""
+        with self._lock:
+            return self._entries.get((symbol, timeframe))
+
+    def invalidate(self, symbol: str = None, timeframe: str = None):
+        """Önbelleği temizle (parametresiz çağrıda tümü)"""
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            elif timeframe is None:
+                for key in [k for k in self._entries if k[0] == symbol]:
+                    del self._entries[key]
+            else:
+                self._entries.pop((symbol, timeframe), None)
+
+    def get_stats(self) -> Dict[str, any]:
+        """Önbellek istatistikleri"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total * 100, 1) if total else 0
+            }
+
+    def _lookup(self, key: Tuple[str, str], limit: int) -> Optional[pd.DataFrame]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() >= entry['expires_at'] or entry['limit'] < limit:
+                return None
+            self.hits += 1
+            df = entry['df']
+        return df if len(df) <= limit else df.tail(limit).reset_index(drop=True)
+
+    def _key_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+# Singleton instance
+candle_store = CandleStore()
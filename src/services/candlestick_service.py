@@ -0,0 +1,158 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, Hashable, List, Tuple
+
+# Pattern -> (sinyal, güven, açıklama)
+CANDLESTICK_PATTERNS = {
+    'doji': ('HOLD', 50, "Doji - kararsızlık"),
+    'hammer': ('LONG', 65, "Çekiç - düşüş sonrası dönüş"),
+    'inverted_hammer': ('LONG', 60, "Ters çekiç - düşüş sonrası dönüş"),
+    'hanging_man': ('SHORT', 60, "Asılı adam - yükseliş sonrası dönüş"),
+    'shooting_star': ('SHORT', 65, "Kayan yıldız - yükseliş sonrası dönüş"),
+    'bullish_engulfing': ('LONG', 70, "Yükseliş yutan mum"),
+    'bearish_engulfing': ('SHORT', 70, "Düşüş yutan mum"),
+    'bullish_harami': ('LONG', 60, "Yükseliş harami"),
+    'bearish_harami': ('SHORT', 60, "Düşüş harami"),
+    'piercing_line': ('LONG', 65, "Delen çizgi"),
+    'dark_cloud_cover': ('SHORT', 65, "Kara bulut örtüsü"),
+    'morning_star': ('LONG', 75, "Sabah yıldızı"),
+    'evening_star': ('SHORT', 75, "Akşam yıldızı"),
+    'three_white_soldiers': ('LONG', 70, "Üç beyaz asker"),
+    'three_black_crows': ('SHORT', 70, "Üç kara karga"),
+}
+
+class CandlestickService:
+    """
+    Vektörel mum formasyonu kernelleri
+
+    Tüm coin/timeframe çerçeveleri sağa hizalı tek bir (çerçeve x mum)
+    matrisine yığılır ve her formasyon tüm matris üzerinde tek bir NumPy
+    ifadesiyle değerlendirilir. Çerçeve başına Python çağrısı yapılmaz;
+    yalnızca son mumlardaki isabetler Python'a döner.
+    """
+
+    def __init__(self):
+        self.lookback = 3  # Son kaç mumdaki isabetler tutulur
+        self.trend_period = 5  # Dönüş formasyonları için trend karşılaştırma mesafesi
+        self.doji_ratio = 0.1  # Gövde / aralık oranı bunun altında ise doji
+        self.small_body_ratio = 0.3
+        self.long_body_ratio = 0.6
+        self.shadow_ratio = 2.0  # Gölge gövdenin en az 2 katı
+
+        print("🕯️ Candlestick Service başlatıldı")
+
+    def detect_batch(self, frames: Dict[Hashable, pd.DataFrame], lookback: int = None) -> Dict[Hashable, List[Dict[str, any]]]:
+        """
+        Tüm çerçeveler için mum formasyonlarını tek seferde tespit et
+
+        Args:
+            frames: Anahtar (ör. (symbol, timeframe)) -> OHLC DataFrame
+            lookback: Son kaç mumdaki isabetler dönsün
+
+        Returns:
+            Anahtar -> isabet listesi (en yeni mum önce)
+        """
+        lookback = lookback or self.lookback
+        keys = [k for k, df in frames.items() if df is not None and len(df) > 0]
+        results = {k: [] for k in frames}
+        if not keys:
+            return results
+
+        try:
+            width = lookback + max(2, self.trend_period)
+            o, h, l, c = self._stack([frames[k] for k in keys], width)
+            hits = self._evaluate(o, h, l, c)
+
+            for pattern, matrix in hits.items():
+                rows, cols = np.nonzero(matrix[:, -lookback:])
+                signal, confidence, description = CANDLESTICK_PATTERNS[pattern]
+                for row, col in zip(rows, cols):
+                    results[keys[row]].append({
+                        'detected': True,
+                        'pattern': pattern,
+                        'type': 'candlestick',
+                        'signal': signal,
+                        'confidence': confidence,
+                        'bars_ago': int(lookback - 1 - col),
+                        'description': description
+                    })
+
+            for key in keys:
+                results[key].sort(key=lambda x: (x['bars_ago'], -x['confidence']))
+
+            return results
+
+        except Exception as e:
+            print(f"❌ Mum formasyonu tespit hatası: {e}")
+            return results
+
+    def _stack(self, frames: List[pd.DataFrame], width: int) -> Tuple[np.ndarray, ...]:
+        """Çerçevelerin son width mumunu NaN dolgulu, sağa hizalı matrislere yığ"""
+        stacked = np.full((4, len(frames), width), np.nan)
+        for i, df in enumerate(frames):
+            tail = df[['open', 'high', 'low', 'close']].values[-width:].T
+            stacked[:, i, width - tail.shape[1]:] = tail
+        return stacked[0], stacked[1], stacked[2], stacked[3]
+
+    def _evaluate(self, o: np.ndarray, h: np.ndarray, l: np.ndarray, c: np.ndarray) -> Dict[str, np.ndarray]:
+        """Tüm kernelleri matrisler üzerinde çalıştır"""
+        def shift(a: np.ndarray, k: int) -> np.ndarray:
+            out = np.full_like(a, np.nan)
+            out[:, k:] = a[:, :-k]
+            return out
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            body = np.abs(c - o)
+            rng = h - l
+            upper = h - np.maximum(o, c)
+            lower = np.minimum(o, c) - l
+            bull = c > o
+            bear = c < o
+            body_ratio = np.where(rng > 0, body / rng, 0)
+
+            small = body_ratio <= self.small_body_ratio
+            long_ = body_ratio >= self.long_body_ratio
+
+            downtrend = c < shift(c, self.trend_period)
+            uptrend = c > shift(c, self.trend_period)
+
+            o1, c1 = shift(o, 1), shift(c, 1)
+            bull1, bear1 = shift(bull, 1).astype(bool), shift(bear, 1).astype(bool)
+            long1, small1 = shift(long_, 1).astype(bool), shift(small, 1).astype(bool)
+            mid1 = (o1 + c1) / 2
+            o2, c2 = shift(o, 2), shift(c, 2)
+            bull2, bear2 = shift(bull, 2).astype(bool), shift(bear, 2).astype(bool)
+            long2 = shift(long_, 2).astype(bool)
+            mid2 = (o2 + c2) / 2
+
+            # NaN dolgulu shift bool'a True olarak döner; ilgili mum yoksa maskele
+            has1 = ~np.isnan(c1)
+            has2 = ~np.isnan(c2)
+
+            hammer_shape = (lower >= self.shadow_ratio * body) & (upper <= body) & ~(body_ratio <= self.doji_ratio)
+            star_shape = (upper >= self.shadow_ratio * body) & (lower <= body) & ~(body_ratio <= self.doji_ratio)
+
+            hits = {
+                'doji': (rng > 0) & (body_ratio <= self.doji_ratio),
+                'hammer': hammer_shape & downtrend,
+                'hanging_man': hammer_shape & uptrend,
+                'shooting_star': star_shape & uptrend,
+                'inverted_hammer': star_shape & downtrend,
+                'bullish_engulfing': has1 & bear1 & bull & (o <= c1) & (c >= o1) & (body > np.abs(c1 - o1)),
+                'bearish_engulfing': has1 & bull1 & bear & (o >= c1) & (c <= o1) & (body > np.abs(c1 - o1)),
+                'bullish_harami': has1 & bear1 & long1 & bull & small & (o > c1) & (c < o1),
+                'bearish_harami': has1 & bull1 & long1 & bear & small & (o < c1) & (c > o1),
+                'piercing_line': has1 & bear1 & long1 & bull & (o <= c1) & (c > mid1) & (c < o1),
+                'dark_cloud_cover': has1 & bull1 & long1 & bear & (o >= c1) & (c < mid1) & (c > o1),
+                'morning_star': has2 & bear2 & long2 & small1 & bull & (c > mid2),
+                'evening_star': has2 & bull2 & long2 & small1 & bear & (c < mid2),
+                'three_white_soldiers': (has2 & bull2 & bull1 & bull & (c > c1) & (c1 > c2) &
+                                         (o > o1) & (o <= c1) & (o1 > o2) & (o1 <= c2)),
+                'three_black_crows': (has2 & bear2 & bear1 & bear & (c < c1) & (c1 < c2) &
+                                      (o < o1) & (o >= c1) & (o1 < o2) & (o1 >= c2)),
+            }
+
+        return hits
+
+# Singleton instance
+candlestick_service = CandlestickService()
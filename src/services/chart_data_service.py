@@ -3,10 +3,16 @@ import ccxt
 import pandas as pd
 import numpy as np
 import time
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import talib
 
+from .candle_store import candle_store, merge_candles, timeframe_to_seconds
+from .scan_pipeline import ScanCancelled, current_token
+from .scan_tracer import scan_tracer
+from .tick_buffer import tick_buffer
+
 class ChartDataService:
     def __init__(self):
         self.coingecko_base_url = "https://api.coingecko.com/api/v3"
@@ -21,19 +27,47 @@ class ChartDataService:
         # Rate limiting için
         self.last_request_time = 0
         self.rate_limit_delay = 1.5
+        self._rate_limit_lock = threading.Lock()
+        
+        # Kapanış sonrası yenilemede alınacak son mum sayısı
+        self.refresh_candles = 3
+        
+        # Mum içi TP/SL kontrolü için küçük timeframe penceresi (yalnızca Binance veya tick mumları;
+        # CoinGecko OHLC bu pencerede ~30 dakikalık mum döndürür ve istek bütçesini tüketir)
+        self.intrabar_timeframe = '1m'
+        self.intrabar_limit = 60
+        # Tick'ler son kontrolden bu yana bu aralıktan sık ise mumlar tick'lerden kurulur (istek yok)
+        self.intrabar_tick_gap = 90
         
         print("📊 Chart Data Service başlatıldı")
     
     def _rate_limit(self):
-        """Rate limit kontrolü"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        
-        if time_since_last < self.rate_limit_delay:
-            sleep_time = self.rate_limit_delay - time_since_last
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+        """Rate limit kontrolü (fetch worker'ları arasında paylaşılır)"""
+        with self._rate_limit_lock:
+            current_time = time.time()
+            time_since_last = current_time - self.last_request_time
+            
+            if time_since_last < self.rate_limit_delay:
+                sleep_time = self.rate_limit_delay - time_since_last
+                self._sleep(sleep_time)
+            
+            self.last_request_time = time.time()
+    
+    def _sleep(self, seconds: float):
+        """Bekle; tarama iptal edilirse erken uyanıp ScanCancelled fırlatır"""
+        token = current_token()
+        if token is None:
+            time.sleep(seconds)
+        else:
+            token.sleep(seconds)
+    
+    def _request_timeout(self, default: float) -> float:
+        """HTTP zaman aşımı, taramanın deadline'ını aşmayacak şekilde"""
+        token = current_token()
+        remaining = token.remaining() if token else None
+        if remaining is None:
+            return default
+        return max(0.5, min(default, remaining))
     
     def get_ohlcv_data(self, symbol: str, timeframe: str = '1h', limit: int = 100) -> Optional[pd.DataFrame]:
         """
@@ -54,7 +88,10 @@ class ChartDataService:
                 print(f"✅ {symbol} OHLCV verisi CoinGecko'dan alındı ({len(coingecko_data)} mum)")
                 return coingecko_data
             
-            # CoinGecko başarısızsa Binance'i deneyelim
+            # CoinGecko başarısızsa Binance'i deneyelim (tarama iptal edilmediyse)
+            token = current_token()
+            if token:
+                token.check()
             print(f"⚠️ CoinGecko'dan {symbol} verisi alınamadı, Binance deneniyor...")
             binance_data = self._get_binance_ohlcv(symbol, timeframe, limit)
             if binance_data is not None:
@@ -64,6 +101,8 @@ class ChartDataService:
             print(f"❌ {symbol} için OHLCV verisi alınamadı")
             return None
             
+        except ScanCancelled:
+            raise
         except Exception as e:
             print(f"❌ {symbol} OHLCV veri alma hatası: {e}")
             return None
@@ -87,7 +126,7 @@ class ChartDataService:
                 'days': days
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = requests.get(url, params=params, timeout=self._request_timeout(10))
             
             if response.status_code == 200:
                 data = response.json()
@@ -100,11 +139,14 @@ class ChartDataService:
                     
                     # Son limit kadar veri al
                     df = df.tail(limit).reset_index(drop=True)
+                    df.attrs['source'] = 'coingecko'
                     
                     return df
             
             return None
             
+        except ScanCancelled:
+            raise
         except Exception as e:
             print(f"❌ CoinGecko OHLCV hatası: {e}")
             return None
@@ -125,6 +167,7 @@ class ChartDataService:
                 # DataFrame'e çevir
                 df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
                 df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+                df.attrs['source'] = 'binance'
                 
                 return df
             
@@ -280,25 +323,125 @@ class ChartDataService:
         
         results = {}
         
+        token = current_token()
+        
         for tf in timeframes:
+            if token:
+                token.check()
             try:
-                df = self.get_ohlcv_data(symbol, tf, limit)
+                # Aynı mum içindeki tekrar taramalar önbellekten döner
+                with scan_tracer.span('candles', 'fetch', coin=symbol, timeframe=tf):
+                    df = candle_store.get(
+                        symbol, tf, limit,
+                        lambda tf=tf: self._load_timeframe(symbol, tf, limit)
+                    )
                 if df is not None:
-                    # Teknik göstergeleri ekle
-                    df = self.calculate_technical_indicators(df)
                     results[tf] = df
                     print(f"✅ {symbol} {tf} verisi hazır")
                 else:
                     print(f"❌ {symbol} {tf} verisi alınamadı")
-                    
-                # Rate limiting
-                time.sleep(0.5)
                 
+            except ScanCancelled:
+                raise
             except Exception as e:
                 print(f"❌ {symbol} {tf} veri alma hatası: {e}")
         
         return results
     
+    def _load_timeframe(self, symbol: str, timeframe: str, limit: int) -> Optional[pd.DataFrame]:
+        """
+        Upstream'den mum verisi al ve göstergeleri hesapla (önbellek ıskası)
+        
+        Önbellekte süresi dolmuş bir Binance çerçevesi varsa yalnızca son
+        birkaç mum alınıp birleştirilir; yoksa tüm pencere alınır.
+        """
+        df = self._refresh_timeframe(symbol, timeframe, limit)
+        if df is None:
+            with scan_tracer.span('upstream_full', 'fetch', coin=symbol, timeframe=timeframe):
+                df = self.get_ohlcv_data(symbol, timeframe, limit)
+            
+            # Rate limiting
+            with scan_tracer.span('rate_limit_pause', 'fetch', coin=symbol, timeframe=timeframe):
+                self._sleep(0.5)
+        
+        if df is None:
+            return None
+        
+        # Teknik göstergeleri ekle
+        with scan_tracer.span('indicators', 'indicators', coin=symbol, timeframe=timeframe):
+            return self.calculate_technical_indicators(df)
+    
+    def _refresh_timeframe(self, symbol: str, timeframe: str, limit: int) -> Optional[pd.DataFrame]:
+        """Önbellekteki çerçeveyi yalnızca kapanan/son mumlarla güncelle"""
+        previous = candle_store.peek(symbol, timeframe)
+        if previous is None or previous['limit'] < limit:
+            return None
+        
+        base = previous['df']
+        # CoinGecko OHLC ucu az sayıda mum döndüremiyor; yalnızca Binance çerçeveleri
+        if base.attrs.get('source') != 'binance':
+            return None
+        
+        with scan_tracer.span('upstream_tail', 'fetch', coin=symbol, timeframe=timeframe):
+            tail = self._get_binance_ohlcv(symbol, timeframe, self.refresh_candles)
+        merged = merge_candles(base, tail, limit)
+        if merged is not None:
+            print(f"🔁 {symbol} {timeframe} son {len(tail)} mum ile güncellendi")
+        return merged
+    
+    def get_intrabar_ranges(self, symbol: str, since: float) -> List[Tuple[float, float, float]]:
+        """
+        Verilen andan bu yana mumların fiyat aralıkları (mum içi TP/SL kontrolü için)
+        
+        Fiyat güncelleyicinin tick'leri son kontrolden bu yana kesintisizse
+        mumlar tick tamponundan kurulur. Aksi halde Binance 1 dakikalık mumları
+        candle store'dan okunur; süresi dolduysa yalnızca son mumlar alınıp
+        birleştirilir. Binance verisi yoksa tick mumları kullanılır, CoinGecko'ya
+        istek atılmaz. Sinyal başına değil sembol başına istek yapılır.
+        
+        Args:
+            symbol: Coin sembolü
+            since: Son kontrol zamanı (epoch)
+            
+        Returns:
+            [(açılış epoch, low, high)] zaman sırasıyla
+        """
+        try:
+            if self.intrabar_tick_gap and tick_buffer.covers(symbol, since, self.intrabar_tick_gap):
+                return tick_buffer.get_ranges(symbol, since)
+            
+            timeframe = self.intrabar_timeframe
+            df = candle_store.get(
+                symbol, timeframe, self.intrabar_limit,
+                lambda: self._load_bars(symbol, timeframe, self.intrabar_limit)
+            )
+            if df is None or len(df) == 0:
+                return []
+            
+            starts = df['timestamp'].values.astype('datetime64[s]').astype(np.int64).astype(np.float64)
+            period = float(timeframe_to_seconds(timeframe))
+            
+            mask = starts + period > since
+            return list(zip(
+                starts[mask].tolist(),
+                df['low'].values[mask].astype(np.float64).tolist(),
+                df['high'].values[mask].astype(np.float64).tolist()
+            ))
+            
+        except Exception as e:
+            print(f"❌ {symbol} mum içi veri hatası: {e}")
+            return []
+    
+    def _load_bars(self, symbol: str, timeframe: str, limit: int) -> Optional[pd.DataFrame]:
+        """Göstergesiz Binance mum verisi (önbellek ıskası; mümkünse yalnızca son mumlar)"""
+        df = self._refresh_timeframe(symbol, timeframe, limit)
+        if df is None:
+            df = self._get_binance_ohlcv(symbol, timeframe, limit)
+        if df is None and timeframe_to_seconds(timeframe) == tick_buffer.period:
+            # Binance verisi yoksa yerel tick mumları
+            df = tick_buffer.get_candles(symbol)
+        return df
+    
     def get_latest_price(self, symbol: str) -> Optional[float]:
         """Son fiyatı al"""
         try:
@@ -312,7 +455,7 @@ class ChartDataService:
                     'vs_currencies': 'usd'
                 }
                 
-                response = requests.get(url, params=params, timeout=5)
+                response = requests.get(url, params=params, timeout=self._request_timeout(5))
                 if response.status_code == 200:
                     data = response.json()
                     if coin_id in data and 'usd' in data[coin_id]:
@@ -326,6 +469,8 @@ class ChartDataService:
             
             return None
             
+        except ScanCancelled:
+            raise
         except Exception as e:
             print(f"❌ {symbol} son fiyat alma hatası: {e}")
             return None
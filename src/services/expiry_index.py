@@ -0,0 +1,170 @@
+import heapq
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+class ExpiryIndex:
+    """
+    Son kullanma zamanına göre sıralı sinyal indeksi
+
+    Anahtarlar epoch son kullanma zamanıyla bir min-heap'te tutulur; süresi
+    dolanları bulmak O(süresi dolan · log n) maliyetlidir, tüm sinyaller
+    taranmaz. İptal edilen veya yeniden planlanan anahtarların eski girdileri
+    tembel silinir (kayıt jetonu eşleşmeyen girdi heap'ten çıkarken atlanır).
+
+    start() ile açılan zamanlayıcı thread'i bir sonraki son kullanma anına
+    kadar bekler ve süresi dolan anahtarları callback'e verir; böylece sona
+    erme taramaların zamanlamasına bağlı kalmaz. Callback indeks kilidi
+    dışında çağrılır. Thread'ler fork'tan sonra alt süreçte çalışmadığından
+    start() her süreçte ayrı çağrılmalıdır; aynı süreçte tekrar çağrı etkisizdir.
+    """
+
+    def __init__(self, on_expire: Optional[Callable[[List[Hashable]], None]] = None):
+        self.on_expire = on_expire
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._live: Dict[Hashable, Tuple[int, float]] = {}  # Anahtar -> (kayıt jetonu, son kullanma)
+        self._token = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+        self._running = False
+        self._pid = None  # Zamanlayıcıyı başlatan süreç
+        self.stats = {'scheduled': 0, 'expired': 0, 'cancelled': 0, 'stale_skipped': 0}
+
+    def schedule(self, key: Hashable, expires_at: float):
+        """
+        Anahtarı son kullanma zamanıyla kaydet (varsa yeniden planlanır)
+
+        Args:
+            key: Sinyal anahtarı
+            expires_at: Son kullanma (epoch)
+        """
+        with self._lock:
+            self._token += 1
+            self._live[key] = (self._token, expires_at)
+            heapq.heappush(self._heap, (expires_at, self._token, key))
+            self.stats['scheduled'] += 1
+            # Yeni girdi en erken son kullanma ise zamanlayıcı yeniden beklesin
+            if self._heap[0][1] == self._token:
+                self._wakeup.notify()
+            if len(self._heap) > max(1024, 2 * len(self._live)):
+                self._compact()
+
+    def cancel(self, key: Hashable) -> bool:
+        """Anahtarı indeksten çıkar"""
+        with self._lock:
+            if self._live.pop(key, None) is None:
+                return False
+            self.stats['cancelled'] += 1
+            return True
+
+    def pop_expired(self, now: Optional[float] = None) -> List[Hashable]:
+        """
+        Süresi dolan anahtarları çıkar
+
+        Args:
+            now: Referans zaman (varsayılan şimdi)
+
+        Returns:
+            Son kullanma sırasıyla süresi dolan anahtarlar
+        """
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, token, key = heapq.heappop(self._heap)
+                live = self._live.get(key)
+                if live is None or live[0] != token:
+                    self.stats['stale_skipped'] += 1
+                    continue
+                del self._live[key]
+                expired.append(key)
+            self.stats['expired'] += len(expired)
+        return expired
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """
+        Süresi dolanları callback'e ver
+
+        Returns:
+            Süresi dolan anahtar sayısı
+        """
+        expired = self.pop_expired(now)
+        if expired and self.on_expire:
+            try:
+                self.on_expire(expired)
+            except Exception as e:
+                print(f"❌ Sona erme callback hatası: {e}")
+        return len(expired)
+
+    def next_deadline(self) -> Optional[float]:
+        """En erken canlı son kullanma zamanı"""
+        with self._lock:
+            self._drop_stale_head()
+            return self._heap[0][0] if self._heap else None
+
+    def start(self):
+        """Zamanlayıcı thread'ini bu süreçte başlat"""
+        with self._lock:
+            if self._running and self._pid == os.getpid():
+                return
+            self._running = True
+            self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._timer_loop, name='expiry-timer', daemon=True)
+        self._thread.start()
+        print("⏲️ Sinyal sona erme zamanlayıcısı başlatıldı")
+
+    def stop(self):
+        """Zamanlayıcı thread'ini durdur"""
+        with self._lock:
+            self._running = False
+            self._wakeup.notify()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._live
+
+    def get_stats(self) -> Dict[str, any]:
+        """İndeks istatistikleri"""
+        return {
+            **self.stats,
+            'pending': len(self._live),
+            'heap_size': len(self._heap),
+            'next_deadline': self.next_deadline(),
+            'timer_running': self._running and self._pid == os.getpid()
+        }
+
+    def _timer_loop(self):
+        """Bir sonraki son kullanma anına kadar bekle ve süresi dolanları işle"""
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+                self._drop_stale_head()
+                timeout = self._heap[0][0] - time.time() if self._heap else None
+                if timeout is None or timeout > 0:
+                    self._wakeup.wait(timeout)
+                    continue
+            self.run_due()
+
+    def _drop_stale_head(self):
+        """Heap başındaki ölü girdileri at (kilit altında çağrılır)"""
+        while self._heap:
+            _, token, key = self._heap[0]
+            live = self._live.get(key)
+            if live is not None and live[0] == token:
+                return
+            heapq.heappop(self._heap)
+            self.stats['stale_skipped'] += 1
+
+    def _compact(self):
+        """Ölü girdileri heap'ten temizle (kilit altında çağrılır)"""
+        self._heap = [entry for entry in self._heap
+                      if self._live.get(entry[2], (None,))[0] == entry[1]]
+        heapq.heapify(self._heap)
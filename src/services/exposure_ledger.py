@@ -0,0 +1,165 @@
+import threading
+from typing import Dict, Iterable, Optional
+
+from .pnl_engine import pnl_engine
+
+# Birlikte hareket eden coin grupları (korelasyon kümeleri); listede olmayanlar 'other'
+DEFAULT_CLUSTERS = {
+    'layer1': ['BTC', 'ETH', 'BNB', 'ADA', 'SOL', 'XRP', 'DOT', 'AVAX', 'MATIC'],
+    'meme': ['PEPE', 'BONK', 'SHIB', 'FLOKI', 'WIF', 'PENGU', 'DOGE'],
+    'defi': ['UNI', 'AAVE', 'MKR', 'COMP', 'YFI', 'SUSHI', 'SNX', 'CRV'],
+    'ai': ['TAO', 'RENDER', 'FET', 'AGIX']
+}
+
+class ExposureLedger:
+    """
+    Açık sinyallerin artımlı risk defteri
+
+    Sembol, yön, küme ve küme+yön başına açık sinyal sayısı ve nominal
+    tutar tutulur. SignalStore dinleyicisi her açılış ve kapanışta
+    sayaçları O(1) günceller; limit kontrolü tüm sinyalleri taramadan
+    sayaçlardan okunur.
+
+    Limitler gelişmiş üreticinin defterine uygulanır: ortak depodaki
+    yalnızca analysis_type alanı book_type olan sinyaller sayılır, eski
+    (legacy) sinyaller yeni gelişmiş sinyalleri engellemez.
+    """
+
+    def __init__(self, clusters: Optional[Dict[str, Iterable[str]]] = None):
+        # Limitler (None = sınırsız)
+        self.max_per_symbol = 1  # Sembol başına açık sinyal
+        self.max_per_direction = 8  # Aynı yönde toplam açık sinyal
+        self.max_per_cluster_direction = 3  # Aynı kümede aynı yönde açık sinyal
+        self.max_gross_notional = None  # Toplam açık nominal (USD)
+        self.book_type = 'ADVANCED_TECHNICAL'  # Deftere alınan sinyallerin analysis_type'ı (None = tümü)
+
+        self._cluster_of: Dict[str, str] = {}
+        self.set_clusters(clusters or DEFAULT_CLUSTERS)
+        self._signals: Dict[str, tuple] = {}  # Sinyal id -> (sayaç anahtarları, nominal)
+        self._counts: Dict[tuple, int] = {}
+        self._notional: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {'checks': 0, 'blocked': 0}
+
+        print("⚖️ Exposure Ledger başlatıldı")
+
+    def set_clusters(self, clusters: Dict[str, Iterable[str]]):
+        """Küme -> sembol listesi eşlemesini ayarla (sonraki açılışlardan itibaren geçerli)"""
+        self._cluster_of = {symbol.upper(): name for name, symbols in clusters.items() for symbol in symbols}
+
+    def cluster_of(self, symbol: str) -> str:
+        """Sembolün kümesi"""
+        return self._cluster_of.get(symbol.upper(), 'other')
+
+    def attach(self, store):
+        """
+        Sinyal deposuna bağlan (mevcut sinyaller deftere eklenir)
+
+        Args:
+            store: SignalStore
+        """
+        for signal in store.values():
+            self._open(signal)
+        store.add_listener(self._on_store_event)
+
+    def check(self, symbol: str, direction: str, notional: Optional[float] = None) -> Optional[str]:
+        """
+        Yeni sinyal limitleri aşar mı (O(1))
+
+        Args:
+            symbol: Coin sembolü
+            direction: LONG/SHORT
+            notional: Pozisyon nominali (varsayılan canlı pozisyon büyüklüğü)
+
+        Returns:
+            Limit aşılıyorsa sebep, aksi halde None
+        """
+        notional = pnl_engine.position_size if notional is None else notional
+        symbol_key, direction_key, _, cluster_direction_key = self._keys(symbol, direction)
+        with self._lock:
+            self.stats['checks'] += 1
+            reason = None
+            if self.max_per_symbol is not None and self._counts.get(symbol_key, 0) >= self.max_per_symbol:
+                reason = f"{symbol.upper()} için açık sinyal limiti ({self.max_per_symbol})"
+            elif self.max_per_direction is not None and self._counts.get(direction_key, 0) >= self.max_per_direction:
+                reason = f"{direction_key[1]} yönünde açık sinyal limiti ({self.max_per_direction})"
+            elif (self.max_per_cluster_direction is not None
+                  and self._counts.get(cluster_direction_key, 0) >= self.max_per_cluster_direction):
+                reason = (f"{cluster_direction_key[1]} kümesinde {direction_key[1]} limiti "
+                          f"({self.max_per_cluster_direction})")
+            elif (self.max_gross_notional is not None
+                  and self._notional.get(('gross',), 0.0) + notional > self.max_gross_notional):
+                reason = f"Toplam açık nominal limiti (${self.max_gross_notional:,.0f})"
+            if reason:
+                self.stats['blocked'] += 1
+            return reason
+
+    def get_exposure(self) -> Dict[str, any]:
+        """Sembol, yön ve küme bazında açık sinyal sayıları ve nominaller"""
+        with self._lock:
+            exposure = {'gross': {'count': self._counts.get(('gross',), 0),
+                                  'notional': round(self._notional.get(('gross',), 0.0), 2)},
+                        'net_notional': round(self._notional.get(('direction', 'LONG'), 0.0)
+                                              - self._notional.get(('direction', 'SHORT'), 0.0), 2),
+                        'symbol': {}, 'direction': {}, 'cluster': {}}
+            for key, count in self._counts.items():
+                if len(key) < 2 or not count:
+                    continue
+                entry = {'count': count, 'notional': round(self._notional.get(key, 0.0), 2)}
+                if key[0] == 'cluster_direction':
+                    exposure['cluster'].setdefault(key[1], {})[key[2]] = entry
+                elif key[0] in ('symbol', 'direction'):
+                    exposure[key[0]][key[1]] = entry
+            exposure['book'] = self.book_type
+            exposure['limits'] = {
+                'max_per_symbol': self.max_per_symbol,
+                'max_per_direction': self.max_per_direction,
+                'max_per_cluster_direction': self.max_per_cluster_direction,
+                'max_gross_notional': self.max_gross_notional
+            }
+            exposure['stats'] = dict(self.stats)
+            return exposure
+
+    def _keys(self, symbol: str, direction: str) -> tuple:
+        symbol = symbol.upper()
+        direction = str(direction).upper()
+        cluster = self.cluster_of(symbol)
+        return (('symbol', symbol), ('direction', direction), ('cluster', cluster),
+                ('cluster_direction', cluster, direction))
+
+    def _on_store_event(self, event: str, signal: Dict[str, any]):
+        if event == 'remove':
+            self._close(signal['id'])
+        else:
+            # Güncellemede anahtarlar (sembol/yön) değişmiş olabilir
+            self._close(signal['id'])
+            self._open(signal)
+
+    def _open(self, signal: Dict[str, any]):
+        if self.book_type is not None and signal.get('analysis_type') != self.book_type:
+            return
+        keys = self._keys(signal.get('coin_symbol') or '', signal.get('direction', '')) + (('gross',),)
+        notional = pnl_engine.position_size
+        with self._lock:
+            if signal['id'] in self._signals:
+                return
+            self._signals[signal['id']] = (keys, notional)
+            for key in keys:
+                self._counts[key] = self._counts.get(key, 0) + 1
+                self._notional[key] = self._notional.get(key, 0.0) + notional
+
+    def _close(self, signal_id: str):
+        with self._lock:
+            entry = self._signals.pop(signal_id, None)
+            if entry is None:
+                return
+            keys, notional = entry
+            for key in keys:
+                self._counts[key] -= 1
+                self._notional[key] -= notional
+                if not self._counts[key]:
+                    del self._counts[key]
+                    del self._notional[key]
+
+# Singleton instance
+exposure_ledger = ExposureLedger()
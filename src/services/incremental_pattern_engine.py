@@ -0,0 +1,449 @@
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+class _SeriesState:
+    """Tek bir (symbol, timeframe) için pivot ve formasyon durumu"""
+
+    def __init__(self, prominence_window: int, max_pivots: int):
+        # Son kapanmış mumlar: (idx, high, low). Pivot onayı son 2k+1 mumla,
+        # prominence ise tüm pencereyle (toplu dedektörlerdeki df boyu) hesaplanır
+        self.history = deque(maxlen=prominence_window)
+        self.bar_count = 0
+        self.last_timestamp = None
+        self.last_close = None
+
+        # Onaylanmış pivotlar: [idx, fiyat, önceki pivottan bu yana uç idx, uç fiyat,
+        # sol taban, sağ taban, sağ taban hâlâ uzuyor mu]. Prominence tabanlardan
+        # okuma anındaki std ile hesaplanır, zayıf pivotlar eşleştirmede atlanır
+        self.pivot_highs = deque(maxlen=max_pivots)
+        self.pivot_lows = deque(maxlen=max_pivots)
+
+        # Son pivottan bu yana görülen en düşük high / en yüksek low
+        self.seg_min_high = None
+        self.seg_max_low = None
+
+        # Aday formasyonlar (pattern adı -> onay sırasına göre adaylar). Tolerans
+        # okuma anında uygulanır, böylece her tolerans aynı pivotları paylaşır
+        self.candidates = {
+            'double_top': deque(),
+            'double_bottom': deque(),
+            'head_and_shoulders': deque()
+        }
+
+class IncrementalPatternEngine:
+    """
+    Mum kapanışında güncellenen artımlı formasyon motoru
+
+    Her (symbol, timeframe) için pivot durumu ve aday formasyonlar tutulur.
+    Pivotlar toplu dedektörlerdeki find_peaks ile aynı ölçütle süzülür:
+    prominence, son prominence_window mumun high/low standart sapmasının
+    belirli bir katı olmalı (double top/bottom 0.5, baş-omuz 0.3). Böylece
+    arada kalan küçük pivotlar asıl tepe/dip çiftini gizlemez.
+
+    Yeni kapanan her mum için pivot onayı O(k) ve açık pivot tabanlarının
+    güncellenmesi O(max_pivots); prominence ve formasyon kontrolü yalnızca
+    yeni pivot oluştuğunda yapılır. Tolerans adaylara okuma
+    anında uygulanır, bu yüzden gölge stratejilerin farklı toleransları da
+    aynı durumdan okunur.
+
+    Formasyonlar mum konumlarını motorun mum sayacıyla (*_bar) tutar;
+    sync() bunları verilen DataFrame'deki konumlara (*_idx, toplu
+    dedektörlerle aynı alanlar) çevirerek döner.
+    """
+
+    def __init__(self, pivot_window: int = 5, tolerance: float = 0.02,
+                 max_pivots: int = 20, max_formation_age: int = 50,
+                 prominence_window: int = 100):
+        self.pivot_window = pivot_window  # Pivot için sağ/sol mum sayısı
+        self.tolerance = tolerance  # Varsayılan %2 tolerans (sync ile çağrı başına verilebilir)
+        self.max_pivots = max_pivots
+        self.prominence_window = prominence_window  # Tarama ile aynı mum sayısı
+        self.double_prominence = 0.5  # Double top/bottom pivotu: std * 0.5
+        self.hs_prominence = 0.3  # Baş-omuz pivotu: std * 0.3
+        self.max_formation_age = max_formation_age  # Formasyon kaç mum aktif kalır
+
+        self.states: Dict[Tuple[str, str], _SeriesState] = {}
+        self._lock = threading.Lock()
+
+        print("🧩 Incremental Pattern Engine başlatıldı")
+
+    def sync(self, symbol: str, timeframe: str, df: pd.DataFrame,
+             tolerance: Optional[float] = None) -> Optional[List[Dict[str, any]]]:
+        """
+        DataFrame'deki yeni kapanmış mumları motora besle
+
+        Son satır henüz kapanmamış mum kabul edilir ve beslenmez. Daha önce
+        görülen zaman damgaları atlanır, yani maliyet yalnızca yeni mum
+        sayısıyla orantılıdır.
+
+        Args:
+            symbol: Coin sembolü
+            timeframe: Zaman dilimi
+            df: OHLCV DataFrame (timestamp sütunu ile)
+            tolerance: Formasyon toleransı (varsayılan self.tolerance)
+
+        Returns:
+            Aktif formasyonlar (*_idx alanları df konumu; pencere dışındaysa
+            None) veya hata durumunda None (toplu dedektörler kullanılsın)
+        """
+        try:
+            closed = df.iloc[:-1] if df is not None else None
+            n_closed = len(closed) if closed is not None else 0
+
+            with self._lock:
+                state = self._get_state(symbol, timeframe)
+                if n_closed:
+                    timestamps = closed['timestamp'].values
+                    highs = closed['high'].values
+                    lows = closed['low'].values
+                    closes = closed['close'].values
+
+                    start = 0
+                    if state.last_timestamp is not None:
+                        start = int(timestamps.searchsorted(state.last_timestamp, side='right'))
+
+                    for i in range(start, n_closed):
+                        self._on_candle_close(state, highs[i], lows[i], closes[i])
+                        state.last_timestamp = timestamps[i]
+
+                # Son beslenen mum df'deki son kapanmış mumdur (konum n_closed - 1)
+                offset = n_closed - state.bar_count
+                return [
+                    self._to_positions(formation, offset)
+                    for formation in self._active_formations(state, tolerance)
+                ]
+
+        except Exception as e:
+            print(f"❌ {symbol} {timeframe} artımlı pattern hatası: {e}")
+            return None
+
+    def on_candle_close(self, symbol: str, timeframe: str, high: float, low: float,
+                        close: float, timestamp=None) -> List[Dict[str, any]]:
+        """
+        Tek bir kapanan mumu işle
+
+        Args:
+            symbol: Coin sembolü
+            timeframe: Zaman dilimi
+            high, low, close: Mum değerleri
+            timestamp: Mum zaman damgası (opsiyonel)
+
+        Returns:
+            Aktif formasyonlar
+        """
+        with self._lock:
+            state = self._get_state(symbol, timeframe)
+            self._on_candle_close(state, high, low, close)
+            if timestamp is not None:
+                state.last_timestamp = timestamp
+            return self._active_formations(state)
+
+    def get_formations(self, symbol: str, timeframe: str,
+                       tolerance: Optional[float] = None) -> List[Dict[str, any]]:
+        """Aktif formasyonları getir (konumlar motor mum sayacıyla, *_bar)"""
+        with self._lock:
+            state = self.states.get((symbol, timeframe))
+            return self._active_formations(state, tolerance) if state else []
+
+    def reset(self, symbol: str = None, timeframe: str = None):
+        """Durumu sıfırla (parametresiz çağrıda tümü)"""
+        with self._lock:
+            if symbol is None:
+                self.states.clear()
+            else:
+                self.states.pop((symbol, timeframe), None)
+
+    @staticmethod
+    def _to_positions(formation: Dict[str, any], offset: int) -> Dict[str, any]:
+        """Motor mum sayaçlarını (*_bar) DataFrame konumlarına (*_idx) çevir"""
+        converted = {}
+        for key, value in formation.items():
+            if key.endswith('_bar'):
+                position = value + offset
+                converted[key[:-len('_bar')] + '_idx'] = position if position >= 0 else None
+            else:
+                converted[key] = value
+        return converted
+
+    def _get_state(self, symbol: str, timeframe: str) -> _SeriesState:
+        key = (symbol, timeframe)
+        if key not in self.states:
+            self.states[key] = _SeriesState(self.prominence_window, self.max_pivots)
+        return self.states[key]
+
+    def _on_candle_close(self, state: _SeriesState, high: float, low: float, close: float):
+        """Yeni mumu pencereye ekle, merkez mum pivot mu kontrol et"""
+        idx = state.bar_count
+        state.bar_count += 1
+        state.last_close = close
+        state.history.append((idx, high, low))
+
+        self._update_candidates(state, idx, close)
+        self._extend_pivots(state, high, low)
+
+        k = self.pivot_window
+        if len(state.history) < 2 * k + 1:
+            return
+
+        # Sondan k+1'inci mum artık k mum sağdan onaylanabilir
+        center = len(state.history) - k - 1
+        center_idx, center_high, center_low = state.history[center]
+        left = [state.history[j] for j in range(center - k, center)]
+        right = [state.history[j] for j in range(center + 1, center + k + 1)]
+
+        is_pivot_high = (all(center_high > b[1] for b in left) and
+                         all(center_high >= b[1] for b in right))
+        is_pivot_low = (all(center_low < b[2] for b in left) and
+                        all(center_low <= b[2] for b in right))
+
+        # Segment uç değerlerini merkez mum ile güncelle
+        if state.seg_min_high is None or center_high < state.seg_min_high[1]:
+            state.seg_min_high = (center_idx, center_high)
+        if state.seg_max_low is None or center_low > state.seg_max_low[1]:
+            state.seg_max_low = (center_idx, center_low)
+
+        if is_pivot_high:
+            valley = state.seg_min_high
+            state.pivot_highs.append([
+                center_idx, center_high, valley[0], valley[1],
+                self._left_base(state, center, 1), min(b[1] for b in right), True
+            ])
+            state.seg_min_high = (center_idx, center_high)
+            self._check_high_formations(state, idx)
+
+        if is_pivot_low:
+            peak = state.seg_max_low
+            state.pivot_lows.append([
+                center_idx, center_low, peak[0], peak[1],
+                self._left_base(state, center, 2), max(b[2] for b in right), True
+            ])
+            state.seg_max_low = (center_idx, center_low)
+            self._check_low_formations(state, idx)
+
+    @staticmethod
+    def _left_base(state: _SeriesState, center: int, column: int) -> float:
+        """Pivotun sol tabanı: daha uç bir muma veya pencere başına kadar en zayıf değer"""
+        sign = 1 if column == 1 else -1
+        peak = sign * state.history[center][column]
+        base = peak
+        for j in range(center - 1, -1, -1):
+            value = sign * state.history[j][column]
+            if value > peak:
+                break
+            base = min(base, value)
+        return sign * base
+
+    @staticmethod
+    def _extend_pivots(state: _SeriesState, high: float, low: float):
+        """
+        Açık pivotların sağ tabanını yeni mumla genişlet
+
+        find_peaks'teki gibi sağ taban daha uç bir muma kadar uzanır; pivot
+        onaylandığında yalnızca k mum bilindiği için taban sonradan güncellenir.
+        """
+        for pivot in state.pivot_highs:
+            if pivot[6]:
+                if high > pivot[1]:
+                    pivot[6] = False
+                else:
+                    pivot[5] = min(pivot[5], high)
+        for pivot in state.pivot_lows:
+            if pivot[6]:
+                if low < pivot[1]:
+                    pivot[6] = False
+                else:
+                    pivot[5] = max(pivot[5], low)
+
+    @staticmethod
+    def _prominence_ratio(pivot: List, std: float, is_high: bool) -> float:
+        """Pivot prominence'ının pencere standart sapmasına oranı (std 0 ise 0)"""
+        if std <= 0:
+            return 0.0
+        if is_high:
+            return (pivot[1] - max(pivot[4], pivot[5])) / std
+        return (min(pivot[4], pivot[5]) - pivot[1]) / std
+
+    def _strong_pivots(self, pivots: deque, minimum: float, std: float, is_high: bool,
+                       count: int) -> List[Tuple[List, Tuple]]:
+        """
+        Son `count` güçlü pivot (prominence >= minimum * std)
+
+        Aradaki zayıf pivotlar atlanır; iki güçlü pivot arasındaki uç değer
+        (tepeler için en düşük high, dipler için en yüksek low) atlanan
+        segmentler boyunca birleştirilir.
+
+        Returns:
+            Eskiden yeniye (pivot, (önceki güçlü pivottan bu yana uç idx, uç fiyat));
+            yeterli güçlü pivot yoksa boş liste
+        """
+        found = []
+        for pivot in reversed(pivots):
+            segment = (pivot[2], pivot[3])
+            if self._prominence_ratio(pivot, std, is_high) >= minimum:
+                if len(found) == count:
+                    break
+                found.append([pivot, segment])
+            elif found:
+                between = found[-1][1]
+                if (segment[1] < between[1]) if is_high else (segment[1] > between[1]):
+                    found[-1][1] = segment
+        if len(found) < count:
+            return []
+        return [(pivot, tuple(between)) for pivot, between in reversed(found)]
+
+    def _check_high_formations(self, state: _SeriesState, confirmed_bar: int):
+        """Yeni pivot high ile double top ve baş-omuz adayları"""
+        pivots = state.pivot_highs
+        std = float(np.std([b[1] for b in state.history]))
+        newest = pivots[-1]
+
+        strong = []
+        if self._prominence_ratio(newest, std, True) >= self.double_prominence:
+            strong = self._strong_pivots(pivots, self.double_prominence, std, True, 2)
+        if strong:
+            (p1, _), (p2, (valley_idx, valley_price)) = strong
+            peak1_price, peak2_price = p1[1], p2[1]
+
+            price_diff = abs(peak1_price - peak2_price) / peak1_price
+            valley_drop = (peak1_price - valley_price) / peak1_price
+
+            if valley_drop >= 0.03:
+                resistance = (peak1_price + peak2_price) / 2
+                self._add_candidate(state, {
+                    'detected': True,
+                    'pattern': 'double_top',
+                    'signal': 'SHORT',
+                    'confidence': min(90, 60 + valley_drop * 100),
+                    'peak1_bar': p1[0],
+                    'peak2_bar': p2[0],
+                    'valley_bar': valley_idx,
+                    'confirmed_bar': confirmed_bar,
+                    'resistance_level': resistance,
+                    'target': valley_price,
+                    'description': f"İkili tepe formasyonu tespit edildi. Direnç: ${resistance:.4f}"
+                }, price_diff)
+
+        strong = []
+        if self._prominence_ratio(newest, std, True) >= self.hs_prominence:
+            strong = self._strong_pivots(pivots, self.hs_prominence, std, True, 3)
+        if strong:
+            (ls, _), (head, head_valley), (rs, rs_valley) = strong
+            left_shoulder, head_price, right_shoulder = ls[1], head[1], rs[1]
+
+            if head_price > left_shoulder and head_price > right_shoulder:
+                shoulder_diff = abs(left_shoulder - right_shoulder) / left_shoulder
+                shoulder_max = max(left_shoulder, right_shoulder)
+                head_prominence = (head_price - shoulder_max) / shoulder_max
+
+                if head_prominence >= 0.05:
+                    neckline = (head_valley[1] + rs_valley[1]) / 2
+                    # Omuz farkı toleransın iki katıyla karşılaştırılır
+                    self._add_candidate(state, {
+                        'detected': True,
+                        'pattern': 'head_and_shoulders',
+                        'signal': 'SHORT',
+                        'confidence': min(95, 70 + head_prominence * 100),
+                        'left_shoulder_bar': ls[0],
+                        'head_bar': head[0],
+                        'right_shoulder_bar': rs[0],
+                        'confirmed_bar': confirmed_bar,
+                        'head_price': head_price,
+                        'neckline': neckline,
+                        'target': neckline - (head_price - neckline),
+                        'description': f"Baş-omuz formasyonu tespit edildi. Boyun çizgisi: ${neckline:.4f}"
+                    }, shoulder_diff / 2)
+
+    def _check_low_formations(self, state: _SeriesState, confirmed_bar: int):
+        """Yeni pivot low ile double bottom adayı"""
+        pivots = state.pivot_lows
+        std = float(np.std([b[2] for b in state.history]))
+        if self._prominence_ratio(pivots[-1], std, False) < self.double_prominence:
+            return
+
+        strong = self._strong_pivots(pivots, self.double_prominence, std, False, 2)
+        if not strong:
+            return
+
+        (v1, _), (v2, (peak_idx, peak_price)) = strong
+        valley1_price, valley2_price = v1[1], v2[1]
+
+        price_diff = abs(valley1_price - valley2_price) / valley1_price
+        peak_rise = (peak_price - valley1_price) / valley1_price
+
+        if peak_rise >= 0.03:
+            support = (valley1_price + valley2_price) / 2
+            self._add_candidate(state, {
+                'detected': True,
+                'pattern': 'double_bottom',
+                'signal': 'LONG',
+                'confidence': min(90, 60 + peak_rise * 100),
+                'valley1_bar': v1[0],
+                'valley2_bar': v2[0],
+                'peak_bar': peak_idx,
+                'confirmed_bar': confirmed_bar,
+                'support_level': support,
+                'target': peak_price,
+                'description': f"İkili dip formasyonu tespit edildi. Destek: ${support:.4f}"
+            }, price_diff)
+
+    @staticmethod
+    def _add_candidate(state: _SeriesState, formation: Dict[str, any], price_diff: float):
+        """Aday formasyonu ekle (tolerans okuma anında price_diff ile karşılaştırılır)"""
+        state.candidates[formation['pattern']].append({
+            'formation': formation,
+            'price_diff': price_diff,
+            'max_close': None,  # Onaydan sonraki en yüksek/düşük kapanış
+            'min_close': None
+        })
+
+    def _update_candidates(self, state: _SeriesState, idx: int, close: float):
+        """Eskiyen adayları düşür, kalanların kapanış uçlarını güncelle"""
+        for candidates in state.candidates.values():
+            while candidates and idx - candidates[0]['formation']['confirmed_bar'] > self.max_formation_age:
+                candidates.popleft()
+            for candidate in candidates:
+                if candidate['max_close'] is None or close > candidate['max_close']:
+                    candidate['max_close'] = close
+                if candidate['min_close'] is None or close < candidate['min_close']:
+                    candidate['min_close'] = close
+
+    def _active_formations(self, state: _SeriesState, tolerance: Optional[float] = None) -> List[Dict[str, any]]:
+        """
+        Verilen toleransla aktif formasyonlar
+
+        Her pattern için toleransa uyan en yeni aday seçilir (yeni çift eskisinin
+        yerini alır); o aday onaydan sonra bozulduysa formasyon yoktur.
+        """
+        tolerance = self.tolerance if tolerance is None else tolerance
+
+        formations = []
+        for name, candidates in state.candidates.items():
+            for candidate in reversed(candidates):
+                if candidate['price_diff'] > tolerance:
+                    continue
+                if not self._is_broken(name, candidate, tolerance):
+                    formations.append(candidate['formation'])
+                break
+        return formations
+
+    @staticmethod
+    def _is_broken(name: str, candidate: Dict[str, any], tolerance: float) -> bool:
+        """Formasyon onaydan sonra kapanışla bozuldu mu"""
+        formation = candidate['formation']
+        max_close, min_close = candidate['max_close'], candidate['min_close']
+        if max_close is None:
+            return False
+
+        if name == 'double_top':
+            return max_close > formation['resistance_level'] * (1 + tolerance)
+        if name == 'double_bottom':
+            return min_close < formation['support_level'] * (1 - tolerance)
+        if name == 'head_and_shoulders':
+            return max_close > formation['head_price']
+        return False
+
+# Singleton instance
+incremental_pattern_engine = IncrementalPatternEngine()
@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Tuple
 from scipy.signal import find_peaks, argrelextrema
+from .trendline_service import trendline_service
+from .candlestick_service import candlestick_service
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -11,14 +13,27 @@ class PatternRecognitionService:
         self.peak_distance = 5  # Peak'ler arası minimum mesafe
         self.tolerance = 0.02  # %2 tolerans
         
+        # Destek/direnç kümeleme parametreleri
+        self.level_tolerance = 0.01  # Aynı seviye sayılacak pivotlar arası %1
+        self.min_level_touches = 2  # En az 2 kez test edilmiş seviye
+        self.level_half_life = 100  # Recency ağırlığının yarılanma süresi (mum)
+        
         print("🎯 Pattern Recognition Service başlatıldı")
     
-    def analyze_patterns(self, df: pd.DataFrame) -> Dict[str, any]:
+    def analyze_patterns(self, df: pd.DataFrame, formations: Optional[List[Dict]] = None,
+                         candlesticks: Optional[List[Dict]] = None,
+                         tolerance: Optional[float] = None) -> Dict[str, any]:
         """
         Tüm pattern'leri analiz et
         
         Args:
             df: OHLCV + teknik göstergeler DataFrame
+            formations: Artımlı motordan gelen aktif formasyonlar. Verilirse
+                double top/bottom ve baş-omuz için pencere yeniden taranmaz.
+            candlesticks: detect_candlestick_patterns çıktısındaki bu çerçeveye
+                ait isabetler
+            tolerance: Double top/bottom ve baş-omuz toleransı (varsayılan
+                self.tolerance)
             
         Returns:
             Pattern analiz sonuçları
@@ -30,22 +45,28 @@ class PatternRecognitionService:
             patterns = []
             signals = []
             
-            # 1. Double Top/Bottom
-            double_top = self.detect_double_top(df)
-            if double_top['detected']:
-                patterns.append(double_top)
-                signals.append(double_top['signal'])
-            
-            double_bottom = self.detect_double_bottom(df)
-            if double_bottom['detected']:
-                patterns.append(double_bottom)
-                signals.append(double_bottom['signal'])
-            
-            # 2. Head and Shoulders
-            head_shoulders = self.detect_head_and_shoulders(df)
-            if head_shoulders['detected']:
-                patterns.append(head_shoulders)
-                signals.append(head_shoulders['signal'])
+            if formations is not None:
+                # 1-2. Artımlı motorun formasyonları
+                for formation in formations:
+                    patterns.append(formation)
+                    signals.append(formation['signal'])
+            else:
+                # 1. Double Top/Bottom
+                double_top = self.detect_double_top(df, tolerance)
+                if double_top['detected']:
+                    patterns.append(double_top)
+                    signals.append(double_top['signal'])
+                
+                double_bottom = self.detect_double_bottom(df, tolerance)
+                if double_bottom['detected']:
+                    patterns.append(double_bottom)
+                    signals.append(double_bottom['signal'])
+                
+                # 2. Head and Shoulders
+                head_shoulders = self.detect_head_and_shoulders(df, tolerance)
+                if head_shoulders['detected']:
+                    patterns.append(head_shoulders)
+                    signals.append(head_shoulders['signal'])
             
             # 3. Triangle Patterns
             triangle = self.detect_triangle_patterns(df)
@@ -61,8 +82,12 @@ class PatternRecognitionService:
             trend = self.analyze_trend(df)
             patterns.append(trend)
             
+            # 6. Mum formasyonları
+            candlesticks = candlesticks or []
+            patterns.extend(candlesticks)
+            
             # Final signal ve confidence hesapla
-            final_signal, confidence = self._calculate_final_signal(signals, df)
+            final_signal, confidence = self._calculate_final_signal(signals, df, candlesticks)
             
             return {
                 'patterns': patterns,
@@ -75,8 +100,9 @@ class PatternRecognitionService:
             print(f"❌ Pattern analiz hatası: {e}")
             return {'patterns': [], 'signal': 'HOLD', 'confidence': 0}
     
-    def detect_double_top(self, df: pd.DataFrame) -> Dict[str, any]:
+    def detect_double_top(self, df: pd.DataFrame, tolerance: Optional[float] = None) -> Dict[str, any]:
         """İkili Tepe (Double Top) pattern tespiti"""
+        tolerance = self.tolerance if tolerance is None else tolerance
         try:
             highs = df['high'].values
             
@@ -86,8 +112,8 @@ class PatternRecognitionService:
             if len(peaks) < 2:
                 return {'detected': False, 'pattern': 'double_top'}
             
-            # Son iki peak'i kontrol et
-            for i in range(len(peaks) - 1):
+            # Son iki peak'i kontrol et (en yeni çiftten geriye doğru)
+            for i in reversed(range(len(peaks) - 1)):
                 peak1_idx = peaks[i]
                 peak2_idx = peaks[i + 1]
                 
@@ -97,7 +123,7 @@ class PatternRecognitionService:
                 # İki peak'in yüksekliği benzer mi?
                 price_diff = abs(peak1_price - peak2_price) / peak1_price
                 
-                if price_diff <= self.tolerance:
+                if price_diff <= tolerance:
                     # Aradaki valley'i bul
                     valley_start = peak1_idx
                     valley_end = peak2_idx
@@ -127,8 +153,9 @@ class PatternRecognitionService:
             print(f"❌ Double top tespit hatası: {e}")
             return {'detected': False, 'pattern': 'double_top'}
     
-    def detect_double_bottom(self, df: pd.DataFrame) -> Dict[str, any]:
+    def detect_double_bottom(self, df: pd.DataFrame, tolerance: Optional[float] = None) -> Dict[str, any]:
         """İkili Dip (Double Bottom) pattern tespiti"""
+        tolerance = self.tolerance if tolerance is None else tolerance
         try:
             lows = df['low'].values
             
@@ -138,8 +165,8 @@ class PatternRecognitionService:
             if len(valleys) < 2:
                 return {'detected': False, 'pattern': 'double_bottom'}
             
-            # Son iki valley'i kontrol et
-            for i in range(len(valleys) - 1):
+            # Son iki valley'i kontrol et (en yeni çiftten geriye doğru)
+            for i in reversed(range(len(valleys) - 1)):
                 valley1_idx = valleys[i]
                 valley2_idx = valleys[i + 1]
                 
@@ -149,7 +176,7 @@ class PatternRecognitionService:
                 # İki valley'in derinliği benzer mi?
                 price_diff = abs(valley1_price - valley2_price) / valley1_price
                 
-                if price_diff <= self.tolerance:
+                if price_diff <= tolerance:
                     # Aradaki peak'i bul
                     peak_start = valley1_idx
                     peak_end = valley2_idx
@@ -179,8 +206,9 @@ class PatternRecognitionService:
             print(f"❌ Double bottom tespit hatası: {e}")
             return {'detected': False, 'pattern': 'double_bottom'}
     
-    def detect_head_and_shoulders(self, df: pd.DataFrame) -> Dict[str, any]:
+    def detect_head_and_shoulders(self, df: pd.DataFrame, tolerance: Optional[float] = None) -> Dict[str, any]:
         """Baş-Omuz (Head and Shoulders) pattern tespiti"""
+        tolerance = self.tolerance if tolerance is None else tolerance
         try:
             highs = df['high'].values
             
@@ -190,8 +218,8 @@ class PatternRecognitionService:
             if len(peaks) < 3:
                 return {'detected': False, 'pattern': 'head_and_shoulders'}
             
-            # Son 3 peak'i kontrol et
-            for i in range(len(peaks) - 2):
+            # Son 3 peak'i kontrol et (en yeni üçlüden geriye doğru)
+            for i in reversed(range(len(peaks) - 2)):
                 left_shoulder_idx = peaks[i]
                 head_idx = peaks[i + 1]
                 right_shoulder_idx = peaks[i + 2]
@@ -205,7 +233,7 @@ class PatternRecognitionService:
                     # Shoulder'lar benzer yükseklikte olmalı
                     shoulder_diff = abs(left_shoulder - right_shoulder) / left_shoulder
                     
-                    if shoulder_diff <= self.tolerance * 2:  # Daha toleranslı
+                    if shoulder_diff <= tolerance * 2:  # Daha toleranslı
                         # Head, shoulder'lardan en az %5 yüksek olmalı
                         head_prominence = (head - max(left_shoulder, right_shoulder)) / max(left_shoulder, right_shoulder)
                         
@@ -241,56 +269,15 @@ class PatternRecognitionService:
             return {'detected': False, 'pattern': 'head_and_shoulders'}
     
     def detect_triangle_patterns(self, df: pd.DataFrame) -> Dict[str, any]:
-        """Üçgen formasyonları tespiti"""
+        """Üçgen ve kama formasyonları tespiti (kayan trend çizgileri)"""
         try:
-            if len(df) < 30:
+            windows = tuple(w for w in trendline_service.windows if w <= len(df))
+            if not windows:
                 return {'detected': False, 'pattern': 'triangle'}
             
-            highs = df['high'].values
-            lows = df['low'].values
-            
-            # Son 30 mum için trend çizgileri hesapla
-            recent_data = df.tail(30)
-            
-            # Yüksek noktaların trendi
-            high_peaks, _ = find_peaks(recent_data['high'].values, distance=3)
-            low_valleys, _ = find_peaks(-recent_data['low'].values, distance=3)
-            
-            if len(high_peaks) >= 2 and len(low_valleys) >= 2:
-                # Üst trend çizgisi (resistance)
-                high_slope = self._calculate_trendline_slope(high_peaks, recent_data['high'].values)
-                
-                # Alt trend çizgisi (support)
-                low_slope = self._calculate_trendline_slope(low_valleys, recent_data['low'].values)
-                
-                # Üçgen türünü belirle
-                if abs(high_slope) < 0.001 and low_slope > 0.001:
-                    # Ascending Triangle
-                    return {
-                        'detected': True,
-                        'pattern': 'ascending_triangle',
-                        'signal': 'LONG',
-                        'confidence': 75,
-                        'description': "Yükselen üçgen formasyonu - yükseliş sinyali"
-                    }
-                elif high_slope < -0.001 and abs(low_slope) < 0.001:
-                    # Descending Triangle
-                    return {
-                        'detected': True,
-                        'pattern': 'descending_triangle',
-                        'signal': 'SHORT',
-                        'confidence': 75,
-                        'description': "Alçalan üçgen formasyonu - düşüş sinyali"
-                    }
-                elif high_slope < -0.001 and low_slope > 0.001:
-                    # Symmetrical Triangle
-                    return {
-                        'detected': True,
-                        'pattern': 'symmetrical_triangle',
-                        'signal': 'HOLD',
-                        'confidence': 60,
-                        'description': "Simetrik üçgen formasyonu - kırılım bekleniyor"
-                    }
+            triangle = trendline_service.latest_pattern(df['high'].values, df['low'].values, windows)
+            if triangle:
+                return triangle
             
             return {'detected': False, 'pattern': 'triangle'}
             
@@ -299,7 +286,7 @@ class PatternRecognitionService:
             return {'detected': False, 'pattern': 'triangle'}
     
     def detect_support_resistance(self, df: pd.DataFrame) -> Dict[str, any]:
-        """Destek ve direnç seviyelerini tespit et"""
+        """Destek ve direnç seviyelerini tespit et (pivot kümeleme, O(n log n))"""
         try:
             if len(df) < 20:
                 return {'pattern': 'support_resistance', 'levels': []}
@@ -314,33 +301,20 @@ class PatternRecognitionService:
             valleys, _ = find_peaks(-lows, distance=5, prominence=np.std(lows) * 0.3)
             
             resistance_levels = []
-            support_levels = []
+            for cluster in self._cluster_levels(highs[peaks], peaks, len(df)):
+                resistance_levels.append({
+                    **cluster,
+                    'type': 'resistance',
+                    'distance_pct': (cluster['level'] - current_price) / current_price * 100
+                })
             
-            # Resistance levels (peaks)
-            for peak_idx in peaks:
-                level = highs[peak_idx]
-                # Bu seviyeye yakın başka peak'ler var mı?
-                nearby_peaks = [highs[p] for p in peaks if abs(highs[p] - level) / level <= 0.01]
-                if len(nearby_peaks) >= 2:  # En az 2 kez test edilmiş
-                    resistance_levels.append({
-                        'level': level,
-                        'type': 'resistance',
-                        'strength': len(nearby_peaks),
-                        'distance_pct': (level - current_price) / current_price * 100
-                    })
-            
-            # Support levels (valleys)
-            for valley_idx in valleys:
-                level = lows[valley_idx]
-                # Bu seviyeye yakın başka valley'ler var mı?
-                nearby_valleys = [lows[v] for v in valleys if abs(lows[v] - level) / level <= 0.01]
-                if len(nearby_valleys) >= 2:  # En az 2 kez test edilmiş
-                    support_levels.append({
-                        'level': level,
-                        'type': 'support',
-                        'strength': len(nearby_valleys),
-                        'distance_pct': (current_price - level) / level * 100
-                    })
+            support_levels = []
+            for cluster in self._cluster_levels(lows[valleys], valleys, len(df)):
+                support_levels.append({
+                    **cluster,
+                    'type': 'support',
+                    'distance_pct': (current_price - cluster['level']) / cluster['level'] * 100
+                })
             
             # En yakın destek ve direnci bul
             nearest_resistance = None
@@ -365,6 +339,57 @@ class PatternRecognitionService:
             print(f"❌ Support/Resistance tespit hatası: {e}")
             return {'pattern': 'support_resistance', 'levels': []}
     
+    def _cluster_levels(self, prices: np.ndarray, indices: np.ndarray, n_bars: int) -> List[Dict[str, any]]:
+        """
+        Pivot fiyatlarını tek boyutlu sıralı tarama ile seviyelere kümele
+        
+        Fiyatlar sıralanır, ardışık iki pivot arasındaki göreli fark
+        level_tolerance'ı aşınca yeni küme başlar. Her küme tek bir seviye
+        olarak döner; sıralama dışında tüm adımlar O(n).
+        
+        Args:
+            prices: Pivot fiyatları
+            indices: Pivot mum indeksleri
+            n_bars: Toplam mum sayısı (recency ağırlığı için)
+            
+        Returns:
+            Seviye listesi (en güçlüden zayıfa)
+        """
+        if len(prices) < self.min_level_touches:
+            return []
+        
+        order = np.argsort(prices, kind='mergesort')
+        sorted_prices = prices[order]
+        sorted_indices = indices[order]
+        
+        # Ardışık fiyatlar arasındaki göreli boşluk tolerans dışındaysa yeni küme
+        gaps = np.diff(sorted_prices) / sorted_prices[:-1]
+        labels = np.concatenate(([0], np.cumsum(gaps > self.level_tolerance)))
+        n_clusters = labels[-1] + 1
+        
+        # Recency ağırlığı: son mumdaki pivot 1.0, her half-life'ta yarıya iner
+        age = (n_bars - 1) - sorted_indices
+        weights = 0.5 ** (age / self.level_half_life)
+        
+        touches = np.bincount(labels, minlength=n_clusters)
+        weight_sum = np.bincount(labels, weights=weights, minlength=n_clusters)
+        weighted_price = np.bincount(labels, weights=weights * sorted_prices, minlength=n_clusters)
+        last_touch = np.full(n_clusters, -1, dtype=np.int64)
+        np.maximum.at(last_touch, labels, sorted_indices)
+        
+        levels = []
+        for c in np.flatnonzero(touches >= self.min_level_touches):
+            levels.append({
+                'level': float(weighted_price[c] / weight_sum[c]),
+                'strength': int(touches[c]),
+                'touches': int(touches[c]),
+                'last_touch_idx': int(last_touch[c]),
+                'score': round(float(weight_sum[c]), 4)
+            })
+        
+        levels.sort(key=lambda x: x['score'], reverse=True)
+        return levels
+    
     def analyze_trend(self, df: pd.DataFrame) -> Dict[str, any]:
         """Trend analizi"""
         try:
@@ -410,21 +435,29 @@ class PatternRecognitionService:
             print(f"❌ Trend analiz hatası: {e}")
             return {'pattern': 'trend', 'direction': 'SIDEWAYS'}
     
-    def _calculate_trendline_slope(self, indices: np.ndarray, values: np.ndarray) -> float:
-        """Trend çizgisinin eğimini hesapla"""
-        if len(indices) < 2:
-            return 0
-        
-        x = indices
-        y = values[indices]
+    def detect_candlestick_patterns(self, frames: Dict, lookback: int = None) -> Dict:
+        """
+        Tüm coin/timeframe çerçevelerinde mum formasyonlarını tek batch çağrıda bul
         
-        # Linear regression
-        slope = np.polyfit(x, y, 1)[0]
-        return slope
+        Args:
+            frames: Anahtar (ör. timeframe veya (symbol, timeframe)) -> DataFrame
+            lookback: Son kaç mumdaki isabetler tutulsun
+            
+        Returns:
+            Anahtar -> isabet listesi
+        """
+        return candlestick_service.detect_batch(frames, lookback)
     
-    def _calculate_final_signal(self, signals: List[str], df: pd.DataFrame) -> Tuple[str, int]:
+    def _calculate_final_signal(self, signals: List[str], df: pd.DataFrame,
+                                candlesticks: Optional[List[Dict]] = None) -> Tuple[str, int]:
         """Tüm pattern sinyallerini birleştirip final sinyal hesapla"""
         try:
+            # Mum formasyonları tek oy verir: en güçlü yönlü isabet
+            directional = [c for c in (candlesticks or []) if c['signal'] != 'HOLD']
+            if directional:
+                strongest = max(directional, key=lambda c: (c['confidence'], -c['bars_ago']))
+                signals = signals + [strongest['signal']]
+            
             if not signals:
                 return 'HOLD', 50
             
@@ -485,6 +518,10 @@ class PatternRecognitionService:
                     pattern_names.append("baş-omuz formasyonu")
                 elif 'triangle' in pattern['pattern']:
                     pattern_names.append("üçgen formasyonu")
+                elif 'wedge' in pattern['pattern']:
+                    pattern_names.append("kama formasyonu")
+                elif pattern.get('type') == 'candlestick' and pattern['signal'] != 'HOLD':
+                    pattern_names.append(pattern['description'].lower())
             
             if pattern_names:
                 patterns_text = ", ".join(pattern_names)
@@ -0,0 +1,251 @@
+import pandas as pd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Tuple
+
+class HistoricalPatternScanner:
+    """
+    Uzun geçmiş üzerinde tüm formasyonları tek geçişte bulan vektörel tarayıcı
+
+    Araştırma ve backtest içindir: "şu an formasyon var mı" yerine serinin her
+    noktasında oluşmuş double top/bottom ve baş-omuz formasyonlarını onay
+    mumlarıyla birlikte döner. Pivot tanımı ve eşikler artımlı motorla
+    (IncrementalPatternEngine) aynıdır, böylece backtest ile canlı tespit
+    aynı formasyonları görür.
+    """
+
+    def __init__(self, pivot_window: int = 5, tolerance: float = 0.02):
+        self.pivot_window = pivot_window  # Pivot için sağ/sol mum sayısı
+        self.tolerance = tolerance  # %2 tolerans
+        self.min_valley_drop = 0.03  # Double top/bottom için en az %3 geri çekilme
+        self.min_head_prominence = 0.05  # Baş, omuzlardan en az %5 yüksek
+
+        print("🗂️ Historical Pattern Scanner başlatıldı")
+
+    def scan(self, df: pd.DataFrame, symbol: str = None) -> pd.DataFrame:
+        """
+        Tek bir seri üzerindeki tüm formasyonları bul
+
+        Args:
+            df: OHLCV DataFrame
+            symbol: Sonuçlara eklenecek coin sembolü
+
+        Returns:
+            Her satırı bir formasyon olan DataFrame (confirmed_idx'e göre sıralı)
+        """
+        try:
+            highs = np.asarray(df['high'].values, dtype=np.float64)
+            lows = np.asarray(df['low'].values, dtype=np.float64)
+
+            frames = [
+                self._scan_double_tops(highs),
+                self._scan_double_bottoms(lows),
+                self._scan_head_and_shoulders(highs)
+            ]
+            result = pd.concat([f for f in frames if len(f)], ignore_index=True) if any(len(f) for f in frames) \
+                else self._empty_result()
+
+            if 'timestamp' in df.columns and len(result):
+                result['confirmed_at'] = df['timestamp'].values[result['confirmed_idx'].values]
+            if symbol is not None:
+                result.insert(0, 'symbol', symbol)
+
+            return result.sort_values(['confirmed_idx', 'pattern'], kind='mergesort').reset_index(drop=True)
+
+        except Exception as e:
+            print(f"❌ {symbol or ''} geçmiş formasyon tarama hatası: {e}")
+            return self._empty_result()
+
+    def scan_many(self, frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        Birden fazla coin için tarama
+
+        Args:
+            frames: Symbol -> OHLCV DataFrame
+
+        Returns:
+            Tüm coinlerin formasyonları
+        """
+        results = [self.scan(df, symbol) for symbol, df in frames.items() if df is not None and len(df)]
+        results = [r for r in results if len(r)]
+        if not results:
+            return self._empty_result()
+        return pd.concat(results, ignore_index=True)
+
+    def forward_returns(self, df: pd.DataFrame, formations: pd.DataFrame,
+                        horizons: Tuple[int, ...] = (5, 10, 20)) -> pd.DataFrame:
+        """
+        Formasyonların onay mumundan itibaren yön düzeltilmiş getirilerini ekle
+
+        Giriş onay mumunun kapanışıdır; getiri LONG için (çıkış - giriş) / giriş,
+        SHORT için ters işaretlidir. Ufku serinin dışına taşan formasyonlar NaN.
+
+        Args:
+            df: Formasyonların tarandığı OHLCV DataFrame
+            formations: scan() çıktısı
+            horizons: Mum cinsinden ufuklar
+
+        Returns:
+            return_<h> sütunları eklenmiş formations kopyası
+        """
+        result = formations.copy()
+        if not len(result):
+            for h in horizons:
+                result[f'return_{h}'] = pd.Series(dtype=np.float64)
+            return result
+
+        closes = np.asarray(df['close'].values, dtype=np.float64)
+        entry_idx = result['confirmed_idx'].values.astype(np.int64)
+        entry = closes[entry_idx]
+        direction = np.where(result['signal'].values == 'LONG', 1.0, -1.0)
+
+        for h in horizons:
+            exit_idx = entry_idx + h
+            valid = exit_idx < len(closes)
+            exit_price = np.full(len(entry_idx), np.nan)
+            exit_price[valid] = closes[exit_idx[valid]]
+            result[f'return_{h}'] = direction * (exit_price - entry) / entry * 100
+
+        return result
+
+    def find_pivots(self, values: np.ndarray, kind: str = 'high') -> np.ndarray:
+        """
+        Kayan pencere ile pivot indekslerini bul
+
+        i mumu, solundaki k mumdan kesin, sağındaki k mumdan eşit-veya
+        daha uç ise pivottur; onayı i + k mumunda gelir.
+
+        Args:
+            values: High (kind='high') veya low (kind='low') serisi
+            kind: 'high' veya 'low'
+
+        Returns:
+            Pivot indeksleri
+        """
+        k = self.pivot_window
+        n = len(values)
+        if n < 2 * k + 1:
+            return np.empty(0, dtype=np.int64)
+
+        series = values if kind == 'high' else -values
+        rolling_max = sliding_window_view(series, k).max(axis=1)  # [j, j+k) aralığının maksimumu
+
+        centers = np.arange(k, n - k)
+        left_max = rolling_max[centers - k]
+        right_max = rolling_max[centers + 1]
+        center = series[centers]
+
+        return centers[(center > left_max) & (center >= right_max)]
+
+    def _segment_extremes(self, values: np.ndarray, pivots: np.ndarray, kind: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Her pivotun kendisinden önceki pivota kadar olan aralıktaki uç değer
+
+        Dönen dizilerin j. elemanı pivots[j] ile pivots[j+1] arası
+        [pivots[j], pivots[j+1]) aralığına aittir (min için kind='min').
+        """
+        if len(pivots) < 2:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+
+        ufunc = np.minimum if kind == 'min' else np.maximum
+        bounded = values[:pivots[-1]]
+        extremes = ufunc.reduceat(bounded, pivots[:-1])
+
+        # İlk uç noktanın indeksini bul
+        segment = np.searchsorted(pivots[:-1], np.arange(pivots[0], pivots[-1]), side='right') - 1
+        segment_values = bounded[pivots[0]:]
+        hits = np.flatnonzero(segment_values == extremes[segment])
+        _, first = np.unique(segment[hits], return_index=True)
+        extreme_idx = hits[first] + pivots[0]
+
+        return extremes, extreme_idx
+
+    def _scan_double_tops(self, highs: np.ndarray) -> pd.DataFrame:
+        peaks = self.find_pivots(highs, 'high')
+        valleys, valley_idx = self._segment_extremes(highs, peaks, 'min')
+        if len(valleys) == 0:
+            return self._empty_result()
+
+        peak1 = highs[peaks[:-1]]
+        peak2 = highs[peaks[1:]]
+        price_diff = np.abs(peak1 - peak2) / peak1
+        valley_drop = (peak1 - valleys) / peak1
+
+        mask = (price_diff <= self.tolerance) & (valley_drop >= self.min_valley_drop)
+        return pd.DataFrame({
+            'pattern': 'double_top',
+            'signal': 'SHORT',
+            'confidence': np.minimum(90, 60 + valley_drop[mask] * 100),
+            'start_idx': peaks[:-1][mask],
+            'end_idx': peaks[1:][mask],
+            'confirmed_idx': peaks[1:][mask] + self.pivot_window,
+            'level': (peak1[mask] + peak2[mask]) / 2,
+            'target': valleys[mask]
+        })
+
+    def _scan_double_bottoms(self, lows: np.ndarray) -> pd.DataFrame:
+        troughs = self.find_pivots(lows, 'low')
+        peaks, peak_idx = self._segment_extremes(lows, troughs, 'max')
+        if len(peaks) == 0:
+            return self._empty_result()
+
+        valley1 = lows[troughs[:-1]]
+        valley2 = lows[troughs[1:]]
+        price_diff = np.abs(valley1 - valley2) / valley1
+        peak_rise = (peaks - valley1) / valley1
+
+        mask = (price_diff <= self.tolerance) & (peak_rise >= self.min_valley_drop)
+        return pd.DataFrame({
+            'pattern': 'double_bottom',
+            'signal': 'LONG',
+            'confidence': np.minimum(90, 60 + peak_rise[mask] * 100),
+            'start_idx': troughs[:-1][mask],
+            'end_idx': troughs[1:][mask],
+            'confirmed_idx': troughs[1:][mask] + self.pivot_window,
+            'level': (valley1[mask] + valley2[mask]) / 2,
+            'target': peaks[mask]
+        })
+
+    def _scan_head_and_shoulders(self, highs: np.ndarray) -> pd.DataFrame:
+        peaks = self.find_pivots(highs, 'high')
+        valleys, _ = self._segment_extremes(highs, peaks, 'min')
+        if len(peaks) < 3:
+            return self._empty_result()
+
+        left = highs[peaks[:-2]]
+        head = highs[peaks[1:-1]]
+        right = highs[peaks[2:]]
+        shoulder_max = np.maximum(left, right)
+
+        shoulder_diff = np.abs(left - right) / left
+        head_prominence = (head - shoulder_max) / shoulder_max
+        neckline = (valleys[:-1] + valleys[1:]) / 2
+
+        mask = ((head > left) & (head > right) &
+                (shoulder_diff <= self.tolerance * 2) &
+                (head_prominence >= self.min_head_prominence))
+        return pd.DataFrame({
+            'pattern': 'head_and_shoulders',
+            'signal': 'SHORT',
+            'confidence': np.minimum(95, 70 + head_prominence[mask] * 100),
+            'start_idx': peaks[:-2][mask],
+            'end_idx': peaks[2:][mask],
+            'confirmed_idx': peaks[2:][mask] + self.pivot_window,
+            'level': neckline[mask],
+            'target': neckline[mask] - (head[mask] - neckline[mask])
+        })
+
+    def _empty_result(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'pattern': pd.Series(dtype=object),
+            'signal': pd.Series(dtype=object),
+            'confidence': pd.Series(dtype=np.float64),
+            'start_idx': pd.Series(dtype=np.int64),
+            'end_idx': pd.Series(dtype=np.int64),
+            'confirmed_idx': pd.Series(dtype=np.int64),
+            'level': pd.Series(dtype=np.float64),
+            'target': pd.Series(dtype=np.float64)
+        })
+
+# Singleton instance
+historical_pattern_scanner = HistoricalPatternScanner()
@@ -0,0 +1,310 @@
+import threading
+from datetime import datetime
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from .trigger_book import TriggerBook
+
+# Tetik kodları
+HIT_NONE = 0
+HIT_SL = -1
+HIT_TP1 = 1
+HIT_TP2 = 2
+HIT_TP3 = 3
+
+def _legacy_levels(signal: Dict) -> Tuple:
+    """signals.json şeması: tp_levels sözlüğü ve sl_level"""
+    tp_levels = signal.get('tp_levels') or {}
+    return tp_levels.get('tp1'), tp_levels.get('tp2'), tp_levels.get('tp3'), signal.get('sl_level')
+
+def _advanced_levels(signal: Dict) -> Tuple:
+    """Gelişmiş üretici şeması: düz tp1/tp2/sl alanları"""
+    return signal.get('tp1'), signal.get('tp2'), None, signal.get('sl')
+
+# Sinyal şemaları: seviye alanları, yazılacak PnL alanları, tetik önceliği ve isimleri
+SIGNAL_SCHEMAS = {
+    'legacy': {
+        'levels': _legacy_levels,
+        'pnl_fields': ('pnl_percentage',),
+        'sl_first': False,  # Önce en yüksek TP, sonra SL
+        'hit_names': {HIT_TP3: 'tp3_hit', HIT_TP2: 'tp2_hit', HIT_TP1: 'tp1_hit', HIT_SL: 'stop_loss'},
+        'opened_field': 'timestamp',
+        'active_status': None  # Listedeki tüm sinyaller aktif
+    },
+    'advanced': {
+        'levels': _advanced_levels,
+        'pnl_fields': ('pnl_percent', 'pnl_percentage'),
+        'sl_first': True,  # Önce SL, sonra en yüksek TP
+        'hit_names': {HIT_SL: 'CLOSED_SL', HIT_TP2: 'CLOSED_TP2', HIT_TP1: 'CLOSED_TP1'},
+        'opened_field': 'created_at',
+        'active_status': 'ACTIVE'
+    }
+}
+
+def compute_pnl(entries: np.ndarray, directions: np.ndarray, prices: np.ndarray) -> np.ndarray:
+    """PnL yüzdeleri (LONG 1, SHORT -1)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return directions * (prices - entries) / entries * 100 + 0.0  # +0.0: SHORT'ta -0.0 yerine 0.0
+
+def resolve_hit(hits: List[Tuple[int, float]], sl_first: bool) -> Tuple[int, float]:
+    """
+    Aynı turda birden fazla seviye geçildiyse önceliğe göre tek tetik
+
+    Args:
+        hits: (tetik kodu, seviye) listesi
+        sl_first: SL, TP'lerden önce gelir
+
+    Returns:
+        (tetik kodu, seviye)
+    """
+    order = (HIT_SL, HIT_TP3, HIT_TP2, HIT_TP1) if sl_first else (HIT_TP3, HIT_TP2, HIT_TP1, HIT_SL)
+    levels = dict(hits)
+    for code in order:
+        if code in levels:
+            return code, levels[code]
+    return HIT_NONE, float('nan')
+
+def _opened_at(signal: Dict, field: str) -> Optional[float]:
+    """Sinyalin açılış zamanı (epoch; depodaki sinyallerde hazır tutulur)"""
+    opened_at = signal.get('opened_at')
+    if isinstance(opened_at, (int, float)):
+        return float(opened_at)
+    try:
+        return datetime.fromisoformat(signal[field]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def evaluate(entries: np.ndarray, directions: np.ndarray, prices: np.ndarray,
+             tps: np.ndarray, sl: np.ndarray, sl_first: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tüm sinyaller için PnL ve TP/SL tetiklerini tek geçişte hesapla
+
+    Eksik seviyeler NaN'dır (karşılaştırmalar False döner).
+
+    Args:
+        entries: [N] giriş fiyatları
+        directions: [N] yön (LONG 1, SHORT -1)
+        prices: [N] güncel fiyatlar
+        tps: [N,3] TP1..TP3 seviyeleri
+        sl: [N] SL seviyeleri
+        sl_first: Aynı anda TP ve SL tetiklenirse SL öncelikli
+
+    Returns:
+        (PnL yüzdeleri [N], tetik kodları [N] int8)
+    """
+    pnl = compute_pnl(entries, directions, prices)
+    with np.errstate(invalid='ignore'):
+        sl_hit = directions * (sl - prices) >= 0
+        tp_hit = directions[:, None] * (prices[:, None] - tps) >= 0
+
+    order = [(HIT_TP3, tp_hit[:, 2]), (HIT_TP2, tp_hit[:, 1]), (HIT_TP1, tp_hit[:, 0])]
+    order = [(HIT_SL, sl_hit)] + order if sl_first else order + [(HIT_SL, sl_hit)]
+
+    # Sondan başa uygulanır; böylece listede önce gelen tetik kazanır
+    hits = np.zeros(len(entries), dtype=np.int8)
+    for code, mask in reversed(order):
+        hits = np.where(mask, code, hits)
+
+    return pnl, hits.astype(np.int8)
+
+class PnLEngine:
+    """
+    Aktif sinyaller için vektörel PnL ve TP/SL motoru
+
+    Giriş, yön, TP ve SL seviyeleri NumPy dizilerinde tutulur; her fiyat
+    turunda tüm sinyallerin PnL'i tek vektörel geçişte hesaplanır, sonuçlar
+    sinyal sözlüklerine toplu yazılır. TP/SL tetikleri sembol başına fiyat
+    indeksli bir tetik defterinden okunur; tur yalnızca geçilen seviyelere
+    dokunur. Son kontrolden bu yana kapanan mumlar verilirse fitiller de
+    (high/low) tetikler. Diziler ve defter sinyal listesi değiştikçe
+    artımlı güncellenir.
+    """
+
+    def __init__(self, position_size: float = 1000.0):
+        self.position_size = position_size  # USD PnL için pozisyon büyüklüğü
+        self.intrabar_sl_first = True  # Aynı mumda hem TP hem SL geçildiyse SL (hangisinin önce olduğu bilinmez)
+        self._books: Dict[str, Dict[str, any]] = {}
+        self._lock = threading.RLock()
+
+    def build(self, signals: List[Dict], schema: str = 'legacy', book: Optional[str] = None) -> Dict[str, any]:
+        """
+        Sinyal listesinin dizilerini kur (liste aynıysa önbellekten)
+
+        Tetik defteri listeden çıkan sinyalleri siler, yeni gelenleri kaydeder.
+
+        Args:
+            signals: Sinyal sözlükleri
+            schema: 'legacy' veya 'advanced'
+            book: Defter adı (varsayılan şema adı; ayrı listeler ayrı defter kullanır)
+
+        Returns:
+            symbols, entries, directions, tps, sl dizileri ve tetik defteri
+        """
+        name = book or schema
+        key = tuple(id(signal) for signal in signals)
+        previous = self._books.get(name)
+        if previous is not None and previous['key'] == key:
+            return previous
+
+        spec = SIGNAL_SCHEMAS[schema]
+        n = len(signals)
+        levels = np.full((n, 4), np.nan)
+        for i, signal in enumerate(signals):
+            levels[i] = [level if level else np.nan for level in spec['levels'](signal)]
+
+        current = {
+            'key': key,
+            'signals': list(signals),  # Referans tutulur; id()'ler yeniden kullanılamaz
+            'rows': {signal_key: i for i, signal_key in enumerate(key)},
+            'symbols': [(s.get('coin_symbol') or s.get('symbol') or '').lower() for s in signals],
+            'entries': np.array([s.get('entry_price') or 0 for s in signals], dtype=np.float64),
+            'directions': np.array([1 if str(s.get('direction', '')).upper() == 'LONG' else -1
+                                    for s in signals], dtype=np.float64),
+            'tps': levels[:, :3],
+            'sl': levels[:, 3],
+            'triggers': previous['triggers'] if previous is not None else TriggerBook()
+        }
+
+        triggers = current['triggers']
+        if previous is not None:
+            for signal_key in set(previous['key']) - set(key):
+                triggers.remove(signal_key)
+        known = set(previous['key']) if previous is not None else set()
+        active_status = spec['active_status']
+        for i, signal in enumerate(signals):
+            if key[i] in known or current['entries'][i] <= 0:
+                continue
+            if active_status and signal.get('status') != active_status:
+                continue
+            triggers.add(key[i], current['symbols'][i], int(current['directions'][i]),
+                         [(HIT_TP1, levels[i, 0]), (HIT_TP2, levels[i, 1]), (HIT_TP3, levels[i, 2])],
+                         (HIT_SL, levels[i, 3]), _opened_at(signal, spec['opened_field']))
+
+        self._books[name] = current
+        return current
+
+    def get_trigger_stats(self) -> Dict[str, Dict[str, any]]:
+        """Defter başına tetik defteri istatistikleri"""
+        with self._lock:
+            return {name: book['triggers'].get_stats() for name, book in self._books.items()}
+
+    def drop(self, book: str):
+        """Defteri ve dizilerini sil"""
+        with self._lock:
+            self._books.pop(book, None)
+
+    def check(self, signal: Dict, price: float, schema: str = 'legacy') -> Optional[str]:
+        """
+        Tek sinyal için TP/SL tetiği
+
+        Returns:
+            Tetik adı (şemaya göre) veya None
+        """
+        spec = SIGNAL_SCHEMAS[schema]
+        levels = [level if level else np.nan for level in spec['levels'](signal)]
+        direction = 1 if str(signal.get('direction', '')).upper() == 'LONG' else -1
+
+        _, hits = evaluate(np.array([signal.get('entry_price') or 0], dtype=np.float64),
+                           np.array([direction], dtype=np.float64),
+                           np.array([price], dtype=np.float64),
+                           np.array([levels[:3]], dtype=np.float64),
+                           np.array([levels[3]], dtype=np.float64),
+                           spec['sl_first'])
+        return spec['hit_names'].get(int(hits[0]))
+
+    def update(self, signals: List[Dict], prices: Dict[str, float], schema: str = 'legacy',
+               check_triggers: bool = True, max_abs_pnl: Optional[float] = None,
+               move_threshold: Optional[float] = None, book: Optional[str] = None,
+               ranges: Optional[Dict[str, List[Tuple[float, float, float]]]] = None) -> Dict[str, any]:
+        """
+        Fiyat turunu uygula: PnL'i hesapla, sonuçları yaz, tetikleri döndür
+
+        Args:
+            signals: Sinyal sözlükleri (yerinde güncellenir)
+            prices: Küçük harf sembol -> güncel fiyat
+            schema: 'legacy' veya 'advanced'
+            check_triggers: TP/SL tetiklerini değerlendir
+            max_abs_pnl: Bu mutlak PnL'i aşan sinyaller 'extreme_pnl' ile kapatılmak üzere döner
+            move_threshold: Fiyatı bu orandan fazla değişen sinyaller 'moved' listesine girer
+            book: Defter adı (varsayılan şema adı)
+            ranges: Küçük harf sembol -> son kontrolden bu yana mumlar [(açılış epoch, low, high)];
+                mum tetiklerinde kapanış fiyatı geçilen seviyedir
+
+        Returns:
+            updated (PnL'i yazılan sinyal sayısı), total_pnl, hits [(sinyal, sebep, fiyat)],
+            moved [(sinyal, eski fiyat, yeni fiyat, PnL)]
+        """
+        result = {'updated': 0, 'total_pnl': 0.0, 'hits': [], 'moved': []}
+        with self._lock:
+            if not signals:
+                self.build(signals, schema, book)
+                return result
+            self._apply(self.build(signals, schema, book), signals, prices, SIGNAL_SCHEMAS[schema],
+                        check_triggers, max_abs_pnl, move_threshold, ranges or {}, result)
+        return result
+
+    def _apply(self, book: Dict[str, any], signals: List[Dict], prices: Dict[str, float], spec: Dict[str, any],
+               check_triggers: bool, max_abs_pnl: Optional[float], move_threshold: Optional[float],
+               ranges: Dict[str, List[Tuple[float, float, float]]], result: Dict[str, any]):
+        """Fiyat turunu kurulmuş deftere uygula"""
+        new_prices = np.array([prices.get(symbol) or np.nan for symbol in book['symbols']], dtype=np.float64)
+        old_prices = np.array([s.get('current_price') or 0 for s in signals], dtype=np.float64)
+
+        pnl = compute_pnl(book['entries'], book['directions'], new_prices)
+
+        priced = new_prices > 0
+        valued = priced & (book['entries'] > 0)
+        extreme = valued & (np.abs(pnl) > max_abs_pnl) if max_abs_pnl is not None else np.zeros(len(signals), dtype=bool)
+        written = valued & ~extreme
+
+        # Toplu geri yazma
+        price_list = new_prices.tolist()
+        for i in np.flatnonzero(priced).tolist():
+            signals[i]['current_price'] = price_list[i]
+
+        rows = np.flatnonzero(written).tolist()
+        pnl_rounded = np.round(pnl, 2).tolist()
+        pnl_usd = np.round(pnl / 100 * self.position_size, 2).tolist()
+        for i in rows:
+            signal = signals[i]
+            for field in spec['pnl_fields']:
+                signal[field] = pnl_rounded[i]
+            signal['pnl_usd'] = pnl_usd[i]
+
+        result['updated'] = len(rows)
+        result['total_pnl'] = float(pnl[written].sum())
+
+        for i in np.flatnonzero(extreme).tolist():
+            result['hits'].append((signals[i], 'extreme_pnl', price_list[i]))
+
+        if check_triggers:
+            # Sembol başına önce mumlar (zaman sırasıyla), sonra anlık fiyat; her biri
+            # yalnızca son turdan bu yana geçilen seviyelere dokunur
+            triggers = book['triggers']
+            fired = {}
+            for symbol in set(book['symbols']):
+                for start, low, high in ranges.get(symbol, ()):
+                    for signal_key, hits in triggers.on_range(symbol, low, high, start).items():
+                        fired[signal_key] = resolve_hit(hits, self.intrabar_sl_first)
+                price = prices.get(symbol)
+                if price and price > 0:
+                    for signal_key, hits in triggers.on_price(symbol, price).items():
+                        fired[signal_key] = (resolve_hit(hits, spec['sl_first'])[0], price)
+
+            names = spec['hit_names']
+            active_status = spec['active_status']
+            for signal_key, (code, close_price) in fired.items():
+                i = book['rows'][signal_key]
+                signal = signals[i]
+                if extreme[i] or (active_status and signal.get('status') != active_status):
+                    continue
+                result['hits'].append((signal, names[code], close_price))
+
+        if move_threshold is not None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                moved = written & (old_prices > 0) & (np.abs(old_prices - new_prices) / old_prices > move_threshold)
+            for i in np.flatnonzero(moved).tolist():
+                result['moved'].append((signals[i], float(old_prices[i]), price_list[i], float(pnl[i])))
+
+# Singleton instance
+pnl_engine = PnLEngine()
@@ -0,0 +1,209 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+class PollScheduler:
+    """
+    TP/SL mesafesine göre uyarlanan fiyat sorgulama planlayıcısı
+
+    Her sembol, fiyatın en yakın TP/SL seviyesine uzaklığına ve son
+    sorgulardaki oynaklığa göre bir katmana atanır: tetiğe yakın veya çok
+    oynak semboller 'hot' katmanda birkaç saniyede bir, uzak olanlar 'cold'
+    katmanda seyrek sorgulanır. Sorgular dakikalık istek bütçesiyle
+    sınırlanır; bütçe yetmezse en acil semboller önce alınır, kalanlar bir
+    sonraki tura kalır.
+
+    Seviyeler SignalStore dinleyicisiyle yalnızca değişen semboller için
+    yeniden hesaplanır.
+    """
+
+    TIERS = ('hot', 'warm', 'cold')
+
+    def __init__(self):
+        self.intervals = {'hot': 5, 'warm': 20, 'cold': 60}  # Katman sorgu aralıkları (saniye)
+        self.hot_distance = 0.005  # En yakın seviyeye %0.5'ten yakınsa hot
+        self.warm_distance = 0.02  # %2'den yakınsa warm
+        self.hot_volatility = 0.01  # Dakikalık tipik hareket %1'i aşarsa hot
+        self.volatility_alpha = 0.3  # Oynaklık EWMA katsayısı
+        self.requests_per_minute = 20  # Upstream istek bütçesi
+        self.batch_size = 100  # Tek istekte sorgulanan sembol sayısı (CoinGecko simple/price)
+
+        self._symbols: Dict[str, Dict[str, any]] = {}
+        self._dirty = set()
+        self._store = None
+        self._requests = deque()  # Son bir dakikadaki istek zamanları
+        self._lock = threading.RLock()
+        self.stats = {'polls': 0, 'symbols_polled': 0, 'requests': 0, 'budget_deferred': 0, 'tier_changes': 0}
+
+    def attach(self, store):
+        """
+        Sinyal deposuna bağlan
+
+        Args:
+            store: SignalStore; ekleme/silme olaylarında ilgili sembol yenilenir
+        """
+        with self._lock:
+            self._store = store
+            self._dirty.update(s['coin_symbol'].lower() for s in store.values())
+        store.add_listener(self._on_store_event)
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """
+        Sorgu zamanı gelen semboller (bütçe dahilinde, en acil önce)
+
+        Args:
+            now: Referans zaman (varsayılan şimdi)
+
+        Returns:
+            Küçük harf semboller
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._refresh_dirty(now)
+            due = [(self.TIERS.index(state['tier']), state['next_poll'], symbol)
+                   for symbol, state in self._symbols.items() if state['next_poll'] <= now]
+            if not due:
+                return []
+
+            due.sort()
+            capacity = self._budget_left(now) * self.batch_size
+            if len(due) > capacity:
+                self.stats['budget_deferred'] += len(due) - capacity
+                due = due[:capacity]
+            return [symbol for _, _, symbol in due]
+
+    def record(self, symbols: Iterable[str], prices: Dict[str, float], now: Optional[float] = None):
+        """
+        Sorgu sonucunu işle: oynaklığı ve katmanları güncelle, sonraki sorguyu planla
+
+        Args:
+            symbols: Sorgulanan semboller
+            prices: Küçük harf sembol -> fiyat
+            now: Sorgu zamanı (varsayılan şimdi)
+        """
+        now = time.time() if now is None else now
+        symbols = list(symbols)
+        with self._lock:
+            for _ in range(math.ceil(len(symbols) / self.batch_size)):
+                self._requests.append(now)
+            self.stats['requests'] += math.ceil(len(symbols) / self.batch_size)
+            self.stats['polls'] += 1
+            self.stats['symbols_polled'] += len(symbols)
+
+            for symbol in symbols:
+                state = self._symbols.get(symbol)
+                if state is None:
+                    continue
+                price = prices.get(symbol)
+                if price and price > 0:
+                    last_price, last_polled = state['price'], state['polled_at']
+                    if last_price and last_polled and now > last_polled:
+                        # Dakikaya ölçeklenmiş mutlak getiri (rastgele yürüyüş: karekök zaman)
+                        move = abs(price / last_price - 1) / math.sqrt(max(now - last_polled, 1) / 60)
+                        state['volatility'] += self.volatility_alpha * (move - state['volatility'])
+                    state['price'] = price
+                state['polled_at'] = now
+                self._assign_tier(symbol, state)
+                state['next_poll'] = now + self.intervals[state['tier']]
+
+    def next_poll_in(self, now: Optional[float] = None) -> Optional[float]:
+        """En yakın planlı sorguya kalan süre (sembol yoksa None)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._refresh_dirty(now)
+            if not self._symbols:
+                return None
+            return max(0.0, min(state['next_poll'] for state in self._symbols.values()) - now)
+
+    def get_stats(self) -> Dict[str, any]:
+        """Katman dağılımı ve istek bütçesi kullanımı"""
+        now = time.time()
+        with self._lock:
+            self._refresh_dirty(now)
+            tiers = {tier: 0 for tier in self.TIERS}
+            for state in self._symbols.values():
+                tiers[state['tier']] += 1
+            return {
+                **self.stats,
+                'tiers': tiers,
+                'intervals': dict(self.intervals),
+                'requests_last_minute': self.requests_per_minute - self._budget_left(now),
+                'requests_per_minute': self.requests_per_minute
+            }
+
+    def get_symbol_states(self) -> Dict[str, Dict[str, any]]:
+        """Sembol başına katman, mesafe ve oynaklık"""
+        with self._lock:
+            return {
+                symbol: {
+                    'tier': state['tier'],
+                    'distance': round(state['distance'], 5) if state['distance'] is not None else None,
+                    'volatility': round(state['volatility'], 5),
+                    'next_poll': state['next_poll']
+                }
+                for symbol, state in self._symbols.items()
+            }
+
+    def _on_store_event(self, event: str, signal: Dict[str, any]):
+        symbol = signal.get('coin_symbol')
+        if symbol:
+            with self._lock:
+                self._dirty.add(symbol.lower())
+
+    def _refresh_dirty(self, now: float):
+        """Değişen sembollerin seviyelerini depodan yeniden oku (kilit altında)"""
+        if not self._dirty or self._store is None:
+            return
+        for symbol in self._dirty:
+            levels = []
+            price = None
+            for signal in self._store.find(symbol=symbol):
+                levels += [level for level in (signal.get('tp_levels') or {}).values() if level]
+                if signal.get('sl_level'):
+                    levels.append(signal['sl_level'])
+                price = price or signal.get('current_price')
+
+            if not levels:
+                self._symbols.pop(symbol, None)
+                continue
+
+            state = self._symbols.get(symbol)
+            if state is None:
+                # Yeni sembol hemen sorgulanır
+                state = self._symbols[symbol] = {'tier': 'warm', 'price': price, 'polled_at': None,
+                                                 'volatility': 0.0, 'distance': None, 'next_poll': now}
+            state['levels'] = levels
+            tier = state['tier']
+            self._assign_tier(symbol, state)
+            if self.TIERS.index(state['tier']) < self.TIERS.index(tier):
+                # Daha sıcak katmana geçtiyse sorgu öne çekilir
+                state['next_poll'] = min(state['next_poll'], now + self.intervals[state['tier']])
+        self._dirty.clear()
+
+    def _assign_tier(self, symbol: str, state: Dict[str, any]):
+        """Mesafe ve oynaklığa göre katman ata"""
+        price = state['price']
+        if price:
+            state['distance'] = min(abs(level - price) for level in state['levels']) / price
+        distance = state['distance']
+
+        if distance is None:
+            tier = 'warm'
+        elif distance <= self.hot_distance or state['volatility'] >= self.hot_volatility:
+            tier = 'hot'
+        elif distance <= self.warm_distance:
+            tier = 'warm'
+        else:
+            tier = 'cold'
+
+        if tier != state['tier']:
+            self.stats['tier_changes'] += 1
+            state['tier'] = tier
+
+    def _budget_left(self, now: float) -> int:
+        """Son bir dakikada kalan istek hakkı (kilit altında)"""
+        while self._requests and self._requests[0] <= now - 60:
+            self._requests.popleft()
+        return max(0, self.requests_per_minute - len(self._requests))
@@ -0,0 +1,240 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from .pnl_engine import pnl_engine
+
+# Pozisyon büyüklüğü kuralları
+SIZING_POLICIES = ('fixed', 'percent', 'confidence', 'compound')
+
+def history_to_arrays(history: List[Dict[str, any]]) -> Dict[str, np.ndarray]:
+    """
+    Sinyal geçmişini simülasyon dizilerine çevir
+
+    Her iki üreticinin geçmiş kayıtları desteklenir (entry_time/close_time
+    veya timestamp/closed_at; kapanış fiyatı yoksa son fiyat). Fiyatı veya
+    zamanı eksik kayıtlar atlanır. Zaman damgaları tek seferde vektörel
+    çözülür; aynı diziler farklı kurallarla tekrar tekrar simüle edilebilir.
+
+    Args:
+        history: Kapanmış sinyal kayıtları
+
+    Returns:
+        entry_time, exit_time (epoch), direction (LONG 1, SHORT -1),
+        entry_price, exit_price, confidence dizileri
+    """
+    frame = pd.DataFrame({
+        'entry_time': [h.get('entry_time') or h.get('timestamp') for h in history],
+        'exit_time': [h.get('close_time') or h.get('closed_at') for h in history],
+        'direction': [1.0 if str(h.get('direction', '')).upper() == 'LONG' else -1.0 for h in history],
+        'entry_price': [h.get('entry_price') for h in history],
+        'exit_price': [h.get('close_price') or h.get('current_price') for h in history],
+        'confidence': [h.get('confidence') for h in history]
+    })
+
+    arrays = {
+        'entry_time': _to_epoch(frame['entry_time']),
+        'exit_time': _to_epoch(frame['exit_time']),
+        'direction': frame['direction'].to_numpy(dtype=np.float64),
+        'entry_price': pd.to_numeric(frame['entry_price'], errors='coerce').to_numpy(dtype=np.float64),
+        'exit_price': pd.to_numeric(frame['exit_price'], errors='coerce').to_numpy(dtype=np.float64),
+        'confidence': pd.to_numeric(frame['confidence'], errors='coerce').fillna(100).to_numpy(dtype=np.float64)
+    }
+    valid = (np.isfinite(arrays['entry_time']) & np.isfinite(arrays['exit_time'])
+             & (arrays['entry_price'] > 0) & (arrays['exit_price'] > 0))
+    return {name: values[valid] for name, values in arrays.items()}
+
+def _to_epoch(values: pd.Series) -> np.ndarray:
+    """ISO zaman damgalarını epoch'a çevir (çözülemeyenler NaN)"""
+    parsed = pd.to_datetime(values, errors='coerce', format='mixed')
+    return ((parsed - pd.Timestamp(0)) / pd.Timedelta(seconds=1)).to_numpy(dtype=np.float64, na_value=np.nan)
+
+def trade_returns(direction: np.ndarray, entry_price: np.ndarray, exit_price: np.ndarray,
+                  fee_rate: float = 0.0, slippage_bps: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    İşlem başına net getiri (pozisyon büyüklüğüne oranla)
+
+    Kayma giriş ve çıkışta işlem aleyhine uygulanır; komisyon iki tarafın
+    nominal tutarından alınır. Kaldıraçsız LONG pozisyon nominalinden fazla
+    kaybedemez (getiri -1'in altına inmez); SHORT pozisyonun kaybı fiyat
+    yükseldikçe sınırsızdır ve kırpılmaz.
+
+    Args:
+        direction: LONG 1, SHORT -1
+        entry_price: Giriş fiyatları
+        exit_price: Çıkış fiyatları
+        fee_rate: Taraf başına komisyon oranı (ör. 0.001)
+        slippage_bps: Taraf başına kayma (baz puan)
+
+    Returns:
+        (net getiri, komisyon oranı) dizileri
+    """
+    slip = slippage_bps / 10000
+    entry = entry_price * (1 + direction * slip)
+    exit_ = exit_price * (1 - direction * slip)
+    gross = direction * (exit_ - entry) / entry
+    fees = fee_rate * (1 + exit_ / entry)
+    net = gross - fees
+    return np.where(direction > 0, np.maximum(net, -1.0), net), fees
+
+class PortfolioSimulator:
+    """
+    Vektörel portföy simülatörü
+
+    Kapanmış sinyaller dizi olarak alınır; işlem başına PnL, gerçekleşen
+    özsermaye eğrisi, açık pozisyon (exposure) eğrisi ve drawdown tek
+    geçişte NumPy ile hesaplanır. Python döngüsü yoktur; 100 bin işlem
+    farklı kurallarla milisaniyeler içinde yeniden simüle edilir.
+
+    Büyüklük kuralları:
+        fixed: İşlem başına sabit nominal (position_size)
+        percent: Başlangıç sermayesinin sabit oranı (fraction)
+        confidence: position_size × güven / 100
+        compound: Özsermayenin sabit oranı; özsermaye işlemler kapandıkça
+            bileşik büyür (çakışmayan işlemlerde girişteki özsermayeye eşittir)
+    """
+
+    def __init__(self):
+        self.initial_capital = 10000.0
+        self.position_size = None  # Sabit nominal (None = canlı PnL motorunun pozisyon büyüklüğü)
+        self.fraction = 0.1  # percent/compound kurallarında sermaye oranı
+        self.fee_rate = 0.0  # Taraf başına komisyon (canlı kayıtlar brüt PnL tutar)
+        self.slippage_bps = 0.0  # Taraf başına kayma
+
+        print("💼 Portfolio Simulator başlatıldı")
+
+    def config(self, **overrides) -> Dict[str, any]:
+        """Varsayılanlarla birleştirilmiş simülasyon parametreleri"""
+        config = {
+            'sizing': 'fixed',
+            'initial_capital': self.initial_capital,
+            'position_size': self.position_size if self.position_size is not None else pnl_engine.position_size,
+            'fraction': self.fraction,
+            'fee_rate': self.fee_rate,
+            'slippage_bps': self.slippage_bps
+        }
+        config.update({key: value for key, value in overrides.items() if value is not None})
+        if config['sizing'] not in SIZING_POLICIES:
+            raise ValueError(f"Bilinmeyen büyüklük kuralı: {config['sizing']}")
+        return config
+
+    def trade_pnl(self, direction: str, entry_price: float, close_price: float) -> Tuple[float, float]:
+        """
+        Tek işlemin PnL'i (canlı geçmiş kaydı için, sabit nominal)
+
+        Returns:
+            (PnL yüzdesi, PnL USD)
+        """
+        config = self.config()
+        returns, _ = trade_returns(
+            np.array([1.0 if direction.upper() == 'LONG' else -1.0]),
+            np.array([float(entry_price)]), np.array([float(close_price)]),
+            config['fee_rate'], config['slippage_bps']
+        )
+        pnl_percentage = float(returns[0]) * 100
+        return pnl_percentage, pnl_percentage / 100 * config['position_size']
+
+    def simulate(self, trades: Dict[str, np.ndarray], include_curve: bool = False, **overrides) -> Dict[str, any]:
+        """
+        İşlem dizilerini verilen kuralla simüle et
+
+        Args:
+            trades: history_to_arrays çıktısı
+            include_curve: Özsermaye/exposure eğrilerini ve işlem PnL'lerini döndür
+            **overrides: sizing, initial_capital, position_size, fraction, fee_rate, slippage_bps
+
+        Returns:
+            Özet metrikler (ve istenirse eğriler)
+        """
+        config = self.config(**overrides)
+        n = len(trades['entry_price'])
+        summary = {'config': config, 'trades': n}
+        if n == 0:
+            summary.update({'final_equity': config['initial_capital'], 'total_pnl': 0.0, 'return_pct': 0.0,
+                            'fees_paid': 0.0, 'win_rate': 0.0, 'max_drawdown': 0.0, 'max_drawdown_pct': 0.0,
+                            'max_exposure': 0.0})
+            return summary
+
+        returns, fees = trade_returns(trades['direction'], trades['entry_price'], trades['exit_price'],
+                                      config['fee_rate'], config['slippage_bps'])
+
+        # Gerçekleşen özsermaye kapanış sırasıyla
+        order = np.argsort(trades['exit_time'], kind='stable')
+        capital = config['initial_capital']
+        sizing = config['sizing']
+        if sizing == 'compound':
+            growth = 1 + config['fraction'] * returns[order]
+            equity_after = capital * np.cumprod(growth)
+            equity_before = np.concatenate(([capital], equity_after[:-1]))
+            notional = np.empty(n)
+            notional[order] = equity_before * config['fraction']
+        elif sizing == 'percent':
+            notional = np.full(n, capital * config['fraction'])
+        elif sizing == 'confidence':
+            notional = config['position_size'] * np.clip(trades['confidence'], 0, 100) / 100
+        else:
+            notional = np.full(n, float(config['position_size']))
+
+        pnl = notional * returns
+        equity = capital + np.cumsum(pnl[order])
+        peak = np.maximum.accumulate(np.concatenate(([capital], equity)))[1:]
+        drawdown = peak - equity
+
+        # Açık pozisyon: girişte +nominal, çıkışta -nominal (aynı anda önce çıkış)
+        times = np.concatenate((trades['entry_time'], trades['exit_time']))
+        deltas = np.concatenate((notional, -notional))
+        event_order = np.lexsort((deltas, times))
+        exposure = np.cumsum(deltas[event_order])
+
+        total_pnl = float(pnl.sum())
+        summary.update({
+            'final_equity': round(capital + total_pnl, 2),
+            'total_pnl': round(total_pnl, 2),
+            'return_pct': round(total_pnl / capital * 100, 2) if capital else 0.0,
+            'fees_paid': round(float((notional * fees).sum()), 2),
+            'win_rate': round(float((pnl > 0).mean()) * 100, 1),
+            'avg_trade_pnl': round(total_pnl / n, 2),
+            'max_drawdown': round(float(drawdown.max()), 2),
+            'max_drawdown_pct': round(float((drawdown / peak).max()) * 100, 2),
+            'max_exposure': round(float(exposure.max()), 2)
+        })
+
+        if include_curve:
+            summary['equity_curve'] = {
+                'time': trades['exit_time'][order].tolist(),
+                'equity': np.round(equity, 2).tolist(),
+                'drawdown': np.round(drawdown, 2).tolist()
+            }
+            summary['exposure_curve'] = {
+                'time': times[event_order].tolist(),
+                'exposure': np.round(exposure, 2).tolist()
+            }
+            summary['trade_pnl'] = np.round(pnl, 2).tolist()
+        return summary
+
+    def compare(self, trades: Dict[str, np.ndarray], policies: List[Dict[str, any]],
+                include_curve: bool = False) -> List[Dict[str, any]]:
+        """Aynı işlemleri birden fazla kuralla simüle et (diziler bir kez kurulur)"""
+        return [self.simulate(trades, include_curve, **policy) for policy in policies]
+
+    def simulate_history(self, history: List[Dict[str, any]], include_curve: bool = False,
+                         policies: Optional[List[Dict[str, any]]] = None, **overrides):
+        """
+        Sinyal geçmişini simüle et
+
+        Args:
+            history: Kapanmış sinyal kayıtları
+            include_curve: Eğrileri döndür
+            policies: Verilirse her kural için ayrı sonuç listesi
+            **overrides: Tek simülasyon parametreleri
+
+        Returns:
+            Simülasyon sonucu veya sonuç listesi
+        """
+        trades = history_to_arrays(history)
+        if policies:
+            return self.compare(trades, policies, include_curve)
+        return self.simulate(trades, include_curve, **overrides)
+
+# Singleton instance
+portfolio_simulator = PortfolioSimulator()
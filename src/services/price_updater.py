@@ -7,6 +7,7 @@ import threading
 import time
 import requests
 from datetime import datetime
+from src.services.pnl_engine import pnl_engine
 
 class PriceUpdater:
     def __init__(self, signal_generator):
@@ -68,42 +69,15 @@ class PriceUpdater:
                 print("❌ Fiyat verisi alınamadı")
                 return
             
-            updated_count = 0
-            total_pnl = 0
+            # PnL tüm sinyaller için tek vektörel geçişte
+            result = pnl_engine.update(signals, prices, 'legacy', check_triggers=False,
+                                       move_threshold=0.02, book='price_updater')
+            updated_count = result['updated']
+            total_pnl = result['total_pnl']
             
-            for signal in signals:
-                symbol_lower = signal.get('coin_symbol', '').lower()
-                
-                if symbol_lower in prices:
-                    new_price = prices[symbol_lower]
-                    
-                    if new_price and new_price > 0:
-                        old_price = signal.get('current_price', 0)
-                        entry_price = signal.get('entry_price', 0)
-                        
-                        # Fiyatı güncelle
-                        signal['current_price'] = new_price
-                        
-                        # PnL hesapla
-                        if entry_price > 0:
-                            if signal.get('direction', '').upper() == 'LONG':
-                                pnl_percentage = ((new_price - entry_price) / entry_price) * 100
-                            else:
-                                pnl_percentage = ((entry_price - new_price) / entry_price) * 100
-                            
-                            signal['pnl_percentage'] = round(pnl_percentage, 2)
-                            
-                            # USD PnL hesapla (1000$ pozisyon varsayımı)
-                            position_size = 1000
-                            pnl_usd = (pnl_percentage / 100) * position_size
-                            signal['pnl_usd'] = round(pnl_usd, 2)
-                            
-                            total_pnl += pnl_percentage
-                            updated_count += 1
-                            
-                            # Önemli fiyat değişimlerini logla
-                            if old_price > 0 and abs(old_price - new_price) / old_price > 0.02:  # %2'den fazla
-                                print(f"💰 {signal['coin_symbol']}: ${old_price:.4f} → ${new_price:.4f} (PnL: {pnl_percentage:+.2f}%)")
+            # Önemli fiyat değişimlerini logla
+            for signal, old_price, new_price, pnl_percentage in result['moved']:
+                print(f"💰 {signal['coin_symbol']}: ${old_price:.4f} → ${new_price:.4f} (PnL: {pnl_percentage:+.2f}%)")
             
             if updated_count > 0:
                 # Sinyalleri kaydet
@@ -9,12 +9,19 @@ import requests
 from datetime import datetime
 from src.services.signal_generator import signal_generator
 from src.services.coin_gecko_service import coin_gecko_service
+from src.services.pnl_engine import pnl_engine
+from src.services.poll_scheduler import PollScheduler
+from src.services.tick_buffer import tick_buffer
 
 class PriceUpdaterService:
     def __init__(self):
         self.running = False
         self.update_thread = None
-        self.update_interval = 30  # 30 saniyede bir güncelle
+        self.update_interval = 30  # Tam güncelleme aralığı (force_update ve planlayıcı kapalıyken)
+        self.adaptive_polling = True  # Sembolleri TP/SL mesafesine göre katmanlı sorgula
+        self.max_idle_sleep = 5  # Planlayıcı turları arası en uzun bekleme (saniye)
+        self.scheduler = PollScheduler()
+        self.scheduler.attach(signal_generator.store)
         
     def start(self):
         """Otomatik fiyat güncellemeyi başlat"""
@@ -25,7 +32,11 @@ class PriceUpdaterService:
         self.running = True
         self.update_thread = threading.Thread(target=self._update_loop, daemon=True)
         self.update_thread.start()
-        print("🔄 Otomatik PnL güncelleme başlatıldı (30 saniye aralık)")
+        if self.adaptive_polling:
+            intervals = self.scheduler.intervals
+            print(f"🔄 Otomatik PnL güncelleme başlatıldı (katmanlı: {intervals['hot']}/{intervals['warm']}/{intervals['cold']} saniye)")
+        else:
+            print(f"🔄 Otomatik PnL güncelleme başlatıldı ({self.update_interval} saniye aralık)")
         
     def stop(self):
         """Otomatik fiyat güncellemeyi durdur"""
@@ -38,8 +49,13 @@ class PriceUpdaterService:
         """Ana güncelleme döngüsü"""
         while self.running:
             try:
-                self._update_all_signals()
-                time.sleep(self.update_interval)
+                if self.adaptive_polling:
+                    self._update_due_signals()
+                    wait = self.scheduler.next_poll_in()
+                    time.sleep(min(self.max_idle_sleep, max(1, wait if wait is not None else self.max_idle_sleep)))
+                else:
+                    self._update_all_signals()
+                    time.sleep(self.update_interval)
             except Exception as e:
                 print(f"❌ PnL güncelleme döngüsü hatası: {e}")
                 time.sleep(5)  # Hata durumunda kısa bekle
@@ -67,50 +83,61 @@ class PriceUpdaterService:
                 print("❌ Fiyat verisi alınamadı")
                 return
             
-            updated_count = 0
-            total_pnl = 0
-            
-            for signal in active_signals:
-                symbol = signal.get('coin_symbol', signal.get('symbol', '')).lower()
-                
-                if symbol in price_updates:
-                    old_price = signal.get('current_price', 0)
-                    new_price = price_updates[symbol]
-                    
-                    if new_price and new_price > 0:
-                        signal['current_price'] = new_price
-                        entry_price = signal.get('entry_price', 0)
-                        
-                        # PnL hesaplama
-                        if entry_price > 0:
-                            if signal.get('direction', '').upper() == 'LONG':
-                                pnl_percentage = ((new_price - entry_price) / entry_price) * 100
-                            else:
-                                pnl_percentage = ((entry_price - new_price) / entry_price) * 100
-                            
-                            signal['pnl_percentage'] = round(pnl_percentage, 2)
-                            
-                            # USD PnL hesaplama (1000$ pozisyon varsayımı)
-                            position_size = 1000
-                            pnl_usd = (pnl_percentage / 100) * position_size
-                            signal['pnl_usd'] = round(pnl_usd, 2)
-                            
-                            total_pnl += pnl_percentage
-                            updated_count += 1
-                            
-                            # Önemli fiyat değişimlerini logla
-                            if old_price > 0 and abs(old_price - new_price) / old_price > 0.02:  # %2'den fazla
-                                print(f"💰 {signal['coin_symbol']}: ${old_price:.4f} → ${new_price:.4f} (PnL: {pnl_percentage:+.2f}%)")
-            
-            if updated_count > 0:
-                # Sinyalleri kaydet
-                signal_generator.save_signals()
-                avg_pnl = total_pnl / updated_count
-                print(f"✅ {updated_count} sinyal güncellendi - Ortalama PnL: {avg_pnl:+.2f}%")
+            self.scheduler.record({symbol.lower() for symbol in symbols}, price_updates)
+            self._apply_prices(active_signals, price_updates)
                 
         except Exception as e:
             print(f"❌ Sinyal güncelleme hatası: {e}")
             
+    def _update_due_signals(self):
+        """Yalnızca sorgu zamanı gelen sembollerin fiyatlarını güncelle"""
+        try:
+            due = self.scheduler.due()
+            if not due:
+                return
+            
+            price_updates = coin_gecko_service.get_current_prices(due)
+            self.scheduler.record(due, price_updates)
+            if not price_updates:
+                print("❌ Fiyat verisi alınamadı")
+                return
+            
+            self._apply_prices(signal_generator.get_active_signals(), price_updates)
+            
+        except Exception as e:
+            print(f"❌ Katmanlı fiyat güncelleme hatası: {e}")
+    
+    def _apply_prices(self, active_signals, price_updates):
+        """
+        Fiyatları sinyallere uygula; TP/SL'ye ulaşanları kapat
+        
+        Fiyatı gelmeyen sinyaller atlanır; tetik kontrolü yalnızca sorgulanan
+        sembollerde yapılır.
+        """
+        # Her sorgu sonucu tick tamponuna (yerel 1 dakikalık mumlar)
+        tick_buffer.record_many(price_updates)
+        
+        # PnL ve TP/SL tüm sinyaller için tek vektörel geçişte
+        result = pnl_engine.update(active_signals, price_updates, 'legacy', max_abs_pnl=500,
+                                   move_threshold=0.02, book='price_updater_service')
+        updated_count = result['updated']
+        total_pnl = result['total_pnl']
+        
+        # Önemli fiyat değişimlerini logla
+        for signal, old_price, new_price, pnl_percentage in result['moved']:
+            print(f"💰 {signal['coin_symbol']}: ${old_price:.4f} → ${new_price:.4f} (PnL: {pnl_percentage:+.2f}%)")
+        
+        for signal, close_reason, close_price in result['hits']:
+            if close_reason == 'extreme_pnl':
+                print(f"⚠️ {signal['coin_symbol']}: Aşırı PnL tespit edildi - Sinyal kapatılıyor")
+            signal_generator.close_signal(signal, close_reason, close_price)
+        
+        if updated_count > 0:
+            # Sinyalleri kaydet
+            signal_generator.save_signals()
+            avg_pnl = total_pnl / updated_count
+            print(f"✅ {updated_count} sinyal güncellendi - Ortalama PnL: {avg_pnl:+.2f}%")
+    
     def force_update(self):
         """Manuel fiyat güncelleme"""
         print("🔄 Manuel PnL güncelleme başlatılıyor...")
@@ -121,6 +148,9 @@ class PriceUpdaterService:
         return {
             'running': self.running,
             'interval': self.update_interval,
+            'adaptive_polling': self.adaptive_polling,
+            'scheduler': self.scheduler.get_stats(),
+            'ticks': tick_buffer.get_stats(),
             'last_update': datetime.now().isoformat()
         }
 
@@ -0,0 +1,252 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Aşama sonu işareti
+_DONE = object()
+
+# Worker thread'lerinde geçerli iptal token'ı
+_local = threading.local()
+
+class ScanCancelled(Exception):
+    """Tarama iptal edildi veya süresi doldu"""
+
+class CancellationToken:
+    """
+    Tarama iptal token'ı
+
+    cancel() ile elle veya deadline geçince kendiliğinden iptal olur.
+    Pipeline worker'ları token'ı thread'e bağlar; alt servisler
+    current_token() ile alıp bekleme ve istek sürelerini sınırlar.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self.reason = None
+        self._event = threading.Event()
+
+    @classmethod
+    def with_budget(cls, seconds: Optional[float]) -> 'CancellationToken':
+        """Şu andan itibaren seconds saniye süreli token (None = süresiz)"""
+        return cls(time.time() + seconds if seconds else None)
+
+    def cancel(self, reason: str = 'cancelled'):
+        """Token'ı iptal et"""
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.time() >= self.deadline:
+            self.cancel('deadline')
+            return True
+        return False
+
+    def check(self):
+        """İptal edildiyse ScanCancelled fırlat"""
+        if self.cancelled:
+            raise ScanCancelled(self.reason)
+
+    def remaining(self) -> Optional[float]:
+        """Deadline'a kalan süre (deadline yoksa None)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def sleep(self, seconds: float):
+        """İptalde erken uyanan bekleme; iptal edilirse ScanCancelled fırlatır"""
+        remaining = self.remaining()
+        self._event.wait(seconds if remaining is None else min(seconds, remaining))
+        self.check()
+
+def current_token() -> Optional[CancellationToken]:
+    """Bu thread'de çalışan taramanın token'ı"""
+    return getattr(_local, 'token', None)
+
+def bind_token(token: Optional[CancellationToken]):
+    """Token'ı bu thread'e bağla"""
+    _local.token = token
+
+class ScanPipeline:
+    """
+    Tarama için aşamalı eşzamanlı pipeline
+
+    fetch (I/O, çok thread) -> analiz (CPU, çok thread) -> emit (tek thread)
+
+    Aşamalar sınırlı kuyruklarla bağlıdır; bir aşama yavaşlarsa kuyruk dolar
+    ve önceki aşama bekler (backpressure). Böylece tarama süresi fetch ve
+    analiz sürelerinin toplamı yerine yaklaşık en büyüğü olur. emit aşaması
+    çağıran thread'de çalışır, bu yüzden paylaşılan durumu güncellemek için
+    kilit gerekmez.
+    
+    Token iptal edilince (elle veya deadline) yeni öğe beslenmez, kuyruktaki
+    ve yarım kalan öğeler atılır; o ana kadar analiz edilenler yine emit
+    edilir (kısmi sonuç).
+    """
+
+    def __init__(self, fetch_workers: int = 4, analysis_workers: int = 2, queue_size: int = 8):
+        self.fetch_workers = fetch_workers
+        self.analysis_workers = analysis_workers
+        self.queue_size = queue_size
+
+    def run(self, items: Iterable[Any],
+            fetch_fn: Callable[[Any], Optional[Any]],
+            analyze_fn: Callable[[Any, Any], Optional[Any]],
+            emit_fn: Callable[[Any, Any], None],
+            token: Optional[CancellationToken] = None,
+            fail_fn: Optional[Callable[[Any, str], None]] = None) -> Dict[str, any]:
+        """
+        Pipeline'ı çalıştır
+
+        Args:
+            items: İşlenecek öğeler (ör. coin sembolleri)
+            fetch_fn: item -> payload (None dönerse öğe atlanır)
+            analyze_fn: (item, payload) -> sonuç (None dönerse öğe atlanır)
+            emit_fn: (item, sonuç) -> None, çağıran thread'de çalışır
+            token: İptal/deadline token'ı
+            fail_fn: (item, aşama) -> None, fetch veya analiz başarısız olunca
+                worker thread'inde çağrılır (iptal edilen öğeler için çağrılmaz)
+
+        Returns:
+            Aşama istatistikleri
+        """
+        start_time = time.time()
+        token = token or CancellationToken()
+        fetch_queue = queue.Queue(maxsize=self.queue_size)
+        analysis_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue(maxsize=self.queue_size)
+
+        stats = {
+            'fetched': 0, 'fetch_failed': 0, 'fetch_time': 0.0,
+            'analyzed': 0, 'analysis_failed': 0, 'analysis_time': 0.0,
+            'emitted': 0, 'emit_time': 0.0,
+            'fed': 0, 'cancelled': 0
+        }
+        stats_lock = threading.Lock()
+        remaining = {'fetch': self.fetch_workers, 'analysis': self.analysis_workers}
+
+        def add_stat(key: str, value):
+            with stats_lock:
+                stats[key] += value
+
+        def failed(item, stage: str):
+            add_stat(f"{stage}_failed", 1)
+            if fail_fn:
+                try:
+                    fail_fn(item, stage)
+                except Exception as e:
+                    print(f"❌ {item} hata bildirimi başarısız: {e}")
+
+        def stage_finished(stage: str, downstream: queue.Queue, sentinel_count: int):
+            # Son worker çıkınca sonraki aşamaya bitiş işaretlerini gönder
+            with stats_lock:
+                remaining[stage] -= 1
+                last = remaining[stage] == 0
+            if last:
+                for _ in range(sentinel_count):
+                    downstream.put(_DONE)
+
+        def feeder():
+            try:
+                for item in items:
+                    if token.cancelled:
+                        break
+                    fetch_queue.put(item)
+                    add_stat('fed', 1)
+            finally:
+                for _ in range(self.fetch_workers):
+                    fetch_queue.put(_DONE)
+
+        def fetch_worker():
+            bind_token(token)
+            while True:
+                item = fetch_queue.get()
+                if item is _DONE:
+                    break
+                if token.cancelled:
+                    add_stat('cancelled', 1)
+                    continue
+                t0 = time.time()
+                try:
+                    payload = fetch_fn(item)
+                except ScanCancelled:
+                    payload = None
+                except Exception as e:
+                    print(f"❌ {item} veri alma hatası: {e}")
+                    payload = None
+                add_stat('fetch_time', time.time() - t0)
+
+                if token.cancelled:
+                    # Yarım kalmış olabilir: eksik timeframe'lerle analiz etme
+                    add_stat('cancelled', 1)
+                    continue
+                if payload is None:
+                    failed(item, 'fetch')
+                    continue
+                add_stat('fetched', 1)
+                analysis_queue.put((item, payload))
+
+            stage_finished('fetch', analysis_queue, self.analysis_workers)
+
+        def analysis_worker():
+            bind_token(token)
+            while True:
+                entry = analysis_queue.get()
+                if entry is _DONE:
+                    break
+                item, payload = entry
+                if token.cancelled:
+                    add_stat('cancelled', 1)
+                    continue
+                t0 = time.time()
+                try:
+                    result = analyze_fn(item, payload)
+                except ScanCancelled:
+                    add_stat('analysis_time', time.time() - t0)
+                    add_stat('cancelled', 1)
+                    continue
+                except Exception as e:
+                    print(f"❌ {item} analiz hatası: {e}")
+                    result = None
+                add_stat('analysis_time', time.time() - t0)
+
+                if result is None:
+                    failed(item, 'analysis')
+                    continue
+                add_stat('analyzed', 1)
+                result_queue.put((item, result))
+
+            stage_finished('analysis', result_queue, 1)
+
+        threads = [threading.Thread(target=feeder, daemon=True)]
+        threads += [threading.Thread(target=fetch_worker, daemon=True) for _ in range(self.fetch_workers)]
+        threads += [threading.Thread(target=analysis_worker, daemon=True) for _ in range(self.analysis_workers)]
+        for t in threads:
+            t.start()
+
+        # Emit aşaması: tek thread (çağıran)
+        while True:
+            entry = result_queue.get()
+            if entry is _DONE:
+                break
+            item, result = entry
+            t0 = time.time()
+            try:
+                emit_fn(item, result)
+                stats['emitted'] += 1
+            except Exception as e:
+                print(f"❌ {item} sinyal oluşturma hatası: {e}")
+            stats['emit_time'] += time.time() - t0
+
+        for t in threads:
+            t.join()
+
+        stats['wall_time'] = time.time() - start_time
+        stats['cancel_reason'] = token.reason if token.cancelled else None
+        for key in ('fetch_time', 'analysis_time', 'emit_time', 'wall_time'):
+            stats[key] = round(stats[key], 3)
+        return stats
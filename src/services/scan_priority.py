@@ -0,0 +1,132 @@
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional
+
+class ScanPriorityQueue:
+    """
+    Tarama öncelik kuyruğu
+
+    Her coin için üç bileşenli bir skor hesaplanır (hepsi 0..1):
+      - volatilite: 24 saatlik mutlak fiyat değişimi
+      - bayatlık: son analizden bu yana geçen süre
+      - yakınlık: son analizde en yakın destek/direnç seviyesine uzaklık
+
+    Coinler (-skor, sembol) anahtarıyla heap'ten çekilir; eşit skorda sembol
+    sırası kullanıldığı için aynı girdiler her zaman aynı sırayı üretir.
+    Zaman bütçesi taramayı keserse en umut verici coinler analiz edilmiş olur.
+    """
+
+    def __init__(self):
+        self.weights = {'volatility': 0.4, 'staleness': 0.35, 'proximity': 0.25}
+        self.volatility_cap = 10.0  # %10 ve üzeri 24s değişim tam puan
+        self.staleness_horizon = 3600  # 1 saattir analiz edilmeyen coin tam puan
+        self.proximity_range = 5.0  # Seviyeye %5 ve daha uzak coin sıfır puan
+        self.unknown_proximity = 0.5  # Henüz analiz edilmemiş coin için nötr puan
+
+        self._state: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def score(self, coin: Dict[str, any], now: Optional[float] = None) -> Dict[str, float]:
+        """
+        Coin için öncelik skorunu hesapla
+
+        Args:
+            coin: Filtre servisinden gelen coin dictionary'si
+            now: Referans zaman (epoch)
+
+        Returns:
+            Bileşenler ve toplam skor
+        """
+        now = time.time() if now is None else now
+        symbol = coin.get('symbol', '').upper()
+
+        change = abs(coin.get('price_change_percentage_24h', 0) or 0)
+        volatility = min(1.0, change / self.volatility_cap)
+
+        with self._lock:
+            state = self._state.get(symbol, {})
+
+        last_analyzed = state.get('last_analyzed')
+        if last_analyzed is None:
+            staleness = 1.0
+        else:
+            staleness = min(1.0, max(0.0, now - last_analyzed) / self.staleness_horizon)
+
+        distance = state.get('level_distance')
+        if distance is None:
+            proximity = self.unknown_proximity
+        else:
+            proximity = max(0.0, 1.0 - distance / self.proximity_range)
+
+        total = (self.weights['volatility'] * volatility +
+                 self.weights['staleness'] * staleness +
+                 self.weights['proximity'] * proximity)
+
+        return {
+            'symbol': symbol,
+            'volatility': round(volatility, 4),
+            'staleness': round(staleness, 4),
+            'proximity': round(proximity, 4),
+            'score': round(total, 6)
+        }
+
+    def prioritize(self, coins: List[Dict[str, any]], limit: Optional[int] = None) -> List[str]:
+        """
+        Coinleri öncelik sırasına diz
+
+        Args:
+            coins: Filtrelenmiş coin listesi
+            limit: En fazla kaç coin dönsün (None = tüm evren)
+
+        Returns:
+            Öncelik sırasına göre semboller
+        """
+        now = time.time()
+        heap = []
+        seen = set()
+        for coin in coins:
+            scored = self.score(coin, now)
+            if not scored['symbol'] or scored['symbol'] in seen:
+                continue
+            seen.add(scored['symbol'])
+            heap.append((-scored['score'], scored['symbol']))
+
+        heapq.heapify(heap)
+        count = len(heap) if limit is None else min(limit, len(heap))
+        return [heapq.heappop(heap)[1] for _ in range(count)]
+
+    def record_analysis(self, symbol: str, analysis: Optional[Dict[str, any]] = None):
+        """
+        Analiz edilen coinin bayatlık ve seviye yakınlığı durumunu güncelle
+
+        Başarısız denemeler de kaydedilir (analysis=None): yalnızca bayatlık
+        sıfırlanır, böylece sürekli hata veren bir coin kuyruğun başında kalıp
+        her taramada ilk sıraları işgal etmez.
+
+        Args:
+            symbol: Coin sembolü
+            analysis: _analyze_coin_data çıktısı (başarısız denemede None)
+        """
+        distance = None
+        if analysis:
+            for tf_analysis in analysis.get('timeframe_analyses', {}).values():
+                for pattern in tf_analysis.get('pattern', {}).get('patterns', []):
+                    if pattern.get('pattern') != 'support_resistance':
+                        continue
+                    for key in ('nearest_support', 'nearest_resistance'):
+                        level = pattern.get(key)
+                        if level:
+                            level_distance = abs(level['distance_pct'])
+                            distance = level_distance if distance is None else min(distance, level_distance)
+
+        with self._lock:
+            state = self._state.setdefault(symbol.upper(), {})
+            state['last_analyzed'] = time.time()
+            if distance is not None:
+                state['level_distance'] = distance
+
+    def get_state(self) -> Dict[str, Dict[str, float]]:
+        """Coin başına tutulan durumun kopyası"""
+        with self._lock:
+            return {symbol: dict(state) for symbol, state in self._state.items()}
@@ -0,0 +1,241 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Worker thread'lerinde geçerli tarama izi
+_local = threading.local()
+
+class _Span:
+    """Tek bir zaman aralığı; çıkışta izlemeye complete ('X') olayı yazar"""
+
+    __slots__ = ('trace', 'name', 'category', 'args', 'start')
+
+    def __init__(self, trace: 'ScanTrace', name: str, category: str, args: Dict[str, any]):
+        self.trace = trace
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.trace.add(self.name, self.category, self.start, time.perf_counter(), self.args)
+        return False
+
+class ScanTrace:
+    """
+    Bir taramanın zaman çizelgesi
+
+    Olaylar Chrome trace-event formatında (mikrosaniye, 'X' complete
+    olayları) tutulur; chrome://tracing veya Perfetto ile açılabilir.
+    """
+
+    def __init__(self, trace_id: str, label: str, meta: Optional[Dict[str, any]] = None):
+        self.trace_id = trace_id
+        self.label = label
+        self.meta = meta or {}
+        self.started_at = datetime.now().isoformat()
+        self.ended_at = None
+        self.max_events = 20000  # Bellek sınırı; aşılırsa yeni olaylar sayılır ama tutulmaz
+        self.dropped = 0
+
+        self._origin = time.perf_counter()
+        self._end = None
+        self._events: List[Dict[str, any]] = []
+        self._threads: Dict[int, str] = {}
+        self._workers = set()  # merge() ile olay eklenen worker process'leri
+        self._lock = threading.Lock()
+
+    def span(self, name: str, category: str = 'scan', **args) -> _Span:
+        """Zaman aralığı ölçen context manager"""
+        return _Span(self, name, category, args)
+
+    def add(self, name: str, category: str, start: float, end: float, args: Optional[Dict[str, any]] = None):
+        """
+        perf_counter zamanlarıyla hazır bir aralık ekle
+
+        Args:
+            name: Aralık adı (ör. fetch, patterns)
+            category: Aşama kategorisi
+            start: Başlangıç (time.perf_counter)
+            end: Bitiş (time.perf_counter)
+            args: Olay detayları (coin, timeframe...)
+        """
+        thread = threading.current_thread()
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': round((start - self._origin) * 1e6, 1),
+            'dur': round((end - start) * 1e6, 1),
+            'pid': os.getpid(),
+            'tid': thread.ident,
+            'args': args or {}
+        }
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self.dropped += 1
+                return
+            self._events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def export(self) -> Dict[str, any]:
+        """Olayları başka bir process'teki ize aktarılmak üzere dışa ver (bkz. merge)"""
+        with self._lock:
+            return {'origin': self._origin, 'events': list(self._events)}
+
+    def merge(self, exported: Dict[str, any]):
+        """
+        Başka bir process'te kaydedilmiş olayları ekle
+
+        perf_counter monoton sistem saatidir (process'ler arası ortak), bu yüzden
+        olaylar yalnızca iki izin başlangıç farkı kadar kaydırılır; pid/tid
+        worker process'inki olarak kalır.
+
+        Args:
+            exported: Worker'daki izin export() çıktısı
+        """
+        shift = (exported['origin'] - self._origin) * 1e6
+        with self._lock:
+            for event in exported['events']:
+                if len(self._events) >= self.max_events:
+                    self.dropped += 1
+                    continue
+                self._events.append({**event, 'ts': round(event['ts'] + shift, 1)})
+                self._workers.add(event['pid'])
+
+    def finish(self, **meta):
+        """İzlemeyi kapat"""
+        self._end = time.perf_counter()
+        self.ended_at = datetime.now().isoformat()
+        self.meta.update(meta)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self._end if self._end is not None else time.perf_counter()
+        return round((end - self._origin) * 1000, 1)
+
+    def summary(self) -> Dict[str, any]:
+        """Aşama başına toplam/maksimum süreler"""
+        with self._lock:
+            events = list(self._events)
+
+        stages = {}
+        for event in events:
+            stage = stages.setdefault(event['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            duration = event['dur'] / 1000
+            stage['count'] += 1
+            stage['total_ms'] += duration
+            stage['max_ms'] = max(stage['max_ms'], duration)
+
+        for stage in stages.values():
+            stage['total_ms'] = round(stage['total_ms'], 1)
+            stage['max_ms'] = round(stage['max_ms'], 1)
+
+        return {
+            'id': self.trace_id,
+            'label': self.label,
+            'started_at': self.started_at,
+            'ended_at': self.ended_at,
+            'duration_ms': self.duration_ms,
+            'events': len(events),
+            'dropped_events': self.dropped,
+            'stages': stages,
+            'meta': self.meta
+        }
+
+    def to_chrome(self) -> Dict[str, any]:
+        """Chrome trace-event JSON nesnesi"""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+            workers = sorted(self._workers)
+
+        pid = os.getpid()
+        metadata = [{
+            'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+            'args': {'name': f"scan {self.label} {self.started_at}"}
+        }]
+        metadata += [
+            {'name': 'process_name', 'ph': 'M', 'pid': worker, 'tid': 0,
+             'args': {'name': f"analysis worker {worker}"}}
+            for worker in workers if worker != pid
+        ]
+        metadata += [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+            for tid, name in threads.items()
+        ]
+
+        return {
+            'traceEvents': metadata + events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'trace_id': self.trace_id, **self.meta}
+        }
+
+class ScanTracer:
+    """
+    Tarama izleyicisi
+
+    Her tarama için bir ScanTrace açılır ve thread'e bağlanır; servisler
+    span() ile aralık yazar. İz bağlı değilse span() maliyetsiz no-op'tur.
+    Son max_scans tarama bellekte tutulur.
+    """
+
+    def __init__(self, max_scans: int = 20):
+        self.enabled = True
+        self._traces = deque(maxlen=max_scans)
+        self._lock = threading.Lock()
+        self._counter = 0
+
+        print("🔬 Scan Tracer başlatıldı")
+
+    def start_scan(self, label: str = 'scan', **meta) -> Optional[ScanTrace]:
+        """Yeni tarama izi aç ve sakla"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._counter += 1
+            trace = ScanTrace(f"{int(time.time())}-{self._counter}", label, meta)
+            self._traces.append(trace)
+        return trace
+
+    def bind(self, trace: Optional[ScanTrace]):
+        """İzi bu thread'e bağla"""
+        _local.trace = trace
+
+    def current(self) -> Optional[ScanTrace]:
+        """Bu thread'e bağlı iz"""
+        return getattr(_local, 'trace', None)
+
+    def span(self, name: str, category: str = 'scan', **args):
+        """Bağlı ize aralık yaz (iz yoksa no-op)"""
+        trace = getattr(_local, 'trace', None)
+        if trace is None:
+            return nullcontext()
+        return trace.span(name, category, **args)
+
+    def get(self, trace_id: str) -> Optional[ScanTrace]:
+        """ID ile iz"""
+        with self._lock:
+            for trace in self._traces:
+                if trace.trace_id == trace_id:
+                    return trace
+        return None
+
+    def recent(self) -> List[Dict[str, any]]:
+        """Son taramaların özetleri (en yeni önce)"""
+        with self._lock:
+            traces = list(self._traces)
+        return [trace.summary() for trace in reversed(traces)]
+
+# Singleton instance
+scan_tracer = ScanTracer()
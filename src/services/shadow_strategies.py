@@ -0,0 +1,206 @@
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .pnl_engine import pnl_engine
+
+class ShadowStrategyBook:
+    """
+    Gölge strateji defteri
+
+    Her gölge strateji birincil taramanın aldığı aynı mumlar ve göstergeler
+    üzerinde kendi parametreleriyle (min_confidence, timeframe ağırlıkları,
+    formasyon toleransı, run başına sinyal sayısı) değerlendirilir. Gölge
+    sinyaller yayınlanmaz; yalnızca burada varsayımsal olarak tutulur ve
+    taramalarda zaten alınmış fiyatlarla PnL'leri güncellenir. Ek upstream
+    isteği yapılmaz.
+    """
+
+    def __init__(self):
+        self.strategies: Dict[str, Dict[str, any]] = {}
+        self.signals: Dict[str, List[Dict[str, any]]] = {}
+        self.max_closed_per_strategy = 500  # Strateji başına tutulacak kapalı sinyal
+        self._lock = threading.RLock()
+
+        print("👥 Shadow Strategy Book başlatıldı")
+
+    def add_strategy(self, name: str, min_confidence: Optional[int] = None,
+                     timeframe_weights: Optional[Dict[str, float]] = None,
+                     tolerance: Optional[float] = None,
+                     max_signals: Optional[int] = None) -> Dict[str, any]:
+        """
+        Gölge strateji ekle veya güncelle
+
+        None bırakılan parametreler birincil konfigürasyondan alınır. Sayısal
+        parametreler sayıya çevrilir (JSON'dan gelen "0.03" gibi metinler
+        dahil); geçersiz değerler ValueError fırlatır.
+
+        Args:
+            name: Strateji adı
+            min_confidence: Minimum güven seviyesi
+            timeframe_weights: Timeframe -> ağırlık
+            tolerance: Formasyon toleransı
+            max_signals: Tarama başına en fazla sinyal
+
+        Returns:
+            Strateji konfigürasyonu
+
+        Raises:
+            ValueError: Parametre sayı değilse veya aralık dışındaysa
+        """
+        if timeframe_weights is not None and not isinstance(timeframe_weights, dict):
+            raise ValueError("timeframe_weights timeframe -> ağırlık eşlemesi olmalı")
+        config = {
+            'name': name,
+            'min_confidence': self._number('min_confidence', min_confidence, float, 0, 100),
+            'timeframe_weights': {
+                str(tf): self._number(f"timeframe_weights.{tf}", weight, float, 0)
+                for tf, weight in timeframe_weights.items()
+            } if timeframe_weights else None,
+            'tolerance': self._number('tolerance', tolerance, float, 0, 1),
+            'max_signals': self._number('max_signals', max_signals, int, 1),
+            'created_at': datetime.now().isoformat()
+        }
+        with self._lock:
+            self.strategies[name] = config
+            self.signals.setdefault(name, [])
+        print(f"👥 Gölge strateji eklendi: {name}")
+        return config
+
+    @staticmethod
+    def _number(field: str, value, kind: type, minimum: Optional[float] = None,
+                maximum: Optional[float] = None):
+        """Parametreyi sayıya çevir ve aralığını doğrula (None olduğu gibi döner)"""
+        if value is None:
+            return None
+        if isinstance(value, bool):
+            raise ValueError(f"{field} sayı olmalı")
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{field} sayı olmalı: {value!r}")
+        if number != number or number in (float('inf'), float('-inf')):
+            raise ValueError(f"{field} sonlu bir sayı olmalı")
+        if kind is int:
+            if not number.is_integer():
+                raise ValueError(f"{field} tam sayı olmalı")
+            number = int(number)
+        if (minimum is not None and number < minimum) or (maximum is not None and number > maximum):
+            raise ValueError(f"{field} {minimum}-{maximum if maximum is not None else '∞'} aralığında olmalı")
+        return number
+
+    def remove_strategy(self, name: str) -> bool:
+        """Gölge stratejiyi ve sinyallerini sil"""
+        with self._lock:
+            self.signals.pop(name, None)
+            pnl_engine.drop(f"shadow:{name}")
+            return self.strategies.pop(name, None) is not None
+
+    def get_strategies(self) -> List[Dict[str, any]]:
+        """Strateji konfigürasyonları"""
+        with self._lock:
+            return [dict(config) for config in self.strategies.values()]
+
+    def tolerance_variants(self, primary_tolerance: float) -> Dict[float, List[str]]:
+        """
+        Birincilden farklı formasyon toleransları -> bu toleransı kullanan stratejiler
+
+        Aynı toleransı paylaşan stratejiler tek pattern analizi kullanır.
+        """
+        variants: Dict[float, List[str]] = {}
+        with self._lock:
+            for name, config in self.strategies.items():
+                tolerance = config['tolerance']
+                if tolerance is not None and tolerance != primary_tolerance:
+                    variants.setdefault(tolerance, []).append(name)
+        return variants
+
+    def record_scan(self, name: str, candidates: List[Tuple[Tuple[float, ...], str, Dict[str, any]]]) -> int:
+        """
+        Stratejinin bu taramada seçtiği varsayımsal sinyalleri kaydet
+
+        Sembolde stratejinin açık sinyali varsa yenisi açılmaz.
+
+        Args:
+            name: Strateji adı
+            candidates: (sıralama anahtarı, sembol, sinyal) listesi
+
+        Returns:
+            Açılan sinyal sayısı
+        """
+        opened = 0
+        with self._lock:
+            book = self.signals.get(name)
+            if book is None:
+                return 0
+            open_symbols = {s['coin_symbol'] for s in book if s['status'] == 'ACTIVE'}
+            for _, symbol, signal in candidates:
+                if symbol in open_symbols:
+                    continue
+                book.append({**signal, 'strategy': name, 'shadow': True})
+                open_symbols.add(symbol)
+                opened += 1
+        return opened
+
+    def update_prices(self, prices: Dict[str, float]):
+        """
+        Açık gölge sinyallerin PnL'ini güncelle ve TP/SL kontrolü yap
+
+        Args:
+            prices: Büyük harf sembol -> son fiyat
+        """
+        prices = {symbol.lower(): price for symbol, price in prices.items()}
+        now = datetime.now().isoformat()
+        with self._lock:
+            for name, book in self.signals.items():
+                active = [s for s in book if s['status'] == 'ACTIVE']
+                result = pnl_engine.update(active, prices, 'advanced', book=f"shadow:{name}")
+                for signal, status, _ in result['hits']:
+                    signal['status'] = status
+                    signal['closed_at'] = now
+
+                self._trim(name)
+
+    def get_report(self, include_signals: bool = False) -> List[Dict[str, any]]:
+        """
+        Strateji başına performans raporu
+
+        Args:
+            include_signals: Sinyal listesini de döndür
+
+        Returns:
+            Strateji raporları
+        """
+        report = []
+        with self._lock:
+            for name, config in self.strategies.items():
+                book = self.signals.get(name, [])
+                active = [s for s in book if s['status'] == 'ACTIVE']
+                closed = [s for s in book if s['status'] != 'ACTIVE']
+                wins = [s for s in closed if s.get('pnl_percent', 0) > 0]
+
+                entry = {
+                    'strategy': dict(config),
+                    'total_signals': len(book),
+                    'active_signals': len(active),
+                    'closed_signals': len(closed),
+                    'open_pnl': round(sum(s.get('pnl_percent', 0) for s in active), 2),
+                    'realized_pnl': round(sum(s.get('pnl_percent', 0) for s in closed), 2),
+                    'success_rate': round(len(wins) / len(closed) * 100, 1) if closed else 0
+                }
+                if include_signals:
+                    entry['signals'] = [dict(s) for s in book]
+                report.append(entry)
+        return report
+
+    def _trim(self, name: str):
+        """Kapalı sinyal sayısını sınırla (en eskiler atılır)"""
+        book = self.signals[name]
+        closed = [i for i, s in enumerate(book) if s['status'] != 'ACTIVE']
+        excess = len(closed) - self.max_closed_per_strategy
+        if excess > 0:
+            drop = set(closed[:excess])
+            self.signals[name] = [s for i, s in enumerate(book) if i not in drop]
+
+# Singleton instance
+shadow_strategy_book = ShadowStrategyBook()
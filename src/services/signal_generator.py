@@ -1,5 +1,4 @@
 import os
-import json
 import os
 import time
 import threading
@@ -9,6 +8,12 @@ import requests
 from src.services.coin_gecko_service import CoinGeckoService
 from src.services.coin_filter_service import CoinFilterService
 from src.services.advanced_signal_generator import advanced_signal_generator
+from src.services.pnl_engine import pnl_engine
+from src.services.chart_data_service import chart_data_service
+from src.services.signal_store import signal_store
+from src.services.tick_buffer import tick_buffer
+from src.services.portfolio_simulator import portfolio_simulator
+from src.services.signal_journal import SignalJournal
 
 class SignalGenerator:
     def __init__(self):
@@ -17,59 +22,65 @@ class SignalGenerator:
         
         self.signals_file = os.path.join(self.data_dir, 'signals.json')
         self.history_file = os.path.join(self.data_dir, 'signal_history.json')
+        self.journal_file = os.path.join(self.data_dir, 'signals.journal.jsonl')
         
         self.coin_gecko = CoinGeckoService()
         self.coin_filter = CoinFilterService()
         
-        # Gelişmiş sinyal üretici kullan
+        # Gelişmiş sinyal üretici kullan; kapanan/süresi dolan sinyalleri kalıcı geçmişe yazılır
         self.advanced_generator = advanced_signal_generator
+        self.advanced_generator.history_sink = self.add_to_history
         
-        self.signals = self.load_signals()
-        self.signal_history = self.load_signal_history()
+        # Tüm aktif sinyaller tek depoda (gelişmiş üretici ile ortak); değişiklikler
+        # yalnızca eklemeli günlüğe yazılır, json dosyaları sıkıştırmada yenilenir
+        self.store = signal_store
+        self.journal = SignalJournal(self.journal_file, self.signals_file, self.history_file)
+        signals, self.signal_history = self.load_signals()
+        self.journal.attach(self.store, lambda: (self.store.snapshot(), list(self.signal_history)))
+        self.store.add_many(signals)
+        self.journal.compact()  # Açılışta oynatılan olaylar anlık görüntüye alınır (yükleme hatasında atlanır)
         
         # Otomatik güncelleme thread'i
         self.update_thread = None
         self.stop_updates = False
         
+        # Mum içi TP/SL: son kontrolden bu yana mumların high/low'u da değerlendirilir
+        self.intrabar_checks = True
+        self._last_price_check = time.time()
+        
         print("🚀 Advanced Signal Generator başlatıldı")
 
-    def load_signals(self) -> List[Dict]:
-        """Aktif sinyalleri yükle"""
+    @property
+    def signals(self) -> List[Dict]:
+        """Depodaki aktif sinyaller (canlı nesneler)"""
+        return self.store.values()
+    
+    @signals.setter
+    def signals(self, signals: List[Dict]):
+        self.store.replace_all(signals)
+
+    def load_signals(self):
+        """Aktif sinyalleri ve geçmişi yükle (anlık görüntü + günlük)"""
         try:
-            if os.path.exists(self.signals_file):
-                with open(self.signals_file, 'r', encoding='utf-8') as f:
-                    signals = json.load(f)
-                    print(f"📊 {len(signals)} aktif sinyal yüklendi")
-                    return signals
+            signals, history = self.journal.load()
+            print(f"📊 {len(signals)} aktif sinyal yüklendi")
+            print(f"📚 {len(history)} geçmiş sinyal yüklendi")
+            return signals, history
         except Exception as e:
             print(f"❌ Sinyal yükleme hatası: {e}")
-        return []
+        return [], []
 
     def save_signals(self):
-        """Aktif sinyalleri kaydet"""
+        """Fiyatı veya PnL'i değişen aktif sinyalleri günlüğe ekle (açılış/kapanışlar otomatik yazılır)"""
         try:
-            with open(self.signals_file, 'w', encoding='utf-8') as f:
-                json.dump(self.signals, f, indent=2, ensure_ascii=False)
+            self.journal.record_prices(self.store.values())
         except Exception as e:
             print(f"❌ Sinyal kaydetme hatası: {e}")
 
-    def load_signal_history(self) -> List[Dict]:
-        """Sinyal geçmişini yükle"""
-        try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    history = json.load(f)
-                    print(f"📚 {len(history)} geçmiş sinyal yüklendi")
-                    return history
-        except Exception as e:
-            print(f"❌ Geçmiş yükleme hatası: {e}")
-        return []
-
     def save_signal_history(self):
-        """Sinyal geçmişini kaydet"""
+        """Bekleyen günlük kayıtlarını diske yaz (geçmiş kayıtları eklenirken günlüğe yazılır)"""
         try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.signal_history, f, indent=2, ensure_ascii=False)
+            self.journal.sync()
         except Exception as e:
             print(f"❌ Geçmiş kaydetme hatası: {e}")
 
@@ -78,21 +89,9 @@ class SignalGenerator:
         try:
             entry_price = signal['entry_price']
             
-            # PnL hesaplama - DÜZELTİLDİ
-            if signal['direction'].upper() == 'LONG':
-                pnl_percentage = ((close_price - entry_price) / entry_price) * 100
-            else:
-                pnl_percentage = ((entry_price - close_price) / entry_price) * 100
-            
-            # PnL USD hesaplama - DÜZELTİLDİ (1000$ pozisyon varsayımı)
-            position_size = 1000
-            pnl_usd = (pnl_percentage / 100) * position_size
-            
-            # Aşırı PnL kontrolü - YENİ
-            if abs(pnl_percentage) > 500:  # %500'den fazla PnL mantıksız
-                print(f"⚠️ Aşırı PnL tespit edildi: {pnl_percentage:.2f}% - Sınırlandırılıyor")
-                pnl_percentage = 500 if pnl_percentage > 0 else -500
-                pnl_usd = (pnl_percentage / 100) * position_size
+            # PnL portföy simülatörünün canlı ayarlarıyla (pozisyon büyüklüğü, komisyon, kayma);
+            # kaldıraçsız LONG pozisyon nominalinden fazla kaybedemez
+            pnl_percentage, pnl_usd = portfolio_simulator.trade_pnl(signal['direction'], entry_price, close_price)
 
             historical_signal = {
                 'id': signal['id'],
@@ -113,7 +112,7 @@ class SignalGenerator:
             }
             
             self.signal_history.append(historical_signal)
-            self.save_signal_history()
+            self.journal.record_history(historical_signal)
             
             print(f"📚 Sinyal geçmişe eklendi: {signal['coin_symbol']} - {close_reason} - PnL: {pnl_percentage:.2f}%")
             
@@ -130,56 +129,32 @@ class SignalGenerator:
         except:
             return 0
 
-    def generate_signals(self, coin_count: int = 10) -> List[Dict]:
-        """Gelişmiş teknik analiz ile yeni sinyaller üret"""
+    def generate_signals(self, coin_count: Optional[int] = None, time_budget: Optional[float] = None) -> List[Dict]:
+        """Gelişmiş teknik analiz ile yeni sinyaller üret (coin_count None ise tüm evren)"""
         try:
-            print(f"🔍 {coin_count} coin için gelişmiş teknik analiz başlatılıyor...")
+            print(f"🔍 {coin_count or 'Tüm'} coin için gelişmiş teknik analiz başlatılıyor...")
             
-            # Gelişmiş sinyal üretici kullan
-            result = self.advanced_generator.generate_signals(coin_count)
+            # Gelişmiş sinyal üretici kullan; kayıt taramanın izi içinde yapılır
+            result = self.advanced_generator.generate_signals(coin_count, time_budget, self.save_signals)
             
             if result['success']:
-                # Yeni sinyalleri mevcut sinyallere ekle
-                new_signals = self.advanced_generator.get_signals()
-                
-                # Eski formatla uyumlu hale getir
-                formatted_signals = []
-                for signal in new_signals:
-                    formatted_signal = {
-                        'id': signal['id'],
-                        'coin_symbol': signal['symbol'],
-                        'coin_name': signal['symbol'],  # Coin name için symbol kullan
-                        'direction': signal['direction'],
-                        'entry_price': signal['entry_price'],
-                        'current_price': signal['current_price'],
-                        'confidence': signal['confidence'],
-                        'analysis': signal.get('analysis_summary', ''),
-                        'timestamp': signal['created_at'],
-                        'status': 'Aktif',
-                        'pnl_percentage': signal['pnl_percent'],
-                        'pnl_usd': 0,  # USD hesaplaması için ayrı metod gerekli
-                        'tp_levels': {
-                            'tp1': signal.get('tp1'),
-                            'tp2': signal.get('tp2')
-                        },
-                        'sl_level': signal.get('sl')
-                    }
-                    formatted_signals.append(formatted_signal)
-                
-                # Mevcut sinyalleri güncelle
-                self.signals = formatted_signals
-                self.save_signals()
+                # Yeni sinyaller gelişmiş üretici tarafından ortak depoya eklendi
+                new_signals = result.get('signals', [])
                 
                 print(f"🎯 {result['new_signals']} yeni gelişmiş sinyal üretildi")
-                return formatted_signals
+                return new_signals
             else:
                 print("❌ Gelişmiş sinyal üretimi başarısız, eski sisteme geçiliyor...")
-                return self._generate_signals_fallback(coin_count)
+                return self._generate_signals_fallback(coin_count or 10)
                 
         except Exception as e:
             print(f"❌ Gelişmiş sinyal üretme hatası: {e}")
             print("🔄 Eski sisteme geçiliyor...")
-            return self._generate_signals_fallback(coin_count)
+            return self._generate_signals_fallback(coin_count or 10)
+    
+    def cancel_scan(self) -> int:
+        """Devam eden gelişmiş taramaları iptal et"""
+        return self.advanced_generator.cancel_scan()
     
     def _generate_signals_fallback(self, coin_count: int = 10) -> List[Dict]:
         """Yedek sinyal üretme sistemi (eski sistem)"""
@@ -220,8 +195,7 @@ class SignalGenerator:
                         continue
                     
                     # Mevcut sinyallerde var mı kontrol et
-                    existing_signal = next((s for s in self.signals if s['coin_symbol'] == symbol), None)
-                    if existing_signal:
+                    if self.store.has_symbol(symbol):
                         continue
                     
                     # Teknik analiz simülasyonu
@@ -252,8 +226,8 @@ class SignalGenerator:
                     print(f"❌ {coin_data.get('symbol', 'Unknown')} için sinyal üretme hatası: {e}")
                     continue
             
-            # Yeni sinyalleri mevcut listeye ekle
-            self.signals.extend(new_signals)
+            # Yeni sinyalleri depoya ekle
+            self.store.add_many(new_signals)
             self.save_signals()
             
             print(f"🎯 {len(new_signals)} yeni sinyal üretildi")
@@ -329,13 +303,15 @@ class SignalGenerator:
     def update_signal_prices(self):
         """Aktif sinyallerin fiyatlarını güncelle"""
         try:
-            if not self.signals:
+            self.advanced_generator.ensure_expiry_timer()
+            signals = self.signals
+            if not signals:
                 return
             
-            print(f"🔄 {len(self.signals)} sinyalin fiyatları güncelleniyor...")
+            print(f"🔄 {len(signals)} sinyalin fiyatları güncelleniyor...")
             
             # Tüm coin sembollerini topla
-            symbols = [signal['coin_symbol'].lower() for signal in self.signals]
+            symbols = [signal['coin_symbol'].lower() for signal in signals]
             
             # Fiyatları toplu olarak al
             prices = self.coin_gecko.get_current_prices(symbols)
@@ -343,53 +319,31 @@ class SignalGenerator:
             if not prices:
                 print("❌ Fiyat verisi alınamadı")
                 return
+            tick_buffer.record_many(prices)
+            
+            # Son kontrolden bu yana mumlar (fitillerdeki TP/SL için, sembol başına tek istek)
+            checked_at = time.time()
+            ranges = {}
+            if self.intrabar_checks:
+                ranges = {
+                    symbol: chart_data_service.get_intrabar_ranges(symbol.upper(), self._last_price_check)
+                    for symbol in set(symbols)
+                }
+            self._last_price_check = checked_at
             
-            updated_count = 0
-            signals_to_close = []
+            # PnL ve TP/SL tüm sinyaller için tek vektörel geçişte
+            result = pnl_engine.update(signals, prices, 'legacy', max_abs_pnl=500, move_threshold=0.01,
+                                       ranges=ranges)
+            updated_count = result['updated']
+            signals_to_close = result['hits']
             
-            for signal in self.signals:
-                symbol_lower = signal['coin_symbol'].lower()
-                
-                if symbol_lower in prices:
-                    old_price = signal['current_price']
-                    new_price = prices[symbol_lower]
-                    
-                    if new_price and new_price > 0:
-                        signal['current_price'] = new_price
-                        entry_price = signal['entry_price']
-                        
-                        # PnL hesaplama - DÜZELTİLDİ
-                        if signal['direction'].upper() == 'LONG':
-                            pnl_percentage = ((new_price - entry_price) / entry_price) * 100
-                        else:
-                            pnl_percentage = ((entry_price - new_price) / entry_price) * 100
-                        
-                        # Aşırı PnL kontrolü - YENİ
-                        if abs(pnl_percentage) > 500:
-                            print(f"⚠️ {signal['coin_symbol']}: Aşırı PnL tespit edildi ({pnl_percentage:.2f}%) - Sinyal kapatılıyor")
-                            signals_to_close.append((signal, 'extreme_pnl', new_price))
-                            continue
-                        
-                        signal['pnl_percentage'] = round(pnl_percentage, 2)
-                        
-                        # PnL USD hesaplama - DÜZELTİLDİ
-                        position_size = 1000  # $1000 pozisyon varsayımı
-                        pnl_usd = (pnl_percentage / 100) * position_size
-                        signal['pnl_usd'] = round(pnl_usd, 2)
-                        
-                        updated_count += 1
-                        
-                        # Fiyat değişimi logla
-                        if abs(old_price - new_price) / old_price > 0.01:  # %1'den fazla değişim
-                            print(f"💰 {signal['coin_symbol']}: ${old_price:.4f} → ${new_price:.4f} (PnL: {pnl_percentage:.2f}%)")
-                        
-                        # TP/SL kontrolü
-                        tp_sl_result = self.check_tp_sl_levels(signal, new_price)
-                        if tp_sl_result:
-                            signals_to_close.append((signal, tp_sl_result, new_price))
+            for signal, old_price, new_price, pnl_percentage in result['moved']:
+                print(f"💰 {signal['coin_symbol']}: ${old_price:.4f} → ${new_price:.4f} (PnL: {pnl_percentage:.2f}%)")
             
             # Kapatılacak sinyalleri işle
             for signal, close_reason, close_price in signals_to_close:
+                if close_reason == 'extreme_pnl':
+                    print(f"⚠️ {signal['coin_symbol']}: Aşırı PnL tespit edildi - Sinyal kapatılıyor")
                 self.close_signal(signal, close_reason, close_price)
             
             if updated_count > 0:
@@ -402,38 +356,7 @@ class SignalGenerator:
     def check_tp_sl_levels(self, signal: Dict, current_price: float) -> Optional[str]:
         """TP/SL seviyelerini kontrol et"""
         try:
-            tp_levels = signal.get('tp_levels', {})
-            sl_level = signal.get('sl_level', 0)
-            direction = signal['direction'].upper()
-            
-            if direction == 'LONG':
-                # LONG pozisyon için TP kontrolü (fiyat yükselirse)
-                if 'tp3' in tp_levels and current_price >= tp_levels['tp3']:
-                    return 'tp3_hit'
-                elif 'tp2' in tp_levels and current_price >= tp_levels['tp2']:
-                    return 'tp2_hit'
-                elif 'tp1' in tp_levels and current_price >= tp_levels['tp1']:
-                    return 'tp1_hit'
-                
-                # LONG pozisyon için SL kontrolü (fiyat düşerse)
-                if sl_level > 0 and current_price <= sl_level:
-                    return 'stop_loss'
-                    
-            else:  # SHORT
-                # SHORT pozisyon için TP kontrolü (fiyat düşerse)
-                if 'tp3' in tp_levels and current_price <= tp_levels['tp3']:
-                    return 'tp3_hit'
-                elif 'tp2' in tp_levels and current_price <= tp_levels['tp2']:
-                    return 'tp2_hit'
-                elif 'tp1' in tp_levels and current_price <= tp_levels['tp1']:
-                    return 'tp1_hit'
-                
-                # SHORT pozisyon için SL kontrolü (fiyat yükselirse)
-                if sl_level > 0 and current_price >= sl_level:
-                    return 'stop_loss'
-            
-            return None
-            
+            return pnl_engine.check(signal, current_price, 'legacy')
         except Exception as e:
             print(f"❌ TP/SL kontrol hatası: {e}")
             return None
@@ -441,12 +364,13 @@ class SignalGenerator:
     def close_signal(self, signal: Dict, reason: str, close_price: float):
         """Sinyali kapat ve geçmişe ekle"""
         try:
+            # Aktif sinyallerden çıkar (başka bir güncelleme yolu zaten kapattıysa atla)
+            if self.store.remove(signal['id']) is None:
+                return
+            
             # Geçmişe ekle
             self.add_to_history(signal, reason, close_price)
             
-            # Aktif listeden çıkar
-            self.signals = [s for s in self.signals if s['id'] != signal['id']]
-            
             # PnL hesapla
             entry_price = signal['entry_price']
             if signal['direction'].upper() == 'LONG':
@@ -459,9 +383,17 @@ class SignalGenerator:
         except Exception as e:
             print(f"❌ Sinyal kapatma hatası: {e}")
 
-    def get_active_signals(self) -> List[Dict]:
-        """Aktif sinyalleri getir"""
-        return self.signals.copy()
+    def get_active_signals(self, snapshot: bool = False) -> List[Dict]:
+        """
+        Aktif sinyalleri getir
+        
+        Args:
+            snapshot: True ise kopyalar (salt okunur API yanıtları için); False ise
+                yerinde güncellenebilen canlı nesneler
+        """
+        # İstek alan her süreçte sona erme zamanlayıcısı çalışsın
+        self.advanced_generator.ensure_expiry_timer()
+        return self.store.snapshot() if snapshot else self.store.values()
 
     def get_signal_history(self) -> List[Dict]:
         """Sinyal geçmişini getir"""
@@ -500,7 +432,8 @@ class SignalGenerator:
         """Eski sistem performans istatistikleri"""
         try:
             total_signals = len(self.signal_history)
-            active_signals = len(self.signals)
+            # Gelişmiş sinyaller gelişmiş üreticinin istatistiklerinde sayılır
+            active_signals = len([s for s in self.signals if s.get('analysis_type') != 'ADVANCED_TECHNICAL'])
             
             if total_signals == 0:
                 return {
@@ -577,8 +510,7 @@ class SignalGenerator:
         try:
             self.signals = []
             self.signal_history = []
-            self.save_signals()
-            self.save_signal_history()
+            self.journal.compact(force=True)
             print("🧹 Tüm veriler temizlendi")
         except Exception as e:
             print(f"❌ Veri temizleme hatası: {e}")
@@ -589,10 +521,7 @@ class SignalGenerator:
             self.clear_all_data()
             
             # Dosyaları sil
-            if os.path.exists(self.signals_file):
-                os.remove(self.signals_file)
-            if os.path.exists(self.history_file):
-                os.remove(self.history_file)
+            self.journal.remove_files()
                 
             print("🔄 Sistem tamamen sıfırlandı")
         except Exception as e:
@@ -0,0 +1,319 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+class SignalJournal:
+    """
+    Sinyaller için yalnızca eklemeli olay günlüğü
+
+    Aktif sinyallerin açılışı, fiyat güncellemesi ve kapanışı ile geçmiş
+    kayıtları JSONL satırları olarak eklenir; her olay O(1) yazımdır. Kapanış
+    ve geçmiş olayları hemen fsync edilir; diğerleri toplu yapılır
+    (fsync_batch olayda veya arka plan thread'iyle en geç fsync_interval
+    saniyede bir). compact_every olaydan sonra durum anlık görüntü
+    dosyalarına (signals.json, signal_history.json) atomik olarak (geçici
+    dosya + fsync + rename) yazılır ve günlük sıfırlanır; açılışta anlık
+    görüntü üzerine en fazla compact_every olay oynatılır.
+
+    Birden fazla süreç (gunicorn çalışanları) aynı günlüğe yazabilir: dosya
+    fork'tan sonra her süreçte yeniden açılır. Sıkıştırma dosya kilidiyle
+    (journal + '.lock') süreçler arasında sıralanır ve süreç belleğinden
+    değil diskteki anlık görüntü + günlükten yapılır; böylece tüm süreçlerin
+    olayları korunur. Yazımlar paylaşımlı kilitle yapıldığından sıkıştırma
+    sırasında olay kaybolmaz.
+
+    Olaylar tekrar oynatılabilir: açılış aynı id'yi değiştirir, kapanış
+    yoksa atlanır, geçmiş kaydı id ile tekilleştirilir. Yarım yazılmış son
+    satır atlanır.
+    """
+
+    def __init__(self, journal_file: str, signals_file: str, history_file: str):
+        self.journal_file = journal_file
+        self.signals_file = signals_file
+        self.history_file = history_file
+        self.compact_every = 5000  # Bu kadar olaydan sonra anlık görüntü
+        self.fsync_batch = 100  # Bu kadar olay birikince fsync
+        self.fsync_interval = 1.0  # En geç bu kadar saniyede bir fsync
+
+        self._state_provider: Optional[Callable[[], Tuple[List[Dict], List[Dict]]]] = None
+        self._store = None
+        self._loaded = False  # Yükleme başarısızsa sıkıştırma anlık görüntüyü ezmesin
+        self._events = 0  # Son anlık görüntüden bu yana olay sayısı
+        self._journaled_prices: Dict[str, tuple] = {}  # Sinyal id -> son yazılan (fiyat, PnL)
+        self.stats = {'appends': 0, 'fsyncs': 0, 'compactions': 0, 'replayed': 0, 'corrupt_lines': 0,
+                      'skipped_compactions': 0}
+        self._reset_process_state()
+        os.register_at_fork(after_in_child=self._reset_process_state)
+
+    def _reset_process_state(self):
+        """Süreç başına dosya tanıtıcıları, kilit ve fsync thread'i (fork sonrası yeniden)"""
+        self._pid = os.getpid()
+        self._file = None
+        self._lock_file = None
+        self._unsynced = 0
+        self._last_sync = time.time()
+        self._flusher = None
+        self._lock = threading.RLock()
+
+    def load(self) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Anlık görüntüyü oku ve günlüğü üzerine oynat
+
+        Returns:
+            (aktif sinyaller, sinyal geçmişi)
+        """
+        signals, history, replayed = self._read_state()
+
+        with self._lock:
+            self._events = replayed
+            self._loaded = True
+            self.stats['replayed'] = replayed
+            self._journaled_prices = {s['id']: self._price_key(s) for s in signals}
+        if replayed:
+            print(f"📓 Sinyal günlüğünden {replayed} olay oynatıldı")
+        if self.stats['corrupt_lines']:
+            print(f"⚠️ Sinyal günlüğünde {self.stats['corrupt_lines']} bozuk satır atlandı")
+        return signals, history
+
+    def attach(self, store, state_provider: Callable[[], Tuple[List[Dict], List[Dict]]]):
+        """
+        Sinyal deposuna bağlan
+
+        Args:
+            store: SignalStore; açılış ve kapanışlar otomatik günlüğe yazılır
+            state_provider: Zorla sıkıştırmada (verileri temizlerken) yazılacak
+                (aktif sinyaller, geçmiş) durumunu döndürür
+        """
+        self._state_provider = state_provider
+        self._store = store
+        store.add_listener(self._on_store_event)
+
+    def record_prices(self, signals: List[Dict]) -> int:
+        """
+        Son yazımdan bu yana fiyatı veya PnL'i değişen sinyalleri günlüğe ekle
+
+        Returns:
+            Yazılan güncelleme sayısı
+        """
+        written = 0
+        with self._lock:
+            for signal in signals:
+                key = self._price_key(signal)
+                if self._journaled_prices.get(signal['id']) == key:
+                    continue
+                self._journaled_prices[signal['id']] = key
+                self._append({'op': 'update', 'id': signal['id'], 'fields': {
+                    'current_price': key[0], 'pnl_percentage': key[1], 'pnl_usd': key[2]
+                }})
+                written += 1
+        self._maybe_compact()
+        return written
+
+    def record_history(self, record: Dict):
+        """Geçmiş kaydını günlüğe ekle (hemen fsync)"""
+        with self._lock:
+            self._append({'op': 'history', 'record': record}, durable=True)
+        self._maybe_compact()
+
+    def sync(self):
+        """Bekleyen olayları diske yaz (fsync)"""
+        with self._lock:
+            if self._file is not None and self._unsynced:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+                self.stats['fsyncs'] += 1
+            self._last_sync = time.time()
+
+    def compact(self, force: bool = False):
+        """
+        Durumu anlık görüntüye yaz ve günlüğü sıfırla
+
+        Yeni anlık görüntü diskteki anlık görüntü üzerine günlüğün (tüm
+        süreçlerin olayları) oynatılmasıyla kurulur. Yükleme başarısız olduysa
+        (anlık görüntü okunamadı) force verilmedikçe atlanır; aksi halde eksik
+        durum dosyaların üzerine yazılırdı.
+
+        Args:
+            force: Diskteki durum yerine state_provider durumunu yaz (ör. tüm
+                verileri temizlerken); yükleme hatasında da yazılır
+        """
+        if self._state_provider is None:
+            return
+        if not self._loaded and not force:
+            self.stats['skipped_compactions'] += 1
+            print("⚠️ Sinyal günlüğü yüklenemediği için sıkıştırma atlandı")
+            return
+        # Kilit sırası her yerde depo -> günlük -> dosya kilidi; depo kilidi boyunca yeni olay eklenemez
+        with self._store.transaction(), self._lock:
+            self._ensure_open()
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                if force:
+                    signals, history = self._state_provider()
+                else:
+                    signals, history, _ = self._read_state()
+                self._write_atomic(self.signals_file, signals)
+                self._write_atomic(self.history_file, history)
+
+                # Anlık görüntü kalıcı olduktan sonra günlük boşaltılır (diğer süreçlerin
+                # O_APPEND tanıtıcıları yeni sona yazmaya devam eder)
+                os.truncate(self.journal_file, 0)
+                os.fsync(self._file.fileno())
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._events = 0
+            self._unsynced = 0
+            self._journaled_prices = {s['id']: self._price_key(s) for s in signals}
+            self._loaded = True
+            self.stats['compactions'] += 1
+
+    def close(self):
+        """Günlüğü diske yazıp kapat"""
+        with self._lock:
+            self.sync()
+            for handle in (self._file, self._lock_file):
+                if handle is not None:
+                    handle.close()
+            self._file = None
+            self._lock_file = None
+
+    def remove_files(self):
+        """Günlük ve anlık görüntü dosyalarını sil"""
+        with self._lock:
+            self.close()
+            for path in (self.journal_file, self.signals_file, self.history_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._events = 0
+
+    def get_stats(self) -> Dict[str, any]:
+        """Günlük istatistikleri"""
+        with self._lock:
+            return {
+                **self.stats,
+                'events_since_compaction': self._events,
+                'unsynced': self._unsynced,
+                'journal_bytes': os.path.getsize(self.journal_file) if os.path.exists(self.journal_file) else 0
+            }
+
+    def _read_state(self) -> Tuple[List[Dict], List[Dict], int]:
+        """
+        Diskteki anlık görüntü üzerine günlüğü oynat
+
+        Returns:
+            (aktif sinyaller, sinyal geçmişi, oynatılan olay sayısı)
+        """
+        signals = {s['id']: s for s in self._read_snapshot(self.signals_file)}
+        history = self._read_snapshot(self.history_file)
+        history_ids = {h.get('id') for h in history}
+
+        replayed = 0
+        if not os.path.exists(self.journal_file):
+            return list(signals.values()), history, replayed
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    self.stats['corrupt_lines'] += 1
+                    continue
+                op = event.get('op')
+                if op == 'open':
+                    signals[event['signal']['id']] = event['signal']
+                elif op == 'update':
+                    signal = signals.get(event['id'])
+                    if signal is not None:
+                        signal.update(event['fields'])
+                elif op == 'close':
+                    signals.pop(event['id'], None)
+                elif op == 'history':
+                    record = event['record']
+                    if record.get('id') not in history_ids:
+                        history.append(record)
+                        history_ids.add(record.get('id'))
+                replayed += 1
+        return list(signals.values()), history, replayed
+
+    def _on_store_event(self, event: str, signal: Dict):
+        with self._lock:
+            if event == 'remove':
+                self._journaled_prices.pop(signal['id'], None)
+                self._append({'op': 'close', 'id': signal['id']}, durable=True)
+            else:
+                self._journaled_prices[signal['id']] = self._price_key(signal)
+                self._append({'op': 'open', 'signal': signal})
+        self._maybe_compact()
+
+    def _ensure_open(self):
+        """Günlüğü ve kilit dosyasını bu süreçte aç (kilit altında çağrılır)"""
+        if self._file is None:
+            self._file = open(self.journal_file, 'a', encoding='utf-8')
+        if self._lock_file is None:
+            self._lock_file = open(f"{self.journal_file}.lock", 'a')
+
+    def _append(self, event: Dict, durable: bool = False):
+        """
+        Olay satırını ekle (kilit altında çağrılır)
+
+        Satır hemen işletim sistemine yazılır (süreç çökse de kaybolmaz, fork'ta
+        tamponda kalmaz); fsync durable olaylarda hemen, diğerlerinde eşik
+        dolunca veya arka plan thread'inde yapılır.
+        """
+        self._ensure_open()
+        line = json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n'
+        # Paylaşımlı kilit: başka sürecin sıkıştırması bu satırı silemez
+        fcntl.flock(self._lock_file, fcntl.LOCK_SH)
+        try:
+            self._file.write(line)
+            self._file.flush()
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._events += 1
+        self._unsynced += 1
+        self.stats['appends'] += 1
+        if durable or self._unsynced >= self.fsync_batch:
+            self.sync()
+        elif self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='journal-fsync', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        """Bekleyen olayları en geç fsync_interval saniyede bir fsync et"""
+        while True:
+            time.sleep(self.fsync_interval)
+            try:
+                if self._unsynced:
+                    self.sync()
+            except Exception as e:
+                print(f"❌ Sinyal günlüğü fsync hatası: {e}")
+
+    def _maybe_compact(self):
+        if self._events >= self.compact_every:
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"❌ Sinyal günlüğü sıkıştırma hatası: {e}")
+
+    @staticmethod
+    def _price_key(signal: Dict) -> tuple:
+        return (signal.get('current_price'), signal.get('pnl_percentage'), signal.get('pnl_usd'))
+
+    @staticmethod
+    def _read_snapshot(path: str) -> List[Dict]:
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_atomic(path: str, data: List[Dict]):
+        """Geçici dosyaya yazıp fsync ve rename (yarım dosya oluşmaz)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
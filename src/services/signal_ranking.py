@@ -0,0 +1,117 @@
+import heapq
+from typing import Any, Dict, List, Optional, Tuple
+
+class _Entry:
+    """Heap girdisi: küçük olan daha kötü aday (heap kökü ilk elenecek aday)"""
+
+    __slots__ = ('key', 'symbol', 'item')
+
+    def __init__(self, key: Tuple[float, ...], symbol: str, item: Any):
+        self.key = key
+        self.symbol = symbol
+        self.item = item
+
+    def __lt__(self, other: '_Entry') -> bool:
+        if self.key != other.key:
+            return self.key < other.key
+        # Eşit skorda alfabetik olarak sonraki sembol daha kötü sayılır
+        return self.symbol > other.symbol
+
+class TopKSelector:
+    """
+    Sınırlı heap ile en iyi K aday seçimi
+
+    Kök her zaman tutulan adayların en kötüsüdür; yeni aday ondan iyiyse
+    kökün yerine geçer. N aday için O(N log K) zaman ve O(K) bellek. Sıralama
+    anahtarı büyük olan iyidir, eşitlikte sembol sırası belirleyicidir; böylece
+    sonuç adayların geliş sırasından bağımsızdır.
+    """
+
+    def __init__(self, k: int):
+        self.k = max(0, k)
+        self.seen = 0
+        self._heap: List[_Entry] = []
+
+    def push(self, key: Tuple[float, ...], symbol: str, item: Any) -> bool:
+        """
+        Aday ekle
+
+        Args:
+            key: Sıralama anahtarı (büyük olan iyi)
+            symbol: Eşitlik bozucu sembol
+            item: Adayla taşınan veri
+
+        Returns:
+            Aday şu an en iyi K içinde ise True
+        """
+        self.seen += 1
+        if self.k == 0:
+            return False
+
+        entry = _Entry(key, symbol, item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if self._heap[0] < entry:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def results(self) -> List[Tuple[Tuple[float, ...], str, Any]]:
+        """En iyiden en kötüye (anahtar, sembol, veri) listesi"""
+        ordered = sorted(self._heap, reverse=True)
+        return [(entry.key, entry.symbol, entry.item) for entry in ordered]
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+def nearest_opposing_distance(timeframe_analyses: Dict[str, Dict], direction: str) -> Optional[float]:
+    """
+    Sinyal yönündeki en yakın karşı seviyeye uzaklık (yüzde)
+
+    LONG için fiyatın üstündeki en yakın direnç, SHORT için altındaki en
+    yakın destek. Tüm timeframe'lerin destek/direnç kümelerine bakılır.
+    """
+    key = 'resistance_levels' if direction == 'LONG' else 'support_levels'
+    nearest = None
+    for analysis in timeframe_analyses.values():
+        for pattern in analysis.get('pattern', {}).get('patterns', []):
+            if pattern.get('pattern') != 'support_resistance':
+                continue
+            for level in pattern.get(key, []):
+                distance = level.get('distance_pct', 0)
+                if distance > 0 and (nearest is None or distance < nearest):
+                    nearest = float(distance)
+    return nearest
+
+def risk_reward_ratio(entry_price: float, direction: str, target: float, stop: float,
+                      timeframe_analyses: Dict[str, Dict]) -> float:
+    """
+    Risk/ödül oranı
+
+    Ödül hedefe uzaklıktır ama yoldaki ilk karşı seviye ile sınırlanır;
+    risk stop'a uzaklıktır.
+
+    Args:
+        entry_price: Giriş fiyatı
+        direction: LONG veya SHORT
+        target: Hedef fiyat (TP)
+        stop: Stop fiyatı (SL)
+        timeframe_analyses: Timeframe analizleri
+
+    Returns:
+        Ödül / risk (hesaplanamazsa 0)
+    """
+    if not entry_price or direction not in ('LONG', 'SHORT'):
+        return 0.0
+
+    reward_pct = abs(target - entry_price) / entry_price * 100
+    risk_pct = abs(entry_price - stop) / entry_price * 100
+    if risk_pct <= 0:
+        return 0.0
+
+    opposing = nearest_opposing_distance(timeframe_analyses, direction)
+    if opposing is not None:
+        reward_pct = min(reward_pct, opposing)
+
+    return float(reward_pct / risk_pct)
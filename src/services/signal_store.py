@@ -0,0 +1,247 @@
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Kanonik şemada aktif sinyal durumu
+ACTIVE_STATUS = 'Aktif'
+
+# Gelişmiş şemadan kanonik şemaya taşınan ek alanlar
+_EXTRA_FIELDS = ('coin_id', 'risk_reward', 'timeframe_count', 'signal_count', 'analysis_type')
+
+def to_epoch(value) -> float:
+    """ISO zaman damgasını epoch'a çevir (çözülemezse şimdi)"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+def to_canonical(signal: Dict[str, any]) -> Dict[str, any]:
+    """
+    Sinyali kanonik şemaya çevir
+
+    Kanonik şema signals.json ve API'nin kullandığı şemadır (coin_symbol,
+    timestamp, tp_levels, sl_level, pnl_percentage). Gelişmiş üreticinin
+    şeması (created_at, tp1/tp2/sl, pnl_percent) dönüştürülür; zaten
+    kanonik olan sinyal olduğu gibi döner. opened_at açılış zamanının
+    epoch karşılığıdır; ISO zaman damgası yalnızca bir kez çözülür.
+    """
+    if 'tp_levels' in signal:
+        if not isinstance(signal.get('opened_at'), (int, float)):
+            signal['opened_at'] = to_epoch(signal.get('timestamp'))
+        return signal
+
+    symbol = signal.get('coin_symbol') or signal.get('symbol')
+    canonical = {
+        'id': signal['id'],
+        'coin_symbol': symbol,
+        'coin_name': signal.get('coin_name', symbol),
+        'direction': signal['direction'],
+        'entry_price': signal['entry_price'],
+        'current_price': signal.get('current_price', signal['entry_price']),
+        'confidence': signal['confidence'],
+        'analysis': signal.get('analysis_summary', ''),
+        'timestamp': signal['created_at'],
+        'opened_at': to_epoch(signal['created_at']),
+        'status': ACTIVE_STATUS,
+        'pnl_percentage': signal.get('pnl_percent', 0.0),
+        'pnl_usd': signal.get('pnl_usd', 0.0),
+        'tp_levels': {
+            'tp1': signal.get('tp1'),
+            'tp2': signal.get('tp2')
+        },
+        'sl_level': signal.get('sl')
+    }
+    for field in _EXTRA_FIELDS:
+        if field in signal:
+            canonical[field] = signal[field]
+    return canonical
+
+class SignalStore:
+    """
+    Aktif sinyallerin tek bellek içi deposu
+
+    Sinyaller kanonik şemada id ile tutulur; sembol, durum ve yön için
+    ikincil indeksler O(1) arama ve silme sağlar. İndeksli alanlar (coin_symbol,
+    status, direction) yalnızca update() ile değiştirilmelidir; fiyat ve PnL
+    alanları yerinde güncellenebilir. Dinleyiciler ekleme, güncelleme ve
+    silme olaylarını alır.
+    """
+
+    INDEXED_FIELDS = {
+        'symbol': lambda s: (s.get('coin_symbol') or '').upper(),
+        'status': lambda s: s.get('status'),
+        'direction': lambda s: str(s.get('direction', '')).upper()
+    }
+
+    def __init__(self):
+        self._signals: Dict[str, Dict[str, any]] = {}
+        # İndeks -> değer -> sıralı id kümesi (dict anahtarları)
+        self._indexes: Dict[str, Dict[str, Dict[str, None]]] = {name: {} for name in self.INDEXED_FIELDS}
+        self._listeners: List[Callable[[str, Dict[str, any]], None]] = []
+        self._lock = threading.RLock()
+
+        print("🗂️ Signal Store başlatıldı")
+
+    def add(self, signal: Dict[str, any]) -> Dict[str, any]:
+        """
+        Sinyal ekle (aynı id varsa değiştirilir)
+
+        Args:
+            signal: Sinyal (kanonik şemaya çevrilir)
+
+        Returns:
+            Depodaki sinyal
+        """
+        signal = to_canonical(signal)
+        with self._lock:
+            previous = self._signals.get(signal['id'])
+            if previous is not None:
+                self._unindex(previous)
+            self._signals[signal['id']] = signal
+            self._index(signal)
+            self._notify('update' if previous is not None else 'add', signal)
+        return signal
+
+    def add_many(self, signals: Iterable[Dict[str, any]]) -> List[Dict[str, any]]:
+        """Birden fazla sinyal ekle"""
+        with self._lock:
+            return [self.add(signal) for signal in signals]
+
+    def update(self, signal_id: str, **fields) -> Optional[Dict[str, any]]:
+        """
+        Sinyal alanlarını güncelle (indeksler gerekirse yenilenir)
+
+        Returns:
+            Güncellenen sinyal veya bulunamazsa None
+        """
+        with self._lock:
+            signal = self._signals.get(signal_id)
+            if signal is None:
+                return None
+            self._unindex(signal)
+            signal.update(fields)
+            self._index(signal)
+            self._notify('update', signal)
+            return signal
+
+    def remove(self, signal_id: str) -> Optional[Dict[str, any]]:
+        """
+        Sinyali depodan çıkar
+
+        Returns:
+            Çıkarılan sinyal veya bulunamazsa None
+        """
+        with self._lock:
+            signal = self._signals.pop(signal_id, None)
+            if signal is None:
+                return None
+            self._unindex(signal)
+            self._notify('remove', signal)
+            return signal
+
+    def replace_all(self, signals: Iterable[Dict[str, any]]):
+        """Depoyu verilen sinyallerle değiştir"""
+        with self._lock:
+            for signal_id in list(self._signals):
+                self.remove(signal_id)
+            self.add_many(signals)
+
+    def get(self, signal_id: str) -> Optional[Dict[str, any]]:
+        """ID ile sinyal"""
+        with self._lock:
+            return self._signals.get(signal_id)
+
+    def find(self, symbol: Optional[str] = None, status: Optional[str] = None,
+             direction: Optional[str] = None) -> List[Dict[str, any]]:
+        """
+        İndekslerle sinyal ara (verilen tüm koşullar sağlanmalı)
+
+        Args:
+            symbol: Coin sembolü
+            status: Durum
+            direction: Yön (LONG/SHORT)
+
+        Returns:
+            Eklenme sırasıyla sinyaller
+        """
+        criteria = {'symbol': symbol.upper() if symbol else None, 'status': status,
+                    'direction': direction.upper() if direction else None}
+        with self._lock:
+            sets = [self._indexes[name].get(value, {}) for name, value in criteria.items() if value is not None]
+            if not sets:
+                return list(self._signals.values())
+
+            sets.sort(key=len)
+            smallest, rest = sets[0], sets[1:]
+            return [self._signals[signal_id] for signal_id in smallest
+                    if all(signal_id in other for other in rest)]
+
+    def has_symbol(self, symbol: str) -> bool:
+        """Sembolde aktif sinyal var mı"""
+        with self._lock:
+            return bool(self._indexes['symbol'].get(symbol.upper()))
+
+    def count(self, symbol: Optional[str] = None, status: Optional[str] = None,
+              direction: Optional[str] = None) -> int:
+        """Koşula uyan sinyal sayısı (tek koşulda O(1))"""
+        criteria = [(name, value) for name, value in
+                    (('symbol', symbol and symbol.upper()), ('status', status),
+                     ('direction', direction and direction.upper())) if value]
+        if len(criteria) == 1:
+            name, value = criteria[0]
+            with self._lock:
+                return len(self._indexes[name].get(value, {}))
+        return len(self.find(symbol, status, direction))
+
+    def values(self) -> List[Dict[str, any]]:
+        """Canlı sinyal nesneleri (liste kopyası; sözlükler paylaşılır)"""
+        with self._lock:
+            return list(self._signals.values())
+
+    def snapshot(self) -> List[Dict[str, any]]:
+        """API okumaları için tutarlı kopya (sözlükler kopyalanır)"""
+        with self._lock:
+            return [dict(signal) for signal in self._signals.values()]
+
+    def add_listener(self, listener: Callable[[str, Dict[str, any]], None]):
+        """
+        Olay dinleyicisi ekle
+
+        Dinleyici (olay, sinyal) ile depo kilidi altında çağrılır; olaylar
+        'add', 'update', 'remove'. Hızlı olmalı ve depoya geri yazmamalıdır.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def transaction(self) -> threading.RLock:
+        """Depo kilidi; birden fazla işlemi veya okuma + yan etkiyi atomik yapmak için"""
+        return self._lock
+
+    def __len__(self) -> int:
+        return len(self._signals)
+
+    def __contains__(self, signal_id: str) -> bool:
+        return signal_id in self._signals
+
+    def _index(self, signal: Dict[str, any]):
+        for name, key_of in self.INDEXED_FIELDS.items():
+            self._indexes[name].setdefault(key_of(signal), {})[signal['id']] = None
+
+    def _unindex(self, signal: Dict[str, any]):
+        for name, key_of in self.INDEXED_FIELDS.items():
+            bucket = self._indexes[name].get(key_of(signal))
+            if bucket is not None:
+                bucket.pop(signal['id'], None)
+                if not bucket:
+                    del self._indexes[name][key_of(signal)]
+
+    def _notify(self, event: str, signal: Dict[str, any]):
+        for listener in self._listeners:
+            try:
+                listener(event, signal)
+            except Exception as e:
+                print(f"❌ Signal store dinleyici hatası: {e}")
+
+# Singleton instance
+signal_store = SignalStore()
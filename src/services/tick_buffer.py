@@ -0,0 +1,220 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+class _Ring:
+    """Sabit kapasiteli, dizi tabanlı halka tampon (en eski kayıtların üzerine yazılır)"""
+
+    __slots__ = ('columns', 'capacity', 'head', 'size')
+
+    def __init__(self, capacity: int, fields: int):
+        self.columns = np.zeros((fields, capacity), dtype=np.float64)
+        self.capacity = capacity
+        self.head = 0  # Sonraki yazılacak indeks
+        self.size = 0
+
+    def append(self, *values: float):
+        self.columns[:, self.head] = values
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def last_index(self) -> int:
+        return (self.head - 1) % self.capacity
+
+    def ordered(self) -> np.ndarray:
+        """Eskiden yeniye sıralı kopya [alan, kayıt]"""
+        if self.size < self.capacity:
+            return self.columns[:, :self.size].copy()
+        return np.concatenate([self.columns[:, self.head:], self.columns[:, :self.head]], axis=1)
+
+class _SymbolTicks:
+    """Bir sembolün tick'leri ve tick'lerden artımlı kurulan 1 dakikalık mumlar"""
+
+    # Mum alanları
+    START, OPEN, HIGH, LOW, CLOSE, TICKS = range(6)
+
+    def __init__(self, tick_capacity: int, candle_capacity: int, period: int):
+        self.ticks = _Ring(tick_capacity, 2)  # (epoch, fiyat)
+        self.candles = _Ring(candle_capacity, 6)
+        self.period = period
+        self.evicted_before = 0.0  # Halkadan düşen en yeni tick zamanı (kapsama kontrolü için)
+
+    def add(self, ts: float, price: float):
+        if self.ticks.size == self.ticks.capacity:
+            self.evicted_before = self.ticks.columns[0, self.ticks.head]
+        self.ticks.append(ts, price)
+
+        start = ts // self.period * self.period
+        candles = self.candles
+        if candles.size:
+            i = candles.last_index()
+            current = candles.columns[self.START, i]
+            if start == current:
+                column = candles.columns[:, i]
+                column[self.HIGH] = max(column[self.HIGH], price)
+                column[self.LOW] = min(column[self.LOW], price)
+                column[self.CLOSE] = price
+                column[self.TICKS] += 1
+                return
+            if start < current:
+                return  # Geç gelen tick kapanmış mumu değiştirmez
+        candles.append(start, price, price, price, price, 1)
+
+class TickBuffer:
+    """
+    Sembol başına fiyat tick halka tamponu
+
+    Fiyat güncelleyicinin her sorgu sonucu burada tutulur ve artımlı olarak
+    1 dakikalık OHLC mumlarına eklenir (tick başına O(1)). Açık pozisyonların
+    sembolleri için ek OHLCV isteği yapmadan yüksek çözünürlüklü veri sağlar;
+    mum içi TP/SL kontrolü tick'ler son kontrolden bu yana yeterince sık ise
+    borsa mumları yerine bu mumları kullanır.
+    """
+
+    def __init__(self, tick_capacity: int = 4096, candle_capacity: int = 240, period: int = 60):
+        self.tick_capacity = tick_capacity  # Sembol başına tick sayısı
+        self.candle_capacity = candle_capacity  # Sembol başına mum sayısı
+        self.period = period  # Mum süresi (saniye)
+        self._symbols: Dict[str, _SymbolTicks] = {}
+        self._lock = threading.Lock()
+        self.stats = {'ticks': 0, 'late_ticks': 0}
+
+        print("📈 Tick Buffer başlatıldı")
+
+    def record(self, symbol: str, price: float, ts: Optional[float] = None):
+        """
+        Tek fiyat tick'i ekle
+
+        Args:
+            symbol: Coin sembolü
+            price: Fiyat
+            ts: Tick zamanı (epoch, varsayılan şimdi)
+        """
+        self.record_many({symbol: price}, ts)
+
+    def record_many(self, prices: Dict[str, float], ts: Optional[float] = None):
+        """
+        Bir sorgu turunun fiyatlarını ekle
+
+        Args:
+            prices: Sembol -> fiyat (geçersiz fiyatlar atlanır)
+            ts: Sorgu zamanı (epoch, varsayılan şimdi)
+        """
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            for symbol, price in prices.items():
+                if not price or price <= 0:
+                    continue
+                buffer = self._symbols.get(symbol.upper())
+                if buffer is None:
+                    buffer = self._symbols[symbol.upper()] = _SymbolTicks(
+                        self.tick_capacity, self.candle_capacity, self.period)
+                if buffer.ticks.size and ts < buffer.ticks.columns[0, buffer.ticks.last_index()]:
+                    self.stats['late_ticks'] += 1
+                    continue
+                buffer.add(ts, float(price))
+                self.stats['ticks'] += 1
+
+    def get_ticks(self, symbol: str, since: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Verilen andan sonraki tick'ler
+
+        Returns:
+            (zamanlar, fiyatlar) eskiden yeniye
+        """
+        with self._lock:
+            buffer = self._symbols.get(symbol.upper())
+            if buffer is None:
+                return np.empty(0), np.empty(0)
+            ts, prices = buffer.ticks.ordered()
+        mask = ts > since
+        return ts[mask], prices[mask]
+
+    def covers(self, symbol: str, since: float, max_gap: float, now: Optional[float] = None) -> bool:
+        """
+        Tick'ler verilen andan bu yana kesintisiz mi
+
+        since öncesinde bir tick olmalı, ardışık tick'ler (ve son tick ile
+        şimdi) arasında max_gap saniyeden uzun boşluk olmamalı.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            buffer = self._symbols.get(symbol.upper())
+            if buffer is None or buffer.ticks.size == 0 or buffer.evicted_before >= since:
+                return False
+            ts = buffer.ticks.ordered()[0]
+        if ts[0] > since:
+            return False
+        ts = np.append(ts[np.searchsorted(ts, since, side='right') - 1:], now)
+        return bool(np.max(np.diff(ts)) <= max_gap)
+
+    def get_candles(self, symbol: str, since: float = 0.0) -> Optional[pd.DataFrame]:
+        """
+        Tick'lerden kurulan 1 dakikalık mumlar (candle store şemasında)
+
+        Args:
+            symbol: Coin sembolü
+            since: Bu andan sonra kapanan mumlar
+
+        Returns:
+            timestamp/open/high/low/close/volume DataFrame'i (hacim 0) veya None
+        """
+        with self._lock:
+            buffer = self._symbols.get(symbol.upper())
+            if buffer is None or buffer.candles.size == 0:
+                return None
+            candles = buffer.candles.ordered()
+
+        mask = candles[_SymbolTicks.START] + self.period > since
+        if not mask.any():
+            return None
+        df = pd.DataFrame({
+            'timestamp': pd.to_datetime(candles[_SymbolTicks.START][mask], unit='s'),
+            'open': candles[_SymbolTicks.OPEN][mask],
+            'high': candles[_SymbolTicks.HIGH][mask],
+            'low': candles[_SymbolTicks.LOW][mask],
+            'close': candles[_SymbolTicks.CLOSE][mask],
+            'volume': 0.0
+        })
+        df.attrs['source'] = 'ticks'
+        return df
+
+    def get_ranges(self, symbol: str, since: float) -> List[Tuple[float, float, float]]:
+        """
+        Verilen andan bu yana mumların fiyat aralıkları (mum içi TP/SL kontrolü için)
+
+        Returns:
+            [(açılış epoch, low, high)] zaman sırasıyla
+        """
+        with self._lock:
+            buffer = self._symbols.get(symbol.upper())
+            if buffer is None or buffer.candles.size == 0:
+                return []
+            candles = buffer.candles.ordered()
+
+        mask = candles[_SymbolTicks.START] + self.period > since
+        return list(zip(
+            candles[_SymbolTicks.START][mask].tolist(),
+            candles[_SymbolTicks.LOW][mask].tolist(),
+            candles[_SymbolTicks.HIGH][mask].tolist()
+        ))
+
+    def drop(self, symbol: str):
+        """Sembolün tamponunu sil"""
+        with self._lock:
+            self._symbols.pop(symbol.upper(), None)
+
+    def get_stats(self) -> Dict[str, any]:
+        """Tampon istatistikleri"""
+        with self._lock:
+            return {
+                **self.stats,
+                'symbols': len(self._symbols),
+                'buffered_ticks': sum(b.ticks.size for b in self._symbols.values()),
+                'candles': sum(b.candles.size for b in self._symbols.values())
+            }
+
+# Singleton instance
+tick_buffer = TickBuffer()
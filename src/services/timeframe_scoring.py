@@ -0,0 +1,139 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# Sinyal yönü kodları
+DIRECTION_CODES = {'LONG': 1, 'SHORT': -1, 'HOLD': 0}
+DIRECTION_NAMES = {1: 'LONG', -1: 'SHORT', 0: 'HOLD'}
+
+# Her timeframe'deki sinyal kaynakları (toplama sırası önemli)
+SIGNAL_SOURCES = ('pattern', 'technical')
+
+# Varsayılan timeframe ağırlıkları (uzun vadeli daha önemli)
+DEFAULT_TIMEFRAME_WEIGHTS = {
+    '15m': 1.0,
+    '1h': 1.2,
+    '4h': 1.5,
+    '1d': 2.0
+}
+
+class MultiTimeframeScorer:
+    """
+    Çoklu timeframe sinyal birleştirmesinin vektörel hali
+
+    Girdi (coin x timeframe x kaynak) yön kodu ve güven matrisleridir; tüm
+    coinlerin final yön ve güveni tek seferde hesaplanır. Ağırlıklı toplamlar
+    coin başı yoldaki sırayla (timeframe, sonra pattern/teknik) biriktirilir,
+    böylece kayan nokta sonuçları ve int kesmesi birebir aynıdır.
+    """
+
+    def __init__(self, max_confidence: int = 95, confluence_bonus: int = 10, confluence_min: int = 3):
+        self.max_confidence = max_confidence
+        self.confluence_bonus = confluence_bonus
+        self.confluence_min = confluence_min  # Bonus için aynı yöndeki minimum sinyal sayısı
+        self.no_weight_confidence = 60  # Toplam ağırlık 0 ise yönlü sinyalin güveni
+        self.hold_confidence = 50
+
+    def build_matrices(self, analyses: List[Dict[str, Dict]],
+                       timeframes: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Timeframe analizlerinden skor matrislerini oluştur
+
+        Args:
+            analyses: Coin başına timeframe -> {'pattern', 'technical'} analizi
+            timeframes: Sütun sırası
+
+        Returns:
+            (yön kodları [N,T,S] int8, güvenler [N,T,S] float64, mevcut timeframe maskesi [N,T] bool)
+        """
+        n, t, s = len(analyses), len(timeframes), len(SIGNAL_SOURCES)
+        directions = np.zeros((n, t, s), dtype=np.int8)
+        confidences = np.zeros((n, t, s), dtype=np.float64)
+        present = np.zeros((n, t), dtype=bool)
+
+        columns = {tf: j for j, tf in enumerate(timeframes)}
+        for i, timeframe_analyses in enumerate(analyses):
+            for tf, analysis in timeframe_analyses.items():
+                j = columns.get(tf)
+                if j is None:
+                    continue
+                present[i, j] = True
+                for k, source in enumerate(SIGNAL_SOURCES):
+                    directions[i, j, k] = DIRECTION_CODES.get(analysis[source]['signal'], 0)
+                    confidences[i, j, k] = analysis[source]['confidence']
+
+        return directions, confidences, present
+
+    def score(self, directions: np.ndarray, confidences: np.ndarray, present: np.ndarray,
+              weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Tüm coinler için final yön ve güven
+
+        Args:
+            directions: [N,T,S] yön kodları
+            confidences: [N,T,S] güvenler
+            present: [N,T] timeframe analizi var mı
+            weights: [T] timeframe ağırlıkları
+
+        Returns:
+            (yön kodları [N] int8, güvenler [N] int64)
+        """
+        n, t, s = directions.shape
+        weighted_long = np.zeros(n)
+        weighted_short = np.zeros(n)
+        total_weight = np.zeros(n)
+
+        for j in range(t):
+            weight = weights[j]
+            for k in range(s):
+                contribution = weight * confidences[:, j, k]
+                weighted_long += np.where(directions[:, j, k] == 1, contribution, 0.0)
+                weighted_short += np.where(directions[:, j, k] == -1, contribution, 0.0)
+            total_weight += np.where(present[:, j], weight * 2, 0.0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            long_conf = np.where(total_weight > 0,
+                                 np.minimum(self.max_confidence, np.trunc(weighted_long / total_weight * 100)),
+                                 self.no_weight_confidence)
+            short_conf = np.where(total_weight > 0,
+                                  np.minimum(self.max_confidence, np.trunc(weighted_short / total_weight * 100)),
+                                  self.no_weight_confidence)
+
+        long_count = (directions == 1).sum(axis=(1, 2))
+        short_count = (directions == -1).sum(axis=(1, 2))
+        has_signals = (long_count + short_count) > 0
+
+        final = np.where(weighted_long > weighted_short, 1, np.where(weighted_short > weighted_long, -1, 0))
+        final = np.where(has_signals, final, 0).astype(np.int8)
+        confidence = np.where(final == 1, long_conf, np.where(final == -1, short_conf, self.hold_confidence))
+
+        confluence = (((final == 1) & (long_count >= self.confluence_min)) |
+                      ((final == -1) & (short_count >= self.confluence_min)))
+        confidence = np.where(confluence, np.minimum(self.max_confidence, confidence + self.confluence_bonus), confidence)
+
+        return final, confidence.astype(np.int64)
+
+    def score_analyses(self, analyses: List[Dict[str, Dict]], timeframes: List[str],
+                       weights: Optional[Dict[str, float]] = None) -> List[Tuple[str, int]]:
+        """
+        Coin analizlerini toplu skorla
+
+        Args:
+            analyses: Coin başına timeframe analizleri
+            timeframes: Timeframe sırası (coin başı yoldaki toplama sırası)
+            weights: Timeframe -> ağırlık (bilinmeyen timeframe 1.0)
+
+        Returns:
+            Coin başına (sinyal, güven)
+        """
+        if not analyses:
+            return []
+
+        weights = weights or DEFAULT_TIMEFRAME_WEIGHTS
+        # Listede olmayan timeframe'ler analiz sırasıyla sona eklenir
+        columns = list(dict.fromkeys(list(timeframes) + [tf for a in analyses for tf in a]))
+        weight_vector = np.array([weights.get(tf, 1.0) for tf in columns], dtype=np.float64)
+
+        directions, confidences, present = self.build_matrices(analyses, columns)
+        final, confidence = self.score(directions, confidences, present, weight_vector)
+
+        return [(DIRECTION_NAMES[int(d)], int(c)) for d, c in zip(final, confidence)]
@@ -0,0 +1,157 @@
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+# Formasyon kodları -> (pattern, sinyal, güven, açıklama)
+TRENDLINE_PATTERNS = {
+    1: ('ascending_triangle', 'LONG', 75, "Yükselen üçgen formasyonu - yükseliş sinyali"),
+    2: ('descending_triangle', 'SHORT', 75, "Alçalan üçgen formasyonu - düşüş sinyali"),
+    3: ('symmetrical_triangle', 'HOLD', 60, "Simetrik üçgen formasyonu - kırılım bekleniyor"),
+    4: ('rising_wedge', 'SHORT', 70, "Yükselen kama formasyonu - düşüş sinyali"),
+    5: ('falling_wedge', 'LONG', 70, "Alçalan kama formasyonu - yükseliş sinyali"),
+}
+
+class TrendlineService:
+    """
+    Kümülatif toplamlarla kayan en küçük kareler trend çizgisi motoru
+
+    Her pencere adımı için eğim ve kesişim O(1)'de hesaplanır; kümülatif
+    toplamlar bir kez çıkarılır ve tüm pencere uzunlukları aynı geçişte
+    kullanılır. Üst çizgi high'lara, alt çizgi low'lara oturtulur.
+    """
+
+    def __init__(self):
+        self.windows = (20, 30, 50)  # Varsayılan pencere uzunlukları (mum)
+        self.flat_threshold = 0.001  # Mum başına %0.1'den küçük eğim yatay sayılır
+
+        print("📐 Trendline Service başlatıldı")
+
+    def rolling_fit(self, values: np.ndarray, windows: Tuple[int, ...]) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Her pencere uzunluğu için kayan doğrusal regresyon
+
+        Args:
+            values: Fiyat serisi
+            windows: Pencere uzunlukları
+
+        Returns:
+            Pencere -> (eğim, pencere sonundaki çizgi değeri) dizileri.
+            t indeksi [t-w+1, t] penceresine aittir; pencere dolmadan NaN.
+        """
+        y = np.asarray(values, dtype=np.float64)
+        n = len(y)
+        idx = np.arange(n, dtype=np.float64)
+
+        # Başına 0 eklenmiş kümülatif toplamlar: S[t+1] - S[t+1-w] = pencere toplamı
+        s_y = np.concatenate(([0.0], np.cumsum(y)))
+        s_iy = np.concatenate(([0.0], np.cumsum(idx * y)))
+
+        fits = {}
+        for w in windows:
+            slope = np.full(n, np.nan)
+            end_value = np.full(n, np.nan)
+            if w < 2 or n < w:
+                fits[w] = (slope, end_value)
+                continue
+
+            ends = np.arange(w - 1, n)
+            starts = ends - w + 1
+            sum_y = s_y[ends + 1] - s_y[starts]
+            sum_iy = s_iy[ends + 1] - s_iy[starts]
+
+            # Yerel x = 0..w-1
+            sum_x = w * (w - 1) / 2
+            sum_xx = (w - 1) * w * (2 * w - 1) / 6
+            sum_xy = sum_iy - starts * sum_y
+
+            slope[ends] = (w * sum_xy - sum_x * sum_y) / (w * sum_xx - sum_x ** 2)
+            intercept = (sum_y - slope[ends] * sum_x) / w
+            end_value[ends] = intercept + slope[ends] * (w - 1)
+
+            fits[w] = (slope, end_value)
+
+        return fits
+
+    def classify(self, highs: np.ndarray, lows: np.ndarray,
+                 windows: Optional[Tuple[int, ...]] = None) -> Dict[int, Dict[str, np.ndarray]]:
+        """
+        Tüm pencere ve mumlar için üçgen/kama sınıflandırması
+
+        Args:
+            highs: High serisi
+            lows: Low serisi
+            windows: Pencere uzunlukları (varsayılan self.windows)
+
+        Returns:
+            Pencere -> {'code', 'upper_slope', 'lower_slope'}; code 0 formasyon yok,
+            diğerleri TRENDLINE_PATTERNS anahtarları. Eğimler fiyata göre normalize.
+        """
+        windows = windows or self.windows
+        upper_fits = self.rolling_fit(highs, windows)
+        lower_fits = self.rolling_fit(lows, windows)
+
+        results = {}
+        for w in windows:
+            upper_slope, upper_end = upper_fits[w]
+            lower_slope, lower_end = lower_fits[w]
+
+            # Eğimi pencere sonundaki orta fiyata göre normalize et
+            mid = (upper_end + lower_end) / 2
+            with np.errstate(divide='ignore', invalid='ignore'):
+                up = upper_slope / mid
+                lo = lower_slope / mid
+
+            flat_up = np.abs(up) < self.flat_threshold
+            flat_lo = np.abs(lo) < self.flat_threshold
+            rising_up = up > self.flat_threshold
+            rising_lo = lo > self.flat_threshold
+            falling_up = up < -self.flat_threshold
+            falling_lo = lo < -self.flat_threshold
+
+            code = np.zeros(len(up), dtype=np.int8)
+            code[flat_up & rising_lo] = 1
+            code[falling_up & flat_lo] = 2
+            code[falling_up & rising_lo] = 3
+            code[rising_up & rising_lo & (lo > up)] = 4  # Alt çizgi daha dik: daralan yükseliş
+            code[falling_up & falling_lo & (up < lo)] = 5  # Üst çizgi daha dik: daralan düşüş
+
+            results[w] = {'code': code, 'upper_slope': up, 'lower_slope': lo}
+
+        return results
+
+    def latest_pattern(self, highs: np.ndarray, lows: np.ndarray,
+                       windows: Optional[Tuple[int, ...]] = None) -> Optional[Dict[str, any]]:
+        """
+        Son mumda geçerli formasyonu döner (en uzun pencere öncelikli)
+
+        Args:
+            highs: High serisi
+            lows: Low serisi
+            windows: Pencere uzunlukları
+
+        Returns:
+            Formasyon dictionary'si veya None
+        """
+        classified = self.classify(highs, lows, windows)
+
+        for w in sorted(classified, reverse=True):
+            data = classified[w]
+            code = int(data['code'][-1])
+            if code == 0:
+                continue
+
+            pattern, signal, confidence, description = TRENDLINE_PATTERNS[code]
+            return {
+                'detected': True,
+                'pattern': pattern,
+                'signal': signal,
+                'confidence': confidence,
+                'window': w,
+                'upper_slope': float(data['upper_slope'][-1]),
+                'lower_slope': float(data['lower_slope'][-1]),
+                'description': description
+            }
+
+        return None
+
+# Singleton instance
+trendline_service = TrendlineService()
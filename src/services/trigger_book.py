@@ -0,0 +1,171 @@
+import heapq
+import time
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+class TriggerBook:
+    """
+    Sembol başına fiyat indeksli TP/SL tetik defteri
+
+    Her sembol için iki heap tutulur: fiyat yükselince tetiklenen seviyeler
+    (LONG TP, SHORT SL) min-heap'te, fiyat düşünce tetiklenenler (LONG SL,
+    SHORT TP) max-heap'te. Tetiklenen seviyeler heap'ten çıktığı için bir
+    fiyat turu yalnızca önceki fiyattan bu yana geçilen seviyelere dokunur:
+    sembol başına O(log n + tetik). Kapanan sinyallerin kalan seviyeleri
+    tembel silinir; kayıt jetonu eşleşmeyen girdiler heap'ten çıkarken atlanır.
+
+    Mum (low, high) aralıkları da uygulanabilir; bir mum yalnızca mumun
+    açılışından önce açılmış sinyalleri tetikler.
+    """
+
+    def __init__(self):
+        self._up: Dict[str, List[Tuple[float, int, int, Hashable]]] = {}
+        self._down: Dict[str, List[Tuple[float, int, int, Hashable]]] = {}
+        self._live: Dict[Hashable, Tuple[int, str, float]] = {}  # Anahtar -> (kayıt jetonu, sembol, açılış)
+        self._token = 0
+        self._dead = 0  # Heap'lerde bekleyen ölü girdi sayısı (yaklaşık)
+        self.stats = {'registered': 0, 'fired': 0, 'stale_skipped': 0, 'compactions': 0}
+
+    def add(self, key: Hashable, symbol: str, direction: int,
+            tps: Iterable[Tuple[int, float]], sl: Optional[Tuple[int, float]] = None,
+            opened_at: Optional[float] = None):
+        """
+        Sinyalin seviyelerini kaydet (anahtar zaten varsa yeniden kaydedilir)
+
+        Args:
+            key: Sinyal anahtarı
+            symbol: Fiyat sembolü
+            direction: LONG 1, SHORT -1
+            tps: (tetik kodu, seviye) listesi
+            sl: (tetik kodu, seviye)
+            opened_at: Sinyalin açıldığı epoch (varsayılan şimdi)
+        """
+        self.remove(key)
+        self._token += 1
+        token = self._token
+        self._live[key] = (token, symbol, opened_at if opened_at is not None else time.time())
+        self.stats['registered'] += 1
+
+        # LONG için TP yukarıda, SL aşağıda; SHORT için tersi
+        upper, lower = (list(tps), [sl]) if direction > 0 else ([sl], list(tps))
+        for code, level in upper:
+            if level == level and level is not None:  # NaN ve None atlanır
+                heapq.heappush(self._up.setdefault(symbol, []), (float(level), token, code, key))
+        for entry in lower:
+            if entry is None:
+                continue
+            code, level = entry
+            if level == level and level is not None:
+                heapq.heappush(self._down.setdefault(symbol, []), (-float(level), token, code, key))
+
+    def remove(self, key: Hashable) -> bool:
+        """Sinyali defterden çıkar (heap girdileri tembel silinir)"""
+        if self._live.pop(key, None) is None:
+            return False
+        self._dead += 1
+        return True
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._live
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def on_price(self, symbol: str, price: float) -> Dict[Hashable, List[Tuple[int, float]]]:
+        """
+        Fiyat turunu uygula ve geçilen seviyeleri döndür
+
+        Tetiklenen sinyaller defterden çıkarılır (her tetik sinyali kapatır).
+
+        Args:
+            symbol: Fiyat sembolü
+            price: Güncel fiyat
+
+        Returns:
+            Sinyal anahtarı -> tetiklenen (kod, seviye) listesi
+        """
+        return self.on_range(symbol, price, price)
+
+    def on_range(self, symbol: str, low: float, high: float,
+                 start: Optional[float] = None) -> Dict[Hashable, List[Tuple[int, float]]]:
+        """
+        Bir mumun fiyat aralığını uygula
+
+        Yükselişte tetiklenen seviyeler high'a, düşüşte tetiklenenler low'a
+        göre geçilir. start verilirse mum açılışından sonra açılan sinyaller
+        atlanır; seviyeleri heap'e geri konur.
+
+        Args:
+            symbol: Fiyat sembolü
+            low: Mumun en düşüğü
+            high: Mumun en yükseği
+            start: Mumun açılış epoch'u
+
+        Returns:
+            Sinyal anahtarı -> tetiklenen (kod, seviye) listesi
+        """
+        fired: Dict[Hashable, List[Tuple[int, float]]] = {}
+        deferred = []
+
+        heap = self._up.get(symbol)
+        while heap and heap[0][0] <= high:
+            entry = heapq.heappop(heap)
+            if self._collect(fired, entry, entry[0], start):
+                deferred.append((heap, entry))
+
+        heap = self._down.get(symbol)
+        while heap and -heap[0][0] >= low:
+            entry = heapq.heappop(heap)
+            if self._collect(fired, entry, -entry[0], start):
+                deferred.append((heap, entry))
+
+        for heap, entry in deferred:
+            heapq.heappush(heap, entry)
+
+        for key in fired:
+            self._live.pop(key, None)
+            self._dead += 1
+        self.stats['fired'] += len(fired)
+
+        if self._dead > max(1024, 2 * len(self._live)):
+            self.compact()
+        return fired
+
+    def _collect(self, fired: Dict[Hashable, List[Tuple[int, float]]], entry: Tuple,
+                 level: float, start: Optional[float]) -> bool:
+        """
+        Heap'ten çıkan girdi hâlâ canlıysa tetik listesine ekle
+
+        Returns:
+            Girdi canlı ama mumdan sonra açılmışsa True (heap'e geri konmalı)
+        """
+        _, token, code, key = entry
+        live = self._live.get(key)
+        if live is None or live[0] != token:
+            self.stats['stale_skipped'] += 1
+            return False
+        if start is not None and live[2] > start:
+            return True
+        fired.setdefault(key, []).append((code, level))
+        return False
+
+    def compact(self):
+        """Ölü girdileri heap'lerden temizle"""
+        for heaps in (self._up, self._down):
+            for symbol in list(heaps):
+                heap = [entry for entry in heaps[symbol]
+                        if self._live.get(entry[3], (None,))[0] == entry[1]]
+                if heap:
+                    heapq.heapify(heap)
+                    heaps[symbol] = heap
+                else:
+                    del heaps[symbol]
+        self._dead = 0
+        self.stats['compactions'] += 1
+
+    def get_stats(self) -> Dict[str, any]:
+        """Defter istatistikleri"""
+        return {
+            **self.stats,
+            'live_signals': len(self._live),
+            'levels': sum(len(h) for h in self._up.values()) + sum(len(h) for h in self._down.values())
+        }